@@ -12,5 +12,13 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LocalLibrary.settings')
+os.environ.setdefault('DJANGO_ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
+
+# Runs in every gunicorn worker as it loads the app (or once in the master with --preload), before any request.
+from django.conf import settings  # noqa: E402
+
+if settings.PRELOAD_TEMPLATES:
+    from catalog.templatecache import preload_templates  # noqa: E402
+    preload_templates()
@@ -49,21 +49,27 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'catalog.profiling.ProfilingMiddleware',
+    'catalog.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise's middleware, able to run in the async handler under ASGI.
+    'catalog.staticfiles.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'catalog.routers.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'LocalLibrary.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that also times rendering for catalog.profiling
+        'BACKEND': 'catalog.profiling.ProfilingTemplates',
+        'NAME': 'django',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -77,8 +83,45 @@ TEMPLATES = [
     },
 ]
 
+# Keep compiled templates in memory and compile them all when a worker starts (see catalog.templatecache).
+# On by default whenever DEBUG is off; DJANGO_PRELOAD_TEMPLATES=True/False overrides it.
+PRELOAD_TEMPLATES = os.environ.get('DJANGO_PRELOAD_TEMPLATES', str(not DEBUG)) == 'True'
+if PRELOAD_TEMPLATES:
+    TEMPLATES[0]['APP_DIRS'] = False
+    from catalog.templatecache import cached_loaders
+    TEMPLATES[0]['OPTIONS']['loaders'] = cached_loaders()
+
 WSGI_APPLICATION = 'LocalLibrary.wsgi.application'
 
+# Opt-in request profiling (catalog.profiling): per-view query counts and timings in a per-process ring
+# buffer, served to staff at /catalog/profiling/ and sent as Server-Timing headers. A sampled fraction of
+# requests also runs under cProfile, keeping dumps of the slowest ones.
+REQUEST_PROFILING = os.environ.get('DJANGO_REQUEST_PROFILING', '') == 'True'
+REQUEST_PROFILING_BUFFER = 2000
+REQUEST_PROFILING_SAMPLE_RATE = float(os.environ.get('DJANGO_PROFILING_SAMPLE_RATE', '0'))
+REQUEST_PROFILING_DUMPS = 10
+REQUEST_PROFILING_DUMP_DIR = os.environ.get('DJANGO_PROFILING_DUMP_DIR', os.path.join(BASE_DIR, '.profiles'))
+
+# Prometheus metrics at /metrics (catalog.metrics). Scrapers must send "Authorization: Bearer <token>";
+# without DJANGO_METRICS_TOKEN only logged-in staff can read them, so production needs it set for
+# scraping. gunicorn.conf.py points PROMETHEUS_MULTIPROC_DIR at a shared directory so every
+# worker's values are summed.
+METRICS_TOKEN = os.environ.get('DJANGO_METRICS_TOKEN', '')
+
+# Database sessions that also count their operations for the metrics above.
+SESSION_ENGINE = 'catalog.sessions'
+
+# How the home page counts visits (catalog.visits): 'session' saves the session on every visit, 'buffered' keeps
+# anonymous counts in a signed cookie and writes logged-in users' counts to their sessions in batches.
+VISIT_COUNTER = os.environ.get('DJANGO_VISIT_COUNTER', 'session' if DEBUG else 'buffered')
+VISIT_FLUSH_SIZE = 500
+VISIT_FLUSH_SECONDS = 30
+
+
+# Serve the read-only pages with the async views of catalog.async_views. LocalLibrary/asgi.py turns this on unless
+# DJANGO_ASYNC_VIEWS says otherwise; under WSGI the class-based views are used.
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS', '') == 'True'
+
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
@@ -90,6 +133,59 @@ DATABASES = {
     }
 }
 
+# Serve SQLite to several gunicorn workers: WAL journaling, relaxed fsync, a busy timeout, BEGIN IMMEDIATE
+# transactions (catalog.backends.sqlite3) and persistent connections. Applies to any SQLite database, including one
+# from DATABASE_URL. On by default whenever DEBUG is off; DJANGO_SQLITE_PRODUCTION=True/False overrides it.
+SQLITE_PRODUCTION = os.environ.get('DJANGO_SQLITE_PRODUCTION', str(not DEBUG)) == 'True'
+
+# Read replicas, as space separated database URLs in DATABASE_REPLICA_URLS; they become the aliases replica1,
+# replica2, ... GET requests to the views below read from a replica (catalog.routers), unless the request or, for
+# REPLICA_PIN_SECONDS afterwards, the browser wrote something. For a local stand-in, point DATABASE_URL and
+# DATABASE_REPLICA_URLS at two SQLite files and copy one onto the other with "manage.py sync_sqlite_replicas".
+DATABASE_ROUTERS = ['catalog.routers.ReplicaRouter']
+REPLICA_READ_VIEWS = ['books', 'book-detail', 'authors', 'author-detail', 'genres', 'genre-detail', 'languages',
+                      'language-detail']
+REPLICA_PIN_SECONDS = int(os.environ.get('DJANGO_REPLICA_PIN_SECONDS', '10'))
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+# Backends for the anonymous page and fragment cache (catalog.pagecache), chosen with PAGE_CACHE_BACKEND.
+# Its invalidation tokens live in the same cache, so with several gunicorn workers use 'file' or 'redis'
+# (which needs the django-redis package); 'locmem' workers only see each other's changes after PAGE_CACHE_TIMEOUT.
+# 'none' caches nothing, e.g. to benchmark rendering.
+PAGE_CACHE_BACKENDS = {
+    'none': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'pages',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('PAGE_CACHE_LOCATION', os.path.join(BASE_DIR, '.page_cache')),
+    },
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'pages': PAGE_CACHE_BACKENDS[os.environ.get('PAGE_CACHE_BACKEND', 'locmem')],
+}
+
+PAGE_CACHE_TIMEOUT = 300
+
+# Seconds the home page counters may be served from cache. Save/delete signals invalidate them
+# earlier, but with a per-process cache other gunicorn workers only notice after this timeout.
+CATALOG_STATS_TIMEOUT = 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -145,6 +241,20 @@ LOGIN_REDIRECT_URL = '/'
 db_from_env = dj_database_url.config(conn_max_age=500)
 DATABASES['default'].update(db_from_env)
 
+for number, url in enumerate(os.environ.get('DATABASE_REPLICA_URLS', '').split(), start=1):
+    # Tests run every alias against the test copy of the primary.
+    DATABASES[f'replica{number}'] = {**dj_database_url.parse(url, conn_max_age=500), 'TEST': {'MIRROR': 'default'}}
+
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Test on a file rather than in memory, so tests can use several connections at once, as the loan race check
+    # in catalog.tests.test_loans does.
+    DATABASES['default'].setdefault('TEST', {}).setdefault('NAME', BASE_DIR / 'test_db.sqlite3')
+
+for database in DATABASES.values():
+    if SQLITE_PRODUCTION and database['ENGINE'] == 'django.db.backends.sqlite3':
+        database['ENGINE'] = 'catalog.backends.sqlite3'
+        database.setdefault('CONN_MAX_AGE', 500)
+
 # Simplified static file serving.
 # https://warehouse.python.org/project/whitenoise/
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
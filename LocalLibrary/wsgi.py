@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LocalLibrary.settings')
 
 application = get_wsgi_application()
+
+# Runs in every gunicorn worker as it loads the app (or once in the master with --preload), before any request.
+from django.conf import settings  # noqa: E402
+
+if settings.PRELOAD_TEMPLATES:
+    from catalog.templatecache import preload_templates  # noqa: E402
+    preload_templates()
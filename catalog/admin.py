@@ -1,36 +1,133 @@
 from django.contrib import admin
-from .models import Author, Book, BookInstance, Genre, Language
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Prefetch
+from django.forms.models import BaseInlineFormSet
+from django.utils.functional import cached_property
+
+from .models import Author, Book, BookInstance, Genre, Hold, Language
 
 # admin.site.register(Author)
 # admin.site.register(Book)
 # admin.site.register(BookInstance)
-admin.site.register(Genre)
-admin.site.register(Language)
 
 
-class BookInline(admin.TabularInline):
+def estimated_count(model, using='default'):
+    """
+    The number of rows in ``model``'s table as the database estimates it, or None if it has no estimate.
+
+    SQLite answers with the largest rowid, which rows deleted since overestimate; PostgreSQL with the planner's row
+    estimate as of the last ``ANALYZE``.
+    """
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'SELECT max(_rowid_) FROM {table}')
+        elif connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+        else:
+            return None
+        row = cursor.fetchone()
+    # PostgreSQL reports -1 for tables never analyzed.
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginates a whole large table by its estimated size, as an exact COUNT(*) has to read all of it."""
+    estimate_above = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.estimate_above:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # No "N total" next to filtered results, which would count the whole table
+    show_full_result_count = False
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """An inline formset for one page of the related objects, the page chosen with ``?<prefix>-page=N``."""
+    per_page = 20
+    params = {}
+
+    def get_queryset(self):
+        if not hasattr(self, 'page'):
+            self.paginator = Paginator(super().get_queryset(), self.per_page)
+            self.page = self.paginator.get_page(self.params.get(f'{self.prefix}-page'))
+            self._queryset = self.page.object_list
+        return self._queryset
+
+
+class PaginatedTabularInline(admin.TabularInline):
+    formset = PaginatedInlineFormSet
+    template = 'admin/edit_inline/paginated_tabular.html'
+    per_page = 20
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.params = request.GET
+        formset.per_page = self.per_page
+        return formset
+
+
+@admin.register(Genre)
+class GenreAdmin(admin.ModelAdmin):
+    search_fields = ['^name']
+
+
+@admin.register(Language)
+class LanguageAdmin(admin.ModelAdmin):
+    search_fields = ['^name']
+
+
+class BookInline(PaginatedTabularInline):
     model = Book
     extra = 0
+    autocomplete_fields = ['genre', 'language_of_origin']
 
-class AuthorAdmin(admin.ModelAdmin):
+class AuthorAdmin(LargeTableAdmin):
     list_display = ('last_name', 'first_name', 'date_of_birth', 'date_of_death')
     fields = ['first_name', 'last_name', ('date_of_birth', 'date_of_death')]
+    search_fields = ['^last_name', '^first_name']
     inlines = [BookInline]
 admin.site.register(Author, AuthorAdmin)
 
-class BookInstanceInline(admin.TabularInline):
+class BookInstanceInline(PaginatedTabularInline):
     model = BookInstance
     extra = 0
+    autocomplete_fields = ['borrower', 'language']
+
+    def get_queryset(self, request):
+        # Each row's title shows the copy's book
+        return super().get_queryset(request).select_related('book')
 
 @admin.register(Book)
-class BookAdmin(admin.ModelAdmin):
+class BookAdmin(LargeTableAdmin):
     list_display = ('title', 'author', 'display_genre')
+    list_select_related = ('author',)
+    search_fields = ['^title', '=isbn']
+    autocomplete_fields = ['author', 'genre', 'language_of_origin']
     inlines = [BookInstanceInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(Prefetch('genre', Genre.objects.order_by('name')))
+
 @admin.register(BookInstance)
-class BookInstanceAdmin(admin.ModelAdmin):
+class BookInstanceAdmin(LargeTableAdmin):
     list_display = ('book', 'status', 'borrower', 'due_back', 'id')
     list_filter = ('status', 'due_back')
+    list_select_related = ('book', 'borrower')
+    # Django would break ties by -pk, which bookinstance_due_idx cannot serve; ascending, it reads pages off the index
+    ordering = ('due_back', 'id')
+    autocomplete_fields = ['book', 'borrower']
     fieldsets = (
         (None, {
             'fields': ('book', 'imprint', 'id')
@@ -39,3 +136,11 @@ class BookInstanceAdmin(admin.ModelAdmin):
             'fields': ('status', 'due_back', 'borrower')
         }),
     )
+
+@admin.register(Hold)
+class HoldAdmin(LargeTableAdmin):
+    list_display = ('book', 'patron', 'status', 'placed_at', 'expires_at')
+    list_filter = ('status',)
+    list_select_related = ('book', 'patron')
+    autocomplete_fields = ['book', 'patron']
+    raw_id_fields = ['copy']
@@ -0,0 +1,257 @@
+"""
+Read-only JSON API for the catalog.
+
+Every resource has a compact default projection that clients can change with ``?fields=a,b``; only the columns and
+joins the chosen fields need are queried. Lists are keyset paginated (``?limit=`` and opaque ``next``/``previous``
+URLs). Responses carry a strong ``ETag`` and ``Last-Modified`` derived from the ``TableVersion`` counters of the tables
+a resource reads, so an unchanged poll costs one primary key lookup and returns ``304 Not Modified``.
+"""
+import hashlib
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views import generic
+from django.views.generic.list import MultipleObjectMixin
+
+from .models import Author, Book, BookInstance, Genre, Language
+from .pagination import CursorPaginationMixin
+from .versions import get_versions
+
+
+class Field:
+    """
+    An API field read from ``source``, an attribute name or a callable taking the object.
+
+    ``only``, ``select_related`` and ``prefetch_related`` name what the queryset must load for it.
+    """
+
+    def __init__(self, source, only=None, select_related=None, prefetch_related=None):
+        self.source = source
+        self.only = only if only is not None else (source,) if isinstance(source, str) else ()
+        self.select_related = select_related
+        self.prefetch_related = prefetch_related
+
+    def get(self, obj):
+        return self.source(obj) if callable(self.source) else getattr(obj, self.source)
+
+
+def _name(relation):
+    def get(obj):
+        related = getattr(obj, relation)
+        return related.name if related is not None else None
+    return Field(get, only=(f'{relation}__name',), select_related=relation)
+
+
+def _url(obj):
+    return obj.get_absolute_url()
+
+
+class ApiView(generic.View):
+    model = None
+    fields = {}
+    default_fields = ()
+    # Models whose changes can alter this resource's output
+    depends_on = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return self.http_method_not_allowed(request, *args, **kwargs)
+
+        versions = get_versions(*self.depends_on)
+        signature = f'{request.get_full_path()}|' + '|'.join(f'{table}:{version}'
+                                                            for table, (version, _) in sorted(versions.items()))
+        etag = quote_etag(hashlib.sha1(signature.encode()).hexdigest())
+        changed = [updated_at for _, updated_at in versions.values() if updated_at is not None]
+        last_modified = int(max(changed).timestamp()) if changed else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def get_selected_fields(self):
+        requested = self.request.GET.get('fields')
+        if not requested:
+            return list(self.default_fields)
+        selected = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = sorted(set(selected) - set(self.fields))
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(unknown)}. Choose from: {", ".join(self.fields)}.')
+        return selected
+
+    def get_projected_queryset(self, selected, extra_only=()):
+        queryset = self.model.objects.all()
+        only = {'pk', *extra_only}
+        for name in selected:
+            field = self.fields[name]
+            only.update(field.only)
+            if field.select_related:
+                queryset = queryset.select_related(field.select_related)
+            if field.prefetch_related:
+                queryset = queryset.prefetch_related(field.prefetch_related)
+        return queryset.only(*only)
+
+    def serialize(self, obj, selected):
+        return {name: self.fields[name].get(obj) for name in selected}
+
+    @staticmethod
+    def error(message, status=400):
+        return JsonResponse({'error': message}, status=status)
+
+
+class ApiListView(ApiView, CursorPaginationMixin, MultipleObjectMixin):
+    paginate_by = 20
+    max_paginate_by = 100
+    allow_offset_pagination = False
+
+    def get_paginate_by(self, queryset):
+        try:
+            limit = int(self.request.GET.get('limit', self.paginate_by))
+        except ValueError:
+            limit = self.paginate_by
+        return max(1, min(limit, self.max_paginate_by))
+
+    def get(self, request, *args, **kwargs):
+        try:
+            selected = self.get_selected_fields()
+        except ValueError as e:
+            return self.error(str(e))
+
+        queryset = self.model.objects.all()
+        ordering = [field.lstrip('-') for field in self.get_cursor_ordering(queryset)]
+        queryset = self.get_projected_queryset(selected, extra_only=[name for name in ordering if name != 'pk'])
+        _paginator, page, objects, _is_paginated = self.paginate_queryset(queryset, self.get_paginate_by(queryset))
+        return JsonResponse({
+            'results': [self.serialize(obj, selected) for obj in objects],
+            'next': page.next_url and request.build_absolute_uri(page.next_url),
+            'previous': page.previous_url and request.build_absolute_uri(page.previous_url),
+        }, json_dumps_params={'separators': (',', ':')})
+
+
+class ApiDetailView(ApiView):
+    def get(self, request, pk):
+        try:
+            selected = self.get_selected_fields()
+        except ValueError as e:
+            return self.error(str(e))
+        obj = get_object_or_404(self.get_projected_queryset(selected), pk=pk)
+        return JsonResponse(self.serialize(obj, selected), json_dumps_params={'separators': (',', ':')})
+
+
+class BookApi:
+    model = Book
+    depends_on = (Book, Author, Genre, Language)
+    fields = {
+        'id': Field('id'),
+        'title': Field('title'),
+        'isbn': Field('isbn'),
+        'summary': Field('summary'),
+        'author': Field('author_id'),
+        'author_name': Field(lambda book: str(book.author) if book.author_id else None,
+                             only=('author__first_name', 'author__last_name'), select_related='author'),
+        'language': _name('language_of_origin'),
+        'genres': Field(lambda book: [genre.name for genre in book.genre.all()], prefetch_related='genre'),
+        'copies_total': Field('copies_total'),
+        'copies_available': Field('copies_available'),
+        'copies_on_loan': Field('copies_on_loan'),
+        'copies_reserved': Field('copies_reserved'),
+        'copies_maintenance': Field('copies_maintenance'),
+        'earliest_due_back': Field('earliest_due_back'),
+        'url': Field(_url, only=()),
+    }
+    default_fields = ('id', 'title', 'author_name', 'isbn', 'copies_available')
+
+
+class AuthorApi:
+    model = Author
+    depends_on = (Author,)
+    fields = {
+        'id': Field('id'),
+        'first_name': Field('first_name'),
+        'last_name': Field('last_name'),
+        'date_of_birth': Field('date_of_birth'),
+        'date_of_death': Field('date_of_death'),
+        'url': Field(_url, only=()),
+    }
+    default_fields = ('id', 'first_name', 'last_name')
+
+
+class GenreApi:
+    model = Genre
+    depends_on = (Genre,)
+    cursor_ordering = ['name']
+    fields = {
+        'id': Field('id'),
+        'name': Field('name'),
+        'url': Field(_url, only=()),
+    }
+    default_fields = ('id', 'name')
+
+
+class LanguageApi(GenreApi):
+    model = Language
+    depends_on = (Language,)
+
+
+class BookInstanceApi:
+    model = BookInstance
+    depends_on = (BookInstance, Book, Language)
+    fields = {
+        'id': Field('id'),
+        'book': Field('book_id'),
+        'title': Field(lambda copy: copy.book.title if copy.book_id else None,
+                       only=('book__title',), select_related='book'),
+        'imprint': Field('imprint'),
+        'status': Field('status'),
+        'due_back': Field('due_back'),
+        'language': _name('language'),
+        'url': Field(_url, only=()),
+    }
+    default_fields = ('id', 'book', 'status', 'due_back')
+
+
+class BookList(BookApi, ApiListView):
+    pass
+
+
+class BookDetail(BookApi, ApiDetailView):
+    pass
+
+
+class AuthorList(AuthorApi, ApiListView):
+    pass
+
+
+class AuthorDetail(AuthorApi, ApiDetailView):
+    pass
+
+
+class GenreList(GenreApi, ApiListView):
+    pass
+
+
+class GenreDetail(GenreApi, ApiDetailView):
+    pass
+
+
+class LanguageList(LanguageApi, ApiListView):
+    pass
+
+
+class LanguageDetail(LanguageApi, ApiDetailView):
+    pass
+
+
+class BookInstanceList(BookInstanceApi, ApiListView):
+    pass
+
+
+class BookInstanceDetail(BookInstanceApi, ApiDetailView):
+    pass
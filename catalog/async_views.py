@@ -0,0 +1,158 @@
+"""
+Async versions of the read-only catalog pages, served in place of those in ``catalog.views`` when ``ASYNC_VIEWS`` is
+on, as ``LocalLibrary/asgi.py`` makes it by default.
+
+Django 3.2's ORM is synchronous, so queries still run on threads. What these views add is that a page's independent
+queries run at the same time, each on a pool thread with its own database connection: the home page counters load
+while the visit is counted, a book page fetches the book, its copies and its genres at once, and an author, genre or
+language page fetches the object and its books or copies at once. Pool connections are closed after each query, or
+kept for reuse when ``CONN_MAX_AGE`` allows, as at the end of a request. Pages built from one paginated query (the
+lists and borrowed lists) have nothing to overlap, so they run their class-based view on a thread.
+
+Queries on pool threads run the request's ``query_hook`` hooks (see ``catalog.queryhooks``), so profiling and request
+metrics count them, but they cannot see rows of a transaction still open on the request's connection.
+"""
+import asyncio
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import Http404
+from django.shortcuts import render
+from django.urls import path
+
+from . import views, visits
+from .models import Author, Book, BookInstance, Genre, Language
+from .pagecache import cache_page, get_cached_page
+from .stats import get_catalog_stats
+
+
+def _on_own_connection(func):
+    try:
+        return func()
+    finally:
+        close_old_connections()
+
+
+def in_pool(func):
+    """Awaitable running ``func`` on a pool thread, with that thread's own database connection."""
+    return sync_to_async(_on_own_connection, thread_sensitive=False)(func)
+
+
+def set_prefetched(obj, accessor, rows):
+    """Attach ``rows`` to ``obj`` as ``prefetch_related(accessor)`` would, so templates use them without a query."""
+    manager = getattr(obj, accessor)
+    name = getattr(manager, 'prefetch_cache_name', None) or manager.field.remote_field.get_cache_name()
+    queryset = manager.get_queryset()
+    queryset._result_cache = rows
+    queryset._prefetch_done = True
+    obj._prefetched_objects_cache = {**getattr(obj, '_prefetched_objects_cache', {}), name: queryset}
+
+
+async def render_async(request, template_name, context):
+    # Rendering may query too (permissions for {{ perms }}), so it runs on the request's thread.
+    return await sync_to_async(render)(request, template_name, context)
+
+
+def on_thread(view):
+    """An async view running the synchronous ``view`` on the request's thread."""
+    view = sync_to_async(view)
+
+    async def wrapper(request, *args, **kwargs):
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def anonymous_page_cache(dependencies):
+    """Async ``AnonymousPageCacheMixin``: ``dependencies(**kwargs)`` lists what the page shows."""
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            is_anonymous = await sync_to_async(lambda: request.user.is_anonymous)()
+            if request.method != 'GET' or not is_anonymous:
+                return await view(request, *args, **kwargs)
+            key, response = await sync_to_async(get_cached_page)(request, dependencies(**kwargs))
+            if response is not None:
+                return response
+            return await sync_to_async(cache_page)(key, await view(request, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def get_or_404(queryset, pk):
+    obj = queryset.filter(pk=pk).first()
+    if obj is None:
+        raise Http404(f'No {queryset.model._meta.verbose_name} with id {pk}.')
+    return obj
+
+
+async def index(request):
+    stats, num_visits = await asyncio.gather(
+        in_pool(get_catalog_stats),
+        sync_to_async(visits.count_visit)(request),
+    )
+    response = await render_async(request, 'index.html', {**stats, 'num_visits': num_visits})
+    return visits.set_cookie(request, response)
+
+
+@anonymous_page_cache(lambda pk: [('book', pk)])
+async def book_detail(request, pk):
+    book, copies, genres = await asyncio.gather(
+        in_pool(lambda: get_or_404(Book.objects.select_related('author', 'language_of_origin'), pk)),
+        in_pool(lambda: list(BookInstance.objects.filter(book_id=pk))),
+        in_pool(lambda: list(Genre.objects.filter(book=pk))),
+    )
+    set_prefetched(book, 'bookinstance_set', copies)
+    set_prefetched(book, 'genre', genres)
+    return await render_async(request, 'catalog/book_detail.html', {'object': book, 'book': book})
+
+
+@anonymous_page_cache(lambda pk: [('author', pk)])
+async def author_detail(request, pk):
+    author, books = await asyncio.gather(
+        in_pool(lambda: get_or_404(Author.objects.all(), pk)),
+        in_pool(lambda: list(Book.objects.filter(author_id=pk).only('title', 'summary', 'author_id'))),
+    )
+    set_prefetched(author, 'book_set', books)
+    return await render_async(request, 'catalog/author_detail.html', {'object': author, 'author': author})
+
+
+@anonymous_page_cache(lambda pk: [('genre', pk)])
+async def genre_detail(request, pk):
+    genre, books = await asyncio.gather(
+        in_pool(lambda: get_or_404(Genre.objects.all(), pk)),
+        in_pool(lambda: list(Book.objects.filter(genre=pk).only('title', 'summary'))),
+    )
+    set_prefetched(genre, 'book_set', books)
+    return await render_async(request, 'catalog/genre_detail.html', {'object': genre, 'genre': genre})
+
+
+async def language_detail(request, pk):
+    language, copies = await asyncio.gather(
+        in_pool(lambda: get_or_404(Language.objects.all(), pk)),
+        in_pool(lambda: list(BookInstance.objects.filter(language_id=pk))),
+    )
+    set_prefetched(language, 'bookinstance_set', copies)
+    return await render_async(request, 'catalog/language_detail.html', {'object': language, 'language': language})
+
+
+# URL name -> async view
+VIEWS = {
+    'index': index,
+    'books': on_thread(views.BookListView.as_view()),
+    'book-detail': book_detail,
+    'authors': on_thread(views.AuthorListView.as_view()),
+    'author-detail': author_detail,
+    'genres': on_thread(views.GenreList.as_view()),
+    'genre-detail': genre_detail,
+    'languages': on_thread(views.LanguageList.as_view()),
+    'language-detail': language_detail,
+    'my-borrowed': on_thread(views.LoanedBooksByUserListView.as_view()),
+    'all-borrowed': on_thread(views.LoanedBooksListView.as_view()),
+}
+
+
+def use_async_views(urlpatterns):
+    """``urlpatterns`` with the views named in ``VIEWS`` replaced by their async versions."""
+    return [path(str(pattern.pattern), VIEWS[pattern.name], name=pattern.name) if pattern.name in VIEWS else pattern
+            for pattern in urlpatterns]
@@ -0,0 +1,62 @@
+"""
+Per-book availability counters.
+
+``Book.copies_*`` and ``Book.earliest_due_back`` summarize the book's copies so lists can filter on availability
+without joining and grouping every ``BookInstance``. They are recomputed from the copies in the same transaction as
+every change to them, after locking the affected book rows so concurrent changes to one book apply in turn.
+"""
+from django.db import transaction
+from django.db.models import Count, IntegerField, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from . import pagecache
+from .models import Book, BookInstance
+from .versions import bump
+
+COUNTERS = {
+    'copies_total': None,
+    'copies_available': 'a',
+    'copies_on_loan': 'o',
+    'copies_reserved': 'r',
+    'copies_maintenance': 'm',
+}
+
+
+def availability_expressions(book_instance_model=BookInstance):
+    """``update()`` keyword arguments recomputing every counter with a correlated subquery."""
+    copies = book_instance_model.objects.filter(book=OuterRef('pk')).order_by().values('book')
+
+    def count(status):
+        filtered = copies if status is None else copies.filter(status=status)
+        return Coalesce(Subquery(filtered.annotate(n=Count('pk')).values('n')), Value(0),
+                        output_field=IntegerField())
+
+    expressions = {name: count(status) for name, status in COUNTERS.items()}
+    expressions['earliest_due_back'] = Subquery(
+        copies.filter(status='o').annotate(due=Min('due_back')).values('due'))
+    return expressions
+
+
+def refresh_availability(book_ids):
+    """Recompute the counters of the given books."""
+    book_ids = sorted({book_id for book_id in book_ids if book_id is not None})
+    if not book_ids:
+        return
+    with transaction.atomic():
+        # Lock in a fixed order so two transactions touching the same books cannot deadlock.
+        list(Book.objects.select_for_update().filter(pk__in=book_ids).order_by('pk').values_list('pk', flat=True))
+        Book.objects.filter(pk__in=book_ids).update(**availability_expressions())
+        bump(Book)
+        pagecache.bump([('book', None), *(('book', book_id) for book_id in book_ids)])
+
+
+def repair_availability(batch_size=1000):
+    """Recompute the counters of every book in primary key batches. Yields the number of books per batch."""
+    last_id = 0
+    while True:
+        ids = list(Book.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        refresh_availability(ids)
+        last_id = ids[-1]
+        yield len(ids)
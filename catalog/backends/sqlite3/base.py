@@ -0,0 +1,46 @@
+"""
+SQLite tuned for several worker processes sharing one database file.
+
+Use ``'ENGINE': 'catalog.backends.sqlite3'``. On every new connection the ``connection_created`` hook below runs
+``PRAGMAS``, updated with ``OPTIONS['pragmas']``:
+
+- ``journal_mode=WAL`` lets readers carry on while a write commits, instead of failing with "database is locked".
+- ``synchronous=NORMAL`` fsyncs at WAL checkpoints instead of on every commit. A power cut can lose the last commits,
+  but never corrupts the database.
+- ``busy_timeout`` makes a writer wait that many milliseconds for the lock before giving up.
+- ``cache_size`` (negative: KiB) and ``mmap_size`` (bytes) keep the hot pages in memory.
+
+Transactions begin with ``BEGIN IMMEDIATE`` (``OPTIONS['transaction_mode']``), which takes the write lock up front.
+A plain ``BEGIN`` takes it at the first write, and if another connection wrote in between the transaction fails at
+once, whatever the busy timeout, because it read data that is no longer current.
+"""
+from django.db.backends.signals import connection_created
+from django.db.backends.sqlite3 import base
+from django.dispatch import receiver
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = {**PRAGMAS, **params.pop('pragmas', {})}
+        self.transaction_mode = params.pop('transaction_mode', 'IMMEDIATE')
+        return params
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
+
+
+@receiver(connection_created, sender=DatabaseWrapper)
+def apply_pragmas(sender, connection, **kwargs):
+    with connection.cursor() as cursor:
+        for name, value in connection.pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,270 @@
+"""
+HTTP load generator for the catalog.
+
+Client threads replay a weighted mix of scripted requests (``MIXES``) against the WSGI app: home page visits, and list
+and detail browsing as an anonymous visitor, borrowed lists as a logged-in reader or librarian, renewals as a
+librarian, and fresh logins. Target ids are sampled from the database, so run ``generate_catalog`` first. The server
+is either started in this process on a threaded ``wsgiref`` server, which shares the interpreter with the clients and
+so understates throughput, or any running server given by URL, such as gunicorn on the same database.
+
+Query counts come from the ``Server-Timing`` header of ``catalog.profiling``; the in-process server turns profiling
+on, an external server needs ``DJANGO_REQUEST_PROFILING=True``. Reports are plain dicts that ``compare`` can diff
+against a report saved from another commit.
+"""
+import datetime
+import http.client
+import random
+import re
+import subprocess
+import threading
+import time
+from socketserver import ThreadingMixIn
+from urllib.parse import urlencode, urlsplit
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.contrib.auth.models import Permission, User
+from django.urls import reverse
+
+from .models import Author, Book, BookInstance, Genre
+from .pagination import encode_cursor
+from .profiling import percentile
+from .synthetic import SYNTHETIC_PASSWORD
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries')
+
+# Scenario weights per mix. Each scenario is one timed request.
+MIXES = {
+    'browse': {'book_list': 30, 'book_list_next': 10, 'book_detail': 25, 'author_detail': 10, 'genre_detail': 10,
+               'my_borrowed': 5, 'all_borrowed': 4, 'renew': 4, 'login': 2},
+    'read-only': {'book_list': 35, 'book_list_next': 10, 'book_detail': 35, 'author_detail': 10, 'genre_detail': 10},
+    'librarian': {'all_borrowed': 40, 'renew': 40, 'book_detail': 20},
+    'home': {'home': 50, 'home_reader': 30, 'home_crawler': 20},
+}
+
+
+class Session:
+    """A cookie-keeping HTTP client; every request uses a new connection."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.cookies = {}
+
+    def request(self, method, path, data=None):
+        headers = {'Host': f'{self.host}:{self.port}'}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        body = None
+        if data is not None:
+            body = urlencode({**data, 'csrfmiddlewaretoken': self.cookies.get('csrftoken', '')})
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        started = time.perf_counter()
+        try:
+            connection.request(method, self.prefix + path, body, headers)
+            response = connection.getresponse()
+            response.read()
+        finally:
+            connection.close()
+        elapsed = time.perf_counter() - started
+
+        for cookie in response.headers.get_all('Set-Cookie') or []:
+            name, _, value = cookie.split(';', 1)[0].partition('=')
+            self.cookies[name.strip()] = value.strip()
+        match = SERVER_TIMING_QUERIES.search(response.headers.get('Server-Timing', ''))
+        return response.status, elapsed, int(match.group(1)) if match else None
+
+    def login(self, username):
+        self.request('GET', reverse('login'))
+        status, elapsed, queries = self.request('POST', reverse('login'),
+                                                {'username': username, 'password': SYNTHETIC_PASSWORD})
+        if status != 302:
+            raise RuntimeError(f'Logging in as {username} failed with status {status}.')
+        return status, elapsed, queries
+
+
+class Targets:
+    """Ids and user names sampled, reproducibly for a given seed and catalog, for scenarios to pick from."""
+
+    def __init__(self, sample=1000, seed=0):
+        rng = random.Random(seed)
+
+        def pick(queryset):
+            values = list(queryset)
+            return rng.sample(values, min(sample, len(values)))
+
+        books = pick(Book.objects.order_by('pk').values_list('title', 'pk'))
+        self.books = [pk for _title, pk in books]
+        # Cursors in BookListView's ordering, (title, pk), to land on pages deep in the list
+        self.cursors = [encode_cursor([title, pk]) for title, pk in books]
+        self.authors = pick(Author.objects.order_by('pk').values_list('pk', flat=True))
+        self.genres = list(Genre.objects.order_by('pk').values_list('pk', flat=True))
+        self.loans = pick(BookInstance.objects.on_loan().order_by('pk').values_list('pk', flat=True))
+        self.readers = pick(User.objects.filter(username__startswith='reader-', bookinstance__status='o')
+                            .order_by('username').values_list('username', flat=True).distinct())
+        permission = Permission.objects.get(codename='can_mark_returned')
+        self.librarians = pick(User.objects.filter(username__startswith='librarian-', user_permissions=permission)
+                               .order_by('username').values_list('username', flat=True))
+        if not (self.books and self.authors and self.genres and self.readers and self.librarians):
+            raise RuntimeError('The database has no synthetic catalog; run "manage.py generate_catalog" first.')
+
+
+class Client:
+    """One simulated user with an anonymous, a reader and a librarian session."""
+
+    def __init__(self, base_url, targets, rng):
+        self.base_url = base_url
+        self.targets = targets
+        self.rng = rng
+        self.anonymous = Session(base_url)
+        self.reader = Session(base_url)
+        self.reader.login(rng.choice(targets.readers))
+        self.librarian = Session(base_url)
+        self.librarian.login(rng.choice(targets.librarians))
+
+    def home(self):
+        return self.anonymous.request('GET', reverse('index'))
+
+    def home_reader(self):
+        return self.reader.request('GET', reverse('index'))
+
+    def home_crawler(self):
+        # A client that keeps no cookies, so every visit is a first one.
+        return Session(self.base_url).request('GET', reverse('index'))
+
+    def book_list(self):
+        return self.anonymous.request('GET', reverse('books'))
+
+    def book_list_next(self):
+        # A page deep inside the book list, as reached by following "next" links.
+        query = urlencode({'cursor': self.rng.choice(self.targets.cursors)})
+        return self.anonymous.request('GET', f'{reverse("books")}?{query}')
+
+    def book_detail(self):
+        return self.anonymous.request('GET', reverse('book-detail', args=[self.rng.choice(self.targets.books)]))
+
+    def author_detail(self):
+        return self.anonymous.request('GET', reverse('author-detail', args=[self.rng.choice(self.targets.authors)]))
+
+    def genre_detail(self):
+        return self.anonymous.request('GET', reverse('genre-detail', args=[self.rng.choice(self.targets.genres)]))
+
+    def my_borrowed(self):
+        return self.reader.request('GET', reverse('my-borrowed'))
+
+    def all_borrowed(self):
+        return self.librarian.request('GET', reverse('all-borrowed'))
+
+    def renew(self):
+        copy_id = self.rng.choice(self.targets.loans)
+        renewal_date = datetime.date.today() + datetime.timedelta(days=self.rng.randint(1, 28))
+        return self.librarian.request('POST', reverse('renew-book-librarian', args=[copy_id]),
+                                      {'renewal_date': renewal_date.isoformat()})
+
+    def login(self):
+        return Session(self.base_url).login(self.rng.choice(self.targets.readers))
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_in_thread(application):
+    """Start ``application`` on a free local port; return the server and its base URL."""
+    server = make_server('127.0.0.1', 0, application, server_class=ThreadingWSGIServer, handler_class=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def run(base_url, mix='browse', clients=8, duration=10.0, seed=0, targets=None):
+    """Replay ``mix`` from ``clients`` threads for ``duration`` seconds and return the report."""
+    weights = MIXES[mix]
+    targets = targets or Targets(seed=seed)
+    samples = {scenario: [] for scenario in weights}
+    lock = threading.Lock()
+    errors = []
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        try:
+            client = Client(base_url, targets, rng)
+        except Exception as e:
+            with lock:
+                errors.append(repr(e))
+            return
+        scenarios, scenario_weights = zip(*weights.items())
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            scenario = rng.choices(scenarios, scenario_weights)[0]
+            try:
+                sample = getattr(client, scenario)()
+            except (OSError, http.client.HTTPException) as e:
+                sample = (None, 0.0, None)
+                with lock:
+                    errors.append(f'{scenario}: {e!r}')
+            with lock:
+                samples[scenario].append(sample)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'commit': current_commit(),
+        'mix': mix,
+        'clients': clients,
+        'duration': round(elapsed, 2),
+        'catalog': {'books': Book.objects.count(), 'copies': BookInstance.objects.count()},
+        'errors': errors[:20],
+        'scenarios': {scenario: summarize(rows, elapsed) for scenario, rows in samples.items()},
+        'total': summarize([row for rows in samples.values() for row in rows], elapsed),
+    }
+
+
+def summarize(samples, elapsed):
+    ok = sorted(seconds * 1000 for status, seconds, _queries in samples if status is not None and status < 400)
+    queries = [count for status, _seconds, count in samples if count is not None]
+    return {
+        'requests': len(samples),
+        'errors': len(samples) - len(ok),
+        'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(ok, 0.5), 2) if ok else None,
+        'p95_ms': round(percentile(ok, 0.95), 2) if ok else None,
+        'p99_ms': round(percentile(ok, 0.99), 2) if ok else None,
+        'queries_avg': round(sum(queries) / len(queries), 1) if queries else None,
+    }
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, report):
+    """Per scenario, the change of throughput and latency percentiles from ``baseline`` to ``report`` in percent."""
+    changes = {}
+    for scenario, row in {**report['scenarios'], 'total': report['total']}.items():
+        before = baseline['scenarios'].get(scenario) if scenario != 'total' else baseline['total']
+        if not before:
+            continue
+        changes[scenario] = {
+            field: round((row[field] - before[field]) / before[field] * 100, 1)
+            for field in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_avg')
+            if row.get(field) is not None and before.get(field)
+        }
+    return changes
@@ -1,12 +1,15 @@
-import datetime
-
 from django import forms
+from django.contrib.auth.models import User
 
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.forms import ModelForm
 from django.utils.translation import ugettext_lazy as _
 
-from catalog.models import BookInstance
+from catalog import holds
+from catalog.loans import BATCH_OPERATIONS, check_renewal_date, loans_changed, parse_copy_ids
+from catalog.models import Book, BookInstance
+from catalog.widgets import AutocompleteSelect, AutocompleteSelectMultiple
 
 
 class RenewBookForm(forms.Form):
@@ -14,27 +17,103 @@ class RenewBookForm(forms.Form):
 
     def clean_renewal_date(self):
         data = self.cleaned_data['renewal_date']
+        check_renewal_date(data)
+        return data
 
-        if data < datetime.date.today():
-            raise ValidationError(_('Invalid date - renewal in past'))
 
-        if data > datetime.date.today() + datetime.timedelta(weeks=4):
-            raise ValidationError(_('Invalid date - renewal more than 4 weeks ahead'))
+class CheckoutBookForm(forms.Form):
+    borrower = forms.ModelChoiceField(queryset=User.objects.order_by('username'), widget=AutocompleteSelect('user'))
+    due_back = forms.DateField(help_text='Enter a date between now and 4 weeks (default 3).')
 
+    def clean_due_back(self):
+        data = self.cleaned_data['due_back']
+        check_renewal_date(data)
         return data
 
+class BookForm(ModelForm):
+    class Meta:
+        model = Book
+        fields = ['title', 'author', 'summary', 'isbn', 'genre', 'language_of_origin']
+        widgets = {
+            'author': AutocompleteSelect('author'),
+            'genre': AutocompleteSelectMultiple('genre'),
+            'language_of_origin': AutocompleteSelect('language'),
+        }
+
+
+def _serve_holds(copy):
+    """Set a copy just saved as available aside for the next patron waiting for its book, if any."""
+    if holds.allocate([copy.pk]):
+        loans_changed([copy.pk])
+        copy.refresh_from_db(fields=['status', 'borrower', 'due_back'])
+
+
+class BookInstanceForm(ModelForm):
+    # A new copy is on the shelf or in maintenance; lending it goes through the loan workflow
+    status = forms.ChoiceField(choices=[('a', 'Available'), ('m', 'Maintenance')], initial='a')
+
+    class Meta:
+        model = BookInstance
+        fields = ['book', 'language', 'imprint', 'status']
+        widgets = {
+            'book': AutocompleteSelect('book'),
+            'language': AutocompleteSelect('language'),
+        }
+
+    def save(self, commit=True):
+        if not commit:
+            return super().save(commit=False)
+        with transaction.atomic():
+            _serve_holds(super().save())
+        return self.instance
+
+
 class UpdateBookInstanceModelForm(ModelForm):
+    """Edits what a copy is, not its loan: status, borrower and due date change only through ``catalog.loans``."""
+
     class Meta:
         model = BookInstance
-        fields = ['book', 'language', 'imprint', 'status', 'borrower', 'due_back']
-        labels = {'due_back': 'Renewal date'}
+        fields = ['book', 'language', 'imprint']
+        widgets = {
+            'book': AutocompleteSelect('book'),
+            'language': AutocompleteSelect('language'),
+        }
 
-    def clean_due_back(self):
-        data = self.cleaned_data['due_back']
-        if data is not None:
-            if data < datetime.date.today():
-                raise ValidationError(_('Invalid date - Renewal date in past'))
+    def save(self, commit=True):
+        if not commit:
+            return super().save(commit=False)
+        with transaction.atomic():
+            # Write only the edited columns, so a loan made since the form was loaded is not overwritten.
+            self.instance.save(update_fields=[*self._meta.fields, 'updated_at'])
+            # An available copy moved to another book may be what its waiting patrons need
+            _serve_holds(self.instance)
+        return self.instance
 
-            if data > datetime.date.today() + datetime.timedelta(weeks=4):
-                raise ValidationError(_('Invalid date - Renewal date more than 4 weeks ahead'))
-        return data
+
+class BatchOperationForm(forms.Form):
+    MAX_COPIES = 5000
+
+    operation = forms.ChoiceField(choices=[(operation, verb.capitalize())
+                                           for operation, (verb, _statuses, _changes) in BATCH_OPERATIONS.items()])
+    copy_ids = forms.CharField(label='Copy ids', widget=forms.Textarea,
+                               help_text='Paste or scan copy ids, separated by spaces, commas or new lines.')
+    renewal_date = forms.DateField(required=False, help_text='For renewals: a date between now and 4 weeks.')
+
+    def clean_copy_ids(self):
+        copy_ids = parse_copy_ids(self.cleaned_data['copy_ids'])
+        if len(copy_ids) > self.MAX_COPIES:
+            raise ValidationError(_('At most %(max)d copies at a time.'), params={'max': self.MAX_COPIES})
+        return copy_ids
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('operation') == 'renew':
+            renewal_date = cleaned_data.get('renewal_date')
+            if renewal_date is None:
+                self.add_error('renewal_date', _('Renewals need a date.'))
+            else:
+                try:
+                    check_renewal_date(renewal_date)
+                except ValidationError as e:
+                    self.add_error('renewal_date', e)
+        return cleaned_data
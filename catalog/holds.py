@@ -0,0 +1,185 @@
+"""
+Hold queues: patrons wait in line for the next copy of a book to come back.
+
+A book's queue is its waiting holds in id order, a contiguous range of the index ``hold_queue_idx`` on ``(book,
+status, id)``. The next patron in line is the first entry of the range, found with one index seek however long the
+queue or the book's history of past holds grows. A patron's position counts only the entries ahead of them in the
+index, so it never reads the rest of the queue.
+
+A copy that comes back while patrons wait is set aside for the first of them in the transaction that returned it:
+the copy becomes reserved for the patron and the hold ready for pickup until ``PICKUP_PERIOD`` has passed. Checking
+the copy out to the patron collects the hold; ``expire_holds`` passes copies not collected in time down the line.
+Like ``catalog.loans``, every state change is a conditional ``UPDATE``; callers bring derived data up to date with
+``loans.loans_changed``.
+"""
+import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, OuterRef, Subquery
+from django.utils import timezone
+
+from . import loans
+from .models import Book, BookInstance, Hold
+
+PICKUP_PERIOD = datetime.timedelta(days=7)
+OPEN = ('w', 'r')
+
+
+class HoldError(Exception):
+    """The hold cannot be placed or changed."""
+
+
+def next_in_line(book_id):
+    """The book's earliest waiting hold, or None."""
+    return Hold.objects.filter(book_id=book_id, status='w').order_by('pk').first()
+
+
+def position(hold):
+    """1 for the next patron in line, 2 for the one after and so on; None unless the hold is waiting."""
+    if hold.status != 'w':
+        return None
+    return Hold.objects.filter(book_id=hold.book_id, status='w', pk__lte=hold.pk).count()
+
+
+def open_holds(patron):
+    """The patron's waiting and ready holds, each with its ``position``, in one query."""
+    ahead = Hold.objects.filter(book=OuterRef('book'), status='w', pk__lte=OuterRef('pk')).order_by().values('book')
+    holds = list(Hold.objects
+                 .filter(patron=patron, status__in=OPEN)
+                 .select_related('book')
+                 .only('book__title', 'status', 'expires_at')
+                 .annotate(place=Subquery(ahead.annotate(n=Count('pk')).values('n'))))
+    for hold in holds:
+        hold.position = hold.place if hold.status == 'w' else None
+    return holds
+
+
+def _lock_next_in_line(book_id):
+    """Lock the book's earliest waiting hold; None once nobody waits."""
+    while True:
+        hold = Hold.objects.select_for_update().filter(book_id=book_id, status='w').order_by('pk').first()
+        # Waiting for the lock, the read may find its hold taken by a concurrent allocation and come back empty
+        # while later patrons still wait.
+        if hold is not None or not Hold.objects.filter(book_id=book_id, status='w').exists():
+            return hold
+
+
+def allocate(copy_ids, now=None):
+    """
+    Set each available copy of ``copy_ids`` aside for the next patron waiting for its book; return the ready holds.
+
+    Call inside the transaction that made the copies available, then ``loans.loans_changed`` if anything was set
+    aside.
+    """
+    now = now or timezone.now()
+    copies = list(BookInstance.objects.filter(pk__in=copy_ids, status='a').values_list('pk', 'book_id'))
+    waiting = set(Hold.objects.filter(book_id__in={book_id for _, book_id in copies}, status='w')
+                  .order_by().values_list('book_id', flat=True).distinct())
+    ready = []
+    with transaction.atomic():
+        for copy_id, book_id in copies:
+            if book_id not in waiting:
+                continue
+            hold = _lock_next_in_line(book_id)
+            if hold is None:
+                waiting.discard(book_id)
+                continue
+            if BookInstance.objects.filter(pk=copy_id, status='a')\
+                    .update(status='r', borrower_id=hold.patron_id, due_back=None, updated_at=now):
+                hold.status, hold.copy_id, hold.expires_at = 'r', copy_id, now + PICKUP_PERIOD
+                Hold.objects.filter(pk=hold.pk).update(status='r', copy_id=copy_id, expires_at=hold.expires_at)
+                ready.append(hold)
+    return ready
+
+
+def release(copy_ids, now=None):
+    """Make copies set aside for holds available again, passing them to the next patrons in line."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        BookInstance.objects.filter(pk__in=copy_ids, status='r').update(status='a', borrower=None, updated_at=now)
+        allocate(copy_ids, now)
+        loans.loans_changed(copy_ids)
+
+
+def place_hold(book_id, patron):
+    """Queue ``patron`` for the book; the hold is ready at once if a copy is available."""
+    if not Book.objects.filter(pk=book_id).exists():
+        raise Book.DoesNotExist(f'No book with id {book_id}')
+    try:
+        with transaction.atomic():
+            hold = Hold.objects.create(book_id=book_id, patron=patron)
+            # Nobody else waits while a copy is available, so the new hold is first in line
+            copy_ids = list(BookInstance.objects.filter(book_id=book_id, status='a').values_list('pk', flat=True)[:1])
+            if allocate(copy_ids):
+                loans.loans_changed(copy_ids)
+    except IntegrityError:
+        raise HoldError('You already have a hold on this book.')
+    hold.refresh_from_db()
+    return hold
+
+
+def cancel(hold_id, patron):
+    """Withdraw the patron's open hold, giving any copy set aside for it to the next patron."""
+    with transaction.atomic():
+        hold = Hold.objects.select_for_update().filter(pk=hold_id, patron=patron).first()
+        if hold is None:
+            raise Hold.DoesNotExist(f'No hold with id {hold_id}')
+        if hold.status not in OPEN:
+            raise HoldError(f'Cannot cancel a hold that is {hold.get_status_display().lower()}.')
+        Hold.objects.filter(pk=hold.pk, status__in=OPEN).update(status='n')
+        if hold.status == 'r' and hold.copy_id:
+            release([hold.copy_id])
+
+
+def collect(copy_id, borrower):
+    """
+    Close the borrower's open hold on the book of a copy just lent to them.
+
+    A copy set aside for the hold other than the one lent goes to the next patron in line. Call inside the
+    checkout's transaction.
+    """
+    hold = Hold.objects.filter(patron=borrower, book__bookinstance=copy_id, status__in=OPEN).first()
+    if hold is None:
+        return
+    Hold.objects.filter(pk=hold.pk, status__in=OPEN).update(status='c', copy_id=copy_id)
+    if hold.status == 'r' and hold.copy_id and hold.copy_id != copy_id:
+        release([hold.copy_id])
+
+
+def expire_holds(now=None, batch_size=500):
+    """
+    Expire ready holds past their pickup deadline and pass their copies down the line, ``batch_size`` at a time.
+
+    Returns counts of holds expired and of copies set aside for the next patrons.
+    """
+    now = now or timezone.now()
+    result = {'expired': 0, 'passed_on': 0}
+    while True:
+        with transaction.atomic():
+            due = list(Hold.objects.select_for_update().filter(status='r', expires_at__lt=now)
+                       .order_by('expires_at', 'pk').values_list('pk', 'copy_id')[:batch_size])
+            if not due:
+                return result
+            hold_ids = [pk for pk, _ in due]
+            copy_ids = [copy_id for _, copy_id in due if copy_id]
+            Hold.objects.filter(pk__in=hold_ids, status='r').update(status='x')
+            # Only copies still set aside for the patrons who did not come
+            BookInstance.objects\
+                .filter(pk__in=copy_ids, status='r')\
+                .filter(Exists(Hold.objects.filter(pk__in=hold_ids, copy=OuterRef('pk'), patron=OuterRef('borrower'))))\
+                .update(status='a', borrower=None, updated_at=now)
+            result['passed_on'] += len(allocate(copy_ids, now))
+            loans.loans_changed(copy_ids)
+            result['expired'] += len(due)
+
+
+def allocate_available(now=None):
+    """Set aside copies made available outside the loan workflow (e.g. in the admin) for patrons waiting."""
+    with transaction.atomic():
+        copy_ids = list(BookInstance.objects
+                        .filter(status='a', book_id__in=Hold.objects.filter(status='w').values('book_id'))
+                        .values_list('pk', flat=True))
+        ready = allocate(copy_ids, now)
+        if ready:
+            loans.loans_changed([hold.copy_id for hold in ready])
+    return len(ready)
@@ -0,0 +1,241 @@
+"""
+Streaming bulk import of catalog records.
+
+Files are read lazily one record at a time, grouped into batches and written with ``bulk_create``, so memory use
+depends on the batch size and the number of distinct authors, genres, languages and ISBNs, never on the number of
+book copies. Each batch is committed in its own transaction and bumps the versions of the tables it wrote, so API
+clients polling during a long import see each batch arrive.
+"""
+import csv
+import json
+import os
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from . import pagecache
+from .availability import refresh_availability
+from .models import Author, Book, BookInstance, Genre, Language
+from .search import index_books
+from .stats import invalidate_catalog_stats
+from .versions import bump
+
+LOAN_STATUSES = {code for code, _label in BookInstance.LOAN_STATUS}
+
+MAX_REPORTED_ERRORS = 100
+
+
+def read_records(path):
+    """Yield one dict per CSV row or JSON line, with string values stripped."""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline='', encoding='utf-8') as f:
+        if extension == '.csv':
+            records = csv.DictReader(f)
+        elif extension in ('.jsonl', '.ndjson', '.json'):
+            records = (json.loads(line) for line in f if line.strip())
+        else:
+            raise ValueError(f'Unsupported file type {extension!r}; use .csv or .jsonl')
+        for record in records:
+            yield {key: value.strip() if isinstance(value, str) else value for key, value in record.items()}
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def split_names(value):
+    """Genre lists are ``|``-separated in CSV files and plain lists in JSON lines."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split('|')
+    return [name.strip() for name in value if name and name.strip()]
+
+
+class CatalogImporter:
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.created = {'languages': 0, 'genres': 0, 'authors': 0, 'books': 0, 'copies': 0}
+        self.skipped = {'languages': 0, 'genres': 0, 'authors': 0, 'books': 0, 'copies': 0}
+        self.errors = []
+
+        self.languages = {name: pk for pk, name in Language.objects.values_list('id', 'name').order_by('-id')}
+        self.genres = {name: pk for pk, name in Genre.objects.values_list('id', 'name').order_by('-id')}
+        self.authors = {(first, last): pk for pk, first, last
+                        in Author.objects.values_list('id', 'first_name', 'last_name').order_by('-id')}
+        self.books = dict(Book.objects.values_list('isbn', 'id'))
+        self.users = {}
+
+    def error(self, kind, line, message):
+        self.skipped[kind] += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f'{kind} record {line}: {message}')
+
+    def _resolve_names(self, model, lookup, names, kind):
+        """Create any of ``names`` missing from ``lookup`` (a name -> pk map) in one ``bulk_create``."""
+        missing = list(dict.fromkeys(name for name in names if name and name not in lookup))
+        if missing:
+            model.objects.bulk_create([model(name=name) for name in missing])
+            lookup.update({name: pk for pk, name in model.objects.filter(name__in=missing).values_list('id', 'name')})
+            self.created[kind] += len(missing)
+
+    def _resolve_authors(self, keys):
+        missing = {key: Author(first_name=key[0], last_name=key[1]) for key in keys if key not in self.authors}
+        if missing:
+            self._create_authors(missing)
+
+    def _create_authors(self, authors):
+        """Bulk insert ``authors`` (a ``(first_name, last_name)`` -> Author map) and record their ids."""
+        Author.objects.bulk_create(authors.values())
+        for pk, first, last in Author.objects.filter(last_name__in={last for _first, last in authors})\
+                .values_list('id', 'first_name', 'last_name').order_by('-id'):
+            if (first, last) in authors:
+                self.authors[(first, last)] = pk
+        self.created['authors'] += len(authors)
+
+    def _user_id(self, username):
+        if username and username not in self.users:
+            self.users[username] = User.objects.filter(username=username).values_list('id', flat=True).first()
+        return self.users.get(username)
+
+    def import_languages(self, records):
+        for batch in batched(records, self.batch_size):
+            with transaction.atomic():
+                before = len(self.languages)
+                self._resolve_names(Language, self.languages, [record.get('name') for record in batch], 'languages')
+                bump(Language)
+                self.skipped['languages'] += len(batch) - (len(self.languages) - before)
+            yield len(batch)
+
+    def import_genres(self, records):
+        for batch in batched(records, self.batch_size):
+            with transaction.atomic():
+                before = len(self.genres)
+                self._resolve_names(Genre, self.genres, [record.get('name') for record in batch], 'genres')
+                bump(Genre)
+                self.skipped['genres'] += len(batch) - (len(self.genres) - before)
+            yield len(batch)
+
+    def import_authors(self, records):
+        for batch in batched(records, self.batch_size):
+            with transaction.atomic():
+                new = {}
+                for record in batch:
+                    key = (record.get('first_name') or '', record.get('last_name') or '')
+                    if not any(key) or key in self.authors or key in new:
+                        self.skipped['authors'] += 1
+                        continue
+                    new[key] = Author(first_name=key[0], last_name=key[1],
+                                      date_of_birth=parse_date(record.get('date_of_birth') or '') or None,
+                                      date_of_death=parse_date(record.get('date_of_death') or '') or None)
+                if new:
+                    self._create_authors(new)
+                    bump(Author)
+            yield len(batch)
+
+    def import_books(self, records):
+        line = 1
+        for batch in batched(records, self.batch_size):
+            with transaction.atomic():
+                rows = []
+                for record in batch:
+                    isbn = record.get('isbn')
+                    if not isbn or not record.get('title'):
+                        self.error('books', line, 'title and isbn are required')
+                    elif len(isbn) > 13:
+                        self.error('books', line, f'ISBN {isbn!r} is longer than 13 characters')
+                    elif isbn in self.books:
+                        self.skipped['books'] += 1
+                    else:
+                        self.books[isbn] = None
+                        rows.append(record)
+                    line += 1
+                if rows:
+                    self._create_books(rows)
+                    bump(Language, Genre, Author, Book)
+            yield len(batch)
+
+    def _create_books(self, rows):
+        author_keys = [(row.get('author_first_name') or '', row.get('author_last_name') or '') for row in rows]
+        self._resolve_authors([key for key in author_keys if any(key)])
+        self._resolve_names(Language, self.languages, [row.get('language') for row in rows], 'languages')
+        self._resolve_names(Genre, self.genres, [name for row in rows for name in split_names(row.get('genres'))],
+                            'genres')
+
+        Book.objects.bulk_create([
+            Book(
+                title=row['title'],
+                summary=row.get('summary') or '',
+                isbn=row['isbn'],
+                author_id=self.authors.get(key) if any(key) else None,
+                language_of_origin_id=self.languages.get(row.get('language')),
+            )
+            for row, key in zip(rows, author_keys)
+        ])
+        # Only some backends return primary keys from bulk inserts, so look them up by ISBN.
+        ids = dict(Book.objects.filter(isbn__in=[row['isbn'] for row in rows]).values_list('isbn', 'id'))
+        self.books.update(ids)
+
+        Through = Book.genre.through
+        Through.objects.bulk_create([
+            Through(book_id=ids[row['isbn']], genre_id=self.genres[name])
+            for row in rows for name in dict.fromkeys(split_names(row.get('genres')))
+        ])
+        index_books(ids.values())
+        self.created['books'] += len(rows)
+
+    def import_copies(self, records):
+        line = 1
+        for batch in batched(records, self.batch_size):
+            with transaction.atomic():
+                self._resolve_names(Language, self.languages, [record.get('language') for record in batch],
+                                    'languages')
+                copies = []
+                for record in batch:
+                    copy = self._build_copy(record, line)
+                    if copy is not None:
+                        copies.append(copy)
+                    line += 1
+                BookInstance.objects.bulk_create(copies)
+                refresh_availability({copy.book_id for copy in copies})
+                bump(Language, BookInstance)
+                self.created['copies'] += len(copies)
+            yield len(batch)
+
+    def _build_copy(self, record, line):
+        book_id = self.books.get(record.get('isbn'))
+        if book_id is None:
+            self.error('copies', line, f'unknown ISBN {record.get("isbn")!r}')
+            return None
+        status = record.get('status') or 'm'
+        if status not in LOAN_STATUSES:
+            self.error('copies', line, f'invalid status {status!r}')
+            return None
+        borrower_id = self._user_id(record.get('borrower'))
+        if record.get('borrower') and borrower_id is None:
+            self.error('copies', line, f'unknown borrower {record["borrower"]!r}')
+            return None
+
+        copy = BookInstance(
+            book_id=book_id,
+            imprint=record.get('imprint') or '',
+            status=status,
+            due_back=parse_date(record.get('due_back') or '') or None,
+            language_id=self.languages.get(record.get('language')),
+            borrower_id=borrower_id,
+        )
+        if record.get('id'):
+            copy.id = record['id']
+        if status in {'a', 'm'} and (copy.due_back or copy.borrower_id):
+            self.error('copies', line, 'available or maintenance copies cannot have a borrower or due date')
+            return None
+        return copy
+
+    def finish(self):
+        invalidate_catalog_stats()
+        bump(Language, Genre, Author, Book, BookInstance)
+        pagecache.bump_all()
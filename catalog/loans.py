@@ -0,0 +1,190 @@
+"""
+Loan workflow: checkout, return, reserve, renew and maintenance.
+
+Every operation is a single conditional ``UPDATE ... WHERE id = %s AND status = ...`` touching only the columns it
+changes. The database applies it atomically, so when two librarians lend the same copy at once exactly one UPDATE
+matches a row and the other gets a ``LoanError``; no row or table locks are held between reading and writing.
+Bulk ``update()`` skips ``post_save``, so the handlers that keep derived data in sync are called explicitly.
+
+``apply_batch`` applies one operation to many copies at once: a set-based ``UPDATE ... WHERE id IN (...) AND status
+= ...`` per chunk of ids, all in one transaction. It locks the copies while it reads their statuses, so the copies it
+reports as refused and those it changes stay as reported until it commits.
+
+Returned copies go to the next patron waiting for their book (``catalog.holds``) in the transaction that returns
+them, and lending a copy collects the borrower's hold on its book.
+"""
+import datetime
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from . import holds
+from .availability import refresh_availability
+from .models import BookInstance
+from .stats import invalidate_catalog_stats
+from .versions import bump
+
+LOAN_PERIOD = datetime.timedelta(weeks=3)
+MAX_RENEWAL = datetime.timedelta(weeks=4)
+
+
+class LoanError(Exception):
+    """The copy is not in a state that allows the requested operation."""
+
+
+def check_renewal_date(renewal_date, today=None):
+    """Raise ``ValidationError`` unless ``renewal_date`` is between today and four weeks ahead."""
+    today = today or datetime.date.today()
+    if renewal_date < today:
+        raise ValidationError(_('Invalid date - renewal in past'))
+    if renewal_date > today + MAX_RENEWAL:
+        raise ValidationError(_('Invalid date - renewal more than 4 weeks ahead'))
+
+
+def _transition(copy_id, condition, then=None, **changes):
+    """Apply ``changes`` to the copy if it matches ``condition``, then call ``then()``; return whether it did."""
+    with transaction.atomic():
+        updated = BookInstance.objects\
+            .filter(Q(pk=copy_id) & condition)\
+            .update(updated_at=timezone.now(), **changes)
+        if updated:
+            if then:
+                then()
+            loans_changed([copy_id])
+    return bool(updated)
+
+
+def loans_changed(copy_ids):
+    """Bring data derived from copy status up to date; call inside the transaction that changed the copies."""
+    invalidate_catalog_stats()
+    bump(BookInstance)
+    refresh_availability(BookInstance.objects.filter(pk__in=copy_ids).values_list('book_id', flat=True))
+
+
+def refusal(action, status):
+    return (f'Cannot {action} a copy that is {dict(BookInstance.LOAN_STATUS)[status].lower()}.'
+            if status else f'Cannot {action} a copy without a status.')
+
+
+def _refuse(copy_id, action):
+    status = BookInstance.objects.filter(pk=copy_id).values_list('status', flat=True).first()
+    if status is None:
+        raise BookInstance.DoesNotExist(f'No copy with id {copy_id}')
+    raise LoanError(refusal(action, status))
+
+
+def checkout(copy_id, borrower, due_back=None):
+    """Lend an available copy, or a copy reserved for ``borrower``, to ``borrower``."""
+    due_back = due_back or datetime.date.today() + LOAN_PERIOD
+    check_renewal_date(due_back)
+    if not _transition(copy_id, Q(status='a') | Q(status='r', borrower=borrower),
+                       then=lambda: holds.collect(copy_id, borrower),
+                       status='o', borrower=borrower, due_back=due_back):
+        _refuse(copy_id, 'lend')
+    return due_back
+
+
+def return_copy(copy_id):
+    """Mark a copy on loan as available again, or set it aside for the next patron waiting for its book."""
+    if not _transition(copy_id, Q(status='o'), then=lambda: holds.allocate([copy_id]),
+                       status='a', borrower=None, due_back=None):
+        _refuse(copy_id, 'return')
+
+
+def reserve(copy_id, borrower):
+    """Hold an available copy for ``borrower``."""
+    if not _transition(copy_id, Q(status='a'), status='r', borrower=borrower, due_back=None):
+        _refuse(copy_id, 'reserve')
+
+
+def send_to_maintenance(copy_id):
+    """Take an available copy out of circulation."""
+    if not _transition(copy_id, Q(status='a'), status='m', borrower=None, due_back=None):
+        _refuse(copy_id, 'send to maintenance')
+
+
+def end_maintenance(copy_id):
+    """Put a copy back into circulation after maintenance, or set it aside for the next patron waiting for its book."""
+    if not _transition(copy_id, Q(status='m'), then=lambda: holds.allocate([copy_id]),
+                       status='a', borrower=None, due_back=None):
+        _refuse(copy_id, 'put back into circulation')
+
+
+def renew(copy_id, renewal_date):
+    """Move the due date of a copy on loan."""
+    check_renewal_date(renewal_date)
+    if not _transition(copy_id, Q(status='o'), due_back=renewal_date):
+        _refuse(copy_id, 'renew')
+
+
+# Batch operation -> (verb for refusals, statuses it applies to, changes). Available and maintenance copies end up
+# without a borrower or due date, as BookInstance.clean requires.
+BATCH_OPERATIONS = {
+    'return': ('return', {'o'}, {'status': 'a', 'borrower': None, 'due_back': None}),
+    'renew': ('renew', {'o'}, {}),
+    'maintenance': ('send to maintenance', {'a'}, {'status': 'm', 'borrower': None, 'due_back': None}),
+}
+
+BATCH_CHUNK_SIZE = 500
+
+
+class BatchResult:
+    def __init__(self):
+        self.changed = []
+        # Copy id as given -> why it was left alone
+        self.errors = {}
+
+
+def _chunks(ids):
+    for start in range(0, len(ids), BATCH_CHUNK_SIZE):
+        yield ids[start:start + BATCH_CHUNK_SIZE]
+
+
+def parse_copy_ids(text):
+    """Copy ids separated by whitespace or commas, as pasted or scanned, without repeats."""
+    return list(dict.fromkeys(text.replace(',', ' ').split()))
+
+
+def apply_batch(operation, copy_ids, renewal_date=None):
+    """
+    Apply ``operation`` (a ``BATCH_OPERATIONS`` key) to the copies of ``copy_ids`` that allow it, in one transaction.
+
+    Renewals move the due date to ``renewal_date``, which must pass ``check_renewal_date``. Returns a ``BatchResult``
+    with the ids changed and a message for every other id.
+    """
+    action, statuses, changes = BATCH_OPERATIONS[operation]
+    if operation == 'renew':
+        check_renewal_date(renewal_date)
+        changes = {'due_back': renewal_date}
+
+    result = BatchResult()
+    ids = {}
+    for copy_id in dict.fromkeys(copy_ids):
+        try:
+            ids[uuid.UUID(str(copy_id))] = copy_id
+        except ValueError:
+            result.errors[copy_id] = 'Not a copy id.'
+
+    with transaction.atomic():
+        current = {}
+        for chunk in _chunks(list(ids)):
+            current.update(BookInstance.objects.select_for_update().filter(pk__in=chunk).values_list('pk', 'status'))
+        for pk, copy_id in ids.items():
+            if pk not in current:
+                result.errors[copy_id] = 'No copy with this id.'
+            elif current[pk] not in statuses:
+                result.errors[copy_id] = refusal(action, current[pk])
+            else:
+                result.changed.append(pk)
+
+        now = timezone.now()
+        for chunk in _chunks(result.changed):
+            BookInstance.objects.filter(pk__in=chunk, status__in=statuses).update(updated_at=now, **changes)
+            if operation == 'return':
+                holds.allocate(chunk, now)
+            loans_changed(chunk)
+    return result
@@ -0,0 +1,80 @@
+"""
+Prefix lookups for the autocomplete widgets of ``catalog.widgets``.
+
+Every kind matches the start of an indexed column: book titles (``book_title_idx``) and ISBNs, author last names
+(``author_name_idx``), usernames, and genre and language names. A prefix turns into range scans,
+``column >= prefix AND column < prefix + U+10FFFF``, one for each capitalization a user is likely to mean (as typed,
+lower case, capitalized and title case). Each scan reads at most ``limit`` rows in index order, so a lookup costs the
+same on any size of catalog. Results rank exact matches first, then follow the column ignoring case.
+"""
+from django.contrib.auth.models import User
+
+from .models import Author, Book, Genre, Language
+
+MAX_CHAR = '\U0010ffff'
+MAX_LIMIT = 20
+
+
+def variants(prefix):
+    return list(dict.fromkeys([prefix, prefix.lower(), prefix.capitalize(), prefix.title()]))
+
+
+def starting_with(queryset, column, prefix, limit, order=None):
+    """Rows whose ``column`` starts with a likely capitalization of ``prefix``, up to ``limit`` per capitalization."""
+    rows = {}
+    for variant in variants(prefix):
+        matches = queryset.filter(**{f'{column}__gte': variant, f'{column}__lt': variant + MAX_CHAR})
+        for obj in matches.order_by(*(order or [column, 'pk']))[:limit]:
+            rows[obj.pk] = obj
+    return list(rows.values())
+
+
+def ranked(objects, key, query, limit):
+    query = query.lower()
+    return sorted(objects, key=lambda obj: (key(obj).lower() != query, key(obj).lower(), obj.pk))[:limit]
+
+
+def books(query, limit):
+    found = starting_with(Book.objects.only('title', 'isbn'), 'title', query, limit)
+    if query.isdigit():
+        found += starting_with(Book.objects.only('title', 'isbn'), 'isbn', query, limit)
+    return ranked(found, lambda book: book.title, query, limit)
+
+
+def authors(query, limit):
+    # "frank her" means first name Frank*, last name Her*; a single word matches last names only.
+    *first, last = query.split()
+    queryset = Author.objects.all()
+    if first:
+        queryset = queryset.filter(first_name__istartswith=' '.join(first))
+    found = starting_with(queryset, 'last_name', last, limit, order=['last_name', 'first_name', 'pk'])
+    return ranked(found, lambda author: author.last_name, last, limit)
+
+
+def users(query, limit):
+    found = starting_with(User.objects.only('username'), 'username', query, limit)
+    return ranked(found, lambda user: user.username, query, limit)
+
+
+def named(model):
+    def lookup(query, limit):
+        return ranked(starting_with(model.objects.all(), 'name', query, limit), lambda obj: obj.name, query, limit)
+    return lookup
+
+
+LOOKUPS = {
+    'book': books,
+    'author': authors,
+    'user': users,
+    'genre': named(Genre),
+    'language': named(Language),
+}
+
+
+def lookup(kind, query, limit=10):
+    """Up to ``limit`` objects of ``kind`` matching the start of ``query``; raises KeyError for unknown kinds."""
+    function = LOOKUPS[kind]
+    query = ' '.join(query.split())
+    if not query:
+        return []
+    return function(query, max(1, min(limit, MAX_LIMIT)))
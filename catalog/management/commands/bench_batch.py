@@ -0,0 +1,77 @@
+import datetime
+import os
+import random
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+
+from catalog import loans
+from catalog.management.commands.bench_sqlite import copy_database
+from catalog.models import BookInstance
+
+
+def one_by_one(operation, copy_ids, renewal_date):
+    """What librarians do without batches: one operation, in its own transaction, per copy."""
+    for copy_id in copy_ids:
+        if operation == 'return':
+            loans.return_copy(copy_id)
+        elif operation == 'renew':
+            loans.renew(copy_id, renewal_date)
+        else:
+            # As BookInstanceUpdate does: load the copy and save the whole row.
+            copy = BookInstance.objects.get(pk=copy_id)
+            copy.status = 'm'
+            copy.save()
+
+
+class Command(BaseCommand):
+    help = ('Time a batch operation on many copies done one copy at a time and with loans.apply_batch. Each run '
+            'works on its own copy of the SQLite database, so its changes are thrown away. Run generate_catalog '
+            'first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operation', choices=loans.BATCH_OPERATIONS, default='return')
+        parser.add_argument('--size', type=int, default=1000, help='Copies per batch.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, operation, size, seed, **options):
+        connection = connections['default']
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark needs a SQLite database.')
+
+        statuses = loans.BATCH_OPERATIONS[operation][1]
+        copy_ids = list(BookInstance.objects.filter(status__in=statuses).order_by('pk')
+                        .values_list('pk', flat=True)[:100000])
+        if len(copy_ids) < size:
+            raise CommandError(f'The database has only {len(copy_ids)} copies to {operation}; '
+                               f'run "manage.py generate_catalog" first.')
+        copy_ids = random.Random(seed).sample(copy_ids, size)
+        renewal_date = datetime.date.today() + datetime.timedelta(weeks=2)
+
+        source = str(connection.settings_dict['NAME'])
+        settings_dict = connection.settings_dict
+        connections.close_all()
+        timings = {}
+        for mode in ('one by one', 'batch'):
+            with tempfile.TemporaryDirectory() as directory:
+                target = os.path.join(directory, 'bench.sqlite3')
+                copy_database(source, target)
+                connections['default'] = load_backend(settings_dict['ENGINE']).DatabaseWrapper(
+                    {**settings_dict, 'NAME': target}, 'default')
+                try:
+                    started = time.perf_counter()
+                    if mode == 'batch':
+                        result = loans.apply_batch(operation, copy_ids, renewal_date)
+                        if result.errors:
+                            raise CommandError(f'The batch refused {len(result.errors)} copies.')
+                    else:
+                        one_by_one(operation, copy_ids, renewal_date)
+                    timings[mode] = time.perf_counter() - started
+                finally:
+                    connections['default'].close()
+            self.stdout.write(f'{mode:<10} {size} copies in {timings[mode]:.2f}s '
+                              f'({size / timings[mode]:,.0f} copies/s)')
+        self.stdout.write(f'The batch was {timings["one by one"] / timings["batch"]:.1f}x faster.')
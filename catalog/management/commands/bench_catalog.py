@@ -0,0 +1,69 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+
+from catalog import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Load test the catalog with a scripted request mix from concurrent clients and report throughput, '
+            'p50/p95/p99 latency and queries per request for each scenario. Needs a catalog from generate_catalog.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Base URL of a running server on the same database, e.g. '
+                                          'http://127.0.0.1:8000. By default the app is served from this process.')
+        parser.add_argument('--mix', choices=benchmark.MIXES, default='browse')
+        parser.add_argument('--clients', type=int, default=8, help='Concurrent client threads.')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', metavar='FILE', help='Save the report as JSON.')
+        parser.add_argument('--compare', metavar='FILE', help='A report saved earlier, e.g. from another commit.')
+
+    def handle(self, *args, url, mix, clients, duration, seed, output, compare, **options):
+        baseline = None
+        if compare:
+            with open(compare) as f:
+                baseline = json.load(f)
+
+        try:
+            if url:
+                report = benchmark.run(url.rstrip('/'), mix, clients, duration, seed)
+            else:
+                # Profiling puts the query count of every response in its Server-Timing header.
+                with override_settings(REQUEST_PROFILING=True):
+                    server, url = benchmark.serve_in_thread(get_wsgi_application())
+                    try:
+                        report = benchmark.run(url, mix, clients, duration, seed)
+                    finally:
+                        server.shutdown()
+                        server.server_close()
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        self.print_report(report)
+        if baseline:
+            self.print_changes(baseline, benchmark.compare(baseline, report))
+        if output:
+            with open(output, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    def print_report(self, report):
+        self.stdout.write(f'{report["mix"]} mix, {report["clients"]} clients, {report["duration"]}s, '
+                          f'{report["catalog"]["books"]:,} books / {report["catalog"]["copies"]:,} copies, '
+                          f'commit {report["commit"] or "unknown"}')
+        self.stdout.write(f'{"scenario":<16} {"requests":>8} {"errors":>6} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} '
+                          f'{"p99 ms":>8} {"queries":>7}')
+        for scenario, row in {**report['scenarios'], 'total': report['total']}.items():
+            cells = [row[field] if row[field] is not None else '-'
+                     for field in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_avg')]
+            self.stdout.write(f'{scenario:<16} {row["requests"]:>8} {row["errors"]:>6} ' +
+                              ' '.join(f'{cell:>8}' for cell in cells[:4]) + f' {cells[4]:>7}')
+        for error in report['errors']:
+            self.stderr.write(error)
+
+    def print_changes(self, baseline, changes):
+        self.stdout.write(f'\nChange from commit {baseline.get("commit") or "unknown"} (%):')
+        for scenario, row in changes.items():
+            self.stdout.write(f'{scenario:<16} ' + ', '.join(f'{field} {change:+}' for field, change in row.items()))
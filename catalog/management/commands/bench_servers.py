@@ -0,0 +1,103 @@
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog import benchmark
+
+SERVERS = {
+    # Synchronous views in gunicorn's sync workers, one request at a time per worker.
+    'wsgi': ['LocalLibrary.wsgi', '--worker-class', 'sync'],
+    # The async views (see catalog.async_views) in uvicorn workers. A worker awaits many requests at a time, but
+    # their synchronous parts (sessions, authentication, the class-based views, rendering) take turns on one thread.
+    'asgi': ['LocalLibrary.asgi', '--worker-class', 'uvicorn.workers.UvicornWorker'],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url, process, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f'The server exited with status {process.returncode}.')
+        try:
+            urllib.request.urlopen(url, timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'The server did not answer {url} within {timeout:.0f}s.')
+
+
+class Command(BaseCommand):
+    help = ('Serve the catalog from gunicorn twice, as WSGI with sync workers and as ASGI with uvicorn workers, on '
+            'the current database, and load test each with the same mix at high concurrency. Needs uvicorn and a '
+            'catalog from generate_catalog.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=SERVERS, default=list(SERVERS))
+        parser.add_argument('--workers', type=int, default=2, help='Gunicorn workers per server.')
+        parser.add_argument('--mix', choices=benchmark.MIXES, default='read-only')
+        parser.add_argument('--clients', type=int, default=64, help='Concurrent client threads.')
+        parser.add_argument('--duration', type=float, default=15.0, help='Seconds to run each server.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--page-cache', action='store_true',
+                            help='Serve anonymous pages from the page cache; by default every page is rendered.')
+
+    def handle(self, *args, servers, workers, mix, clients, duration, seed, page_cache, **options):
+        if 'asgi' in servers and importlib.util.find_spec('uvicorn') is None:
+            raise CommandError('The ASGI server needs uvicorn: pip install uvicorn.')
+        if settings.DATABASES['default']['NAME'] == ':memory:':
+            raise CommandError('The servers need a database they can share, not an in-memory one.')
+
+        targets = benchmark.Targets(seed=seed)
+        reports = {}
+        for name in servers:
+            reports[name] = self.bench(name, workers, page_cache, mix, clients, duration, seed, targets)
+            self.print_report(name, reports[name])
+
+        if 'wsgi' in reports and 'asgi' in reports:
+            changes = benchmark.compare(reports['wsgi'], reports['asgi'])
+            self.stdout.write('\nASGI compared with WSGI (%):')
+            for scenario, row in changes.items():
+                self.stdout.write(f'{scenario:<16} ' + ', '.join(f'{field} {change:+}' for field, change in row.items()))
+
+    def bench(self, name, workers, page_cache, mix, clients, duration, seed, targets):
+        port = free_port()
+        env = {
+            **os.environ,
+            'DJANGO_ASYNC_VIEWS': str(name == 'asgi'),
+            # Server-Timing headers carry the query counts.
+            'DJANGO_REQUEST_PROFILING': 'True',
+        }
+        if not page_cache:
+            env['PAGE_CACHE_BACKEND'] = 'none'
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', *SERVERS[name], '--bind', f'127.0.0.1:{port}',
+             '--workers', str(workers), '--backlog', '2048', '--log-level', 'warning'],
+            cwd=settings.BASE_DIR, env=env)
+        url = f'http://127.0.0.1:{port}'
+        try:
+            wait_until_up(url + '/catalog/books/', process)
+            return benchmark.run(url, mix, clients, duration, seed, targets)
+        finally:
+            process.terminate()
+            process.wait()
+
+    def print_report(self, name, report):
+        total = report['total']
+        self.stdout.write(f'{name}: {report["mix"]} mix, {report["clients"]} clients, {report["duration"]}s, '
+                          f'{total["requests"]} requests, {total["errors"]} errors, {total["throughput_rps"]} req/s, '
+                          f'p50 {total["p50_ms"]} ms, p95 {total["p95_ms"]} ms, p99 {total["p99_ms"]} ms')
+        for error in report['errors']:
+            self.stderr.write(error)
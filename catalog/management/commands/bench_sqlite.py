@@ -0,0 +1,125 @@
+import datetime
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.db.utils import load_backend
+
+from catalog import loans
+from catalog.models import Book, BookInstance
+from catalog.profiling import percentile
+from catalog.sessions import SessionStore
+
+MODES = {
+    # Django's SQLite backend as configured out of the box: rollback journal, fsync on every commit, deferred BEGIN.
+    'default': 'django.db.backends.sqlite3',
+    'tuned': 'catalog.backends.sqlite3',
+}
+
+
+def copy_database(source, target):
+    """Snapshot ``source`` into ``target`` with SQLite's backup API, in rollback journal mode."""
+    with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+        src.backup(dst)
+        dst.execute('PRAGMA journal_mode = DELETE')
+    src.close()
+    dst.close()
+
+
+def worker(settings_dict, book_ids, copy_ids, deadline, write_ratio, seed, results):
+    """Mix book page reads with renewals and session saves until ``deadline``; report latencies on ``results``."""
+    connections['default'] = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, 'default')
+    rng = random.Random(seed)
+    stats = {'reads': [], 'writes': [], 'errors': 0}
+    while time.time() < deadline:
+        write = rng.random() < write_ratio
+        started = time.perf_counter()
+        try:
+            if write and rng.random() < 0.5:
+                loans.renew(rng.choice(copy_ids), datetime.date.today() + datetime.timedelta(days=rng.randint(1, 28)))
+            elif write:
+                # The session write of every visit to the home page
+                session = SessionStore()
+                session['num_visits'] = rng.randint(1, 100)
+                session.save()
+            else:
+                book_id = rng.choice(book_ids)
+                list(Book.objects.select_related('author', 'language_of_origin').filter(pk=book_id))
+                list(BookInstance.objects.filter(book_id=book_id))
+        except OperationalError:
+            # "database is locked": the busy timeout ran out, or a deferred transaction lost its snapshot.
+            stats['errors'] += 1
+            continue
+        except loans.LoanError:
+            pass
+        stats['writes' if write else 'reads'].append(time.perf_counter() - started)
+    connections['default'].close()
+    results.put(stats)
+
+
+class Command(BaseCommand):
+    help = ('Measure read and write throughput of several processes sharing the SQLite database, with Django\'s '
+            'default SQLite settings and with catalog.backends.sqlite3. Each mode runs on its own copy of the '
+            'database, so its writes are thrown away. Run generate_catalog first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Worker processes.')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per mode.')
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Fraction of operations that write.')
+        parser.add_argument('--mode', choices=MODES, action='append', help='Modes to run (default: all).')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, workers, duration, write_ratio, mode, seed, **options):
+        connection = connections['default']
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark needs a SQLite database.')
+
+        rng = random.Random(seed)
+        book_ids = list(Book.objects.order_by('pk').values_list('pk', flat=True)[:100000])
+        copy_ids = list(BookInstance.objects.on_loan().order_by('pk').values_list('pk', flat=True)[:100000])
+        if not (book_ids and copy_ids):
+            raise CommandError('The database has no books on loan; run "manage.py generate_catalog" first.')
+        book_ids = rng.sample(book_ids, min(1000, len(book_ids)))
+        copy_ids = rng.sample(copy_ids, min(1000, len(copy_ids)))
+
+        source = str(connection.settings_dict['NAME'])
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        self.stdout.write(f'{"mode":<8} {"reads/s":>9} {"writes/s":>9} {"errors":>7} {"read p95":>10} '
+                          f'{"write p95":>10}')
+        for name in mode or MODES:
+            with tempfile.TemporaryDirectory() as directory:
+                target = os.path.join(directory, 'bench.sqlite3')
+                copy_database(source, target)
+                options = {key: value for key, value in connection.settings_dict['OPTIONS'].items()
+                           if key not in ('pragmas', 'transaction_mode')}
+                settings_dict = {**connection.settings_dict, 'ENGINE': MODES[name], 'NAME': target,
+                                 'OPTIONS': options, 'CONN_MAX_AGE': None}
+
+                results = context.Queue()
+                deadline = time.time() + duration
+                processes = [context.Process(target=worker, args=(settings_dict, book_ids, copy_ids, deadline,
+                                                                  write_ratio, seed + index, results))
+                             for index in range(workers)]
+                for process in processes:
+                    process.start()
+                stats = [results.get() for _ in processes]
+                for process in processes:
+                    process.join()
+
+            reads = sorted(latency for row in stats for latency in row['reads'])
+            writes = sorted(latency for row in stats for latency in row['writes'])
+            errors = sum(row['errors'] for row in stats)
+            self.stdout.write(
+                f'{name:<8} {len(reads) / duration:>9,.0f} {len(writes) / duration:>9,.0f} {errors:>7} '
+                f'{self.ms(percentile(reads, 0.95)):>10} {self.ms(percentile(writes, 0.95)):>10}'
+            )
+
+    @staticmethod
+    def ms(seconds):
+        return '-' if seconds is None else f'{seconds * 1000:.1f}ms'
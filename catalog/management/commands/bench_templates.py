@@ -0,0 +1,68 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.template.backends.django import DjangoTemplates, Template
+from django.test import RequestFactory
+
+from catalog import views
+from catalog.models import Author, Book, Genre
+from catalog.templatecache import cached_loaders
+
+
+def page_views():
+    """(label, view class, kwargs) for each catalog page, skipping detail pages without a row to show."""
+    pages = [('books', views.BookListView, {}), ('authors', views.AuthorListView, {}),
+             ('genres', views.GenreList, {}), ('languages', views.LanguageList, {})]
+    for label, view_class, model in (('book-detail', views.BookDetailView, Book),
+                                     ('author-detail', views.AuthorDetailView, Author),
+                                     ('genre-detail', views.GenreDetail, Genre)):
+        pk = model.objects.order_by('pk').values_list('pk', flat=True).first()
+        if pk is not None:
+            pages.append((label, view_class, {'pk': pk}))
+    return pages
+
+
+class Command(BaseCommand):
+    help = ('Compare cold (parse and compile) with warm (cached, compiled) template render latency for the catalog '
+            'pages, using the current database for their contents.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50, help='Warm renders per page.')
+
+    def handle(self, *args, repeat, **options):
+        config = settings.TEMPLATES[0]
+        backend = DjangoTemplates({
+            'NAME': 'bench', 'DIRS': config['DIRS'], 'APP_DIRS': False,
+            'OPTIONS': {**config.get('OPTIONS', {}), 'loaders': cached_loaders()},
+        })
+        cached_loader = backend.engine.template_loaders[0]
+
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        request.session = {}
+
+        self.stdout.write(f'{"page":<15} {"cold ms":>9} {"warm ms":>9} {"speedup":>8}')
+        for label, view_class, kwargs in page_views():
+            view = view_class()
+            view.setup(request, **kwargs)
+            # Calling get() directly skips dispatch() and so the page cache; the response is not rendered yet.
+            response = view.get(request, **kwargs)
+            names = response.template_name
+            names = [names] if isinstance(names, str) else names
+            context = response.context_data
+
+            cached_loader.reset()
+            started = time.perf_counter()
+            Template(backend.engine.select_template(names), backend).render(context, request)
+            cold = time.perf_counter() - started
+
+            warm = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                Template(backend.engine.select_template(names), backend).render(context, request)
+                warm.append(time.perf_counter() - started)
+            warm = statistics.median(warm)
+            self.stdout.write(f'{label:<15} {cold * 1000:>9.2f} {warm * 1000:>9.2f} {cold / warm:>7.1f}x')
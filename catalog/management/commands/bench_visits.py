@@ -0,0 +1,51 @@
+from django.contrib.sessions.models import Session
+from django.core.wsgi import get_wsgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from catalog import benchmark, visits
+
+MODES = ('session', 'buffered')
+
+
+class Command(BaseCommand):
+    help = ('Load test the home page with each VISIT_COUNTER mode: "session", which saves the session on every visit, '
+            'and "buffered", which writes none. Reports throughput, latency, queries per request and the session '
+            'rows created. Needs a catalog from generate_catalog.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8, help='Concurrent client threads.')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run each mode.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, clients, duration, seed, **options):
+        targets = benchmark.Targets(seed=seed)
+        reports = {}
+        for mode in MODES:
+            sessions = Session.objects.count()
+            try:
+                with override_settings(REQUEST_PROFILING=True, VISIT_COUNTER=mode):
+                    server, url = benchmark.serve_in_thread(get_wsgi_application())
+                    try:
+                        reports[mode] = benchmark.run(url, 'home', clients, duration, seed, targets)
+                    finally:
+                        server.shutdown()
+                        server.server_close()
+                    visits.flush()
+            except RuntimeError as e:
+                raise CommandError(str(e))
+            self.print_report(mode, reports[mode], Session.objects.count() - sessions)
+
+        self.stdout.write('\nbuffered compared with session (%):')
+        for scenario, row in benchmark.compare(reports['session'], reports['buffered']).items():
+            self.stdout.write(f'{scenario:<14} ' + ', '.join(f'{field} {change:+}' for field, change in row.items()))
+
+    def print_report(self, mode, report, sessions_created):
+        self.stdout.write(f'{mode}: {report["clients"]} clients, {report["duration"]}s, '
+                          f'{sessions_created:,} sessions created')
+        for scenario, row in {**report['scenarios'], 'total': report['total']}.items():
+            self.stdout.write(f'  {scenario:<14} {row["requests"]:>7} requests {row["errors"]:>4} errors '
+                              f'{row["throughput_rps"]:>8} req/s  p50 {row["p50_ms"]} ms  p95 {row["p95_ms"]} ms  '
+                              f'{row["queries_avg"]} queries')
+        for error in report['errors']:
+            self.stderr.write(error)
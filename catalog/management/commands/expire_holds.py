@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from catalog.holds import allocate_available, expire_holds
+
+
+class Command(BaseCommand):
+    help = ('Expire holds not collected by their pickup deadline and set their copies aside for the next patrons in '
+            'line, then give available copies to patrons still waiting.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Holds expired per transaction.')
+
+    def handle(self, *args, batch_size, **options):
+        result = expire_holds(batch_size=batch_size)
+        passed_on = result['passed_on'] + allocate_available()
+        self.stdout.write(self.style.SUCCESS(
+            f'Expired {result["expired"]} holds; set {passed_on} copies aside for the next patrons in line.'
+        ))
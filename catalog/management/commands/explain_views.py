@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.queryplans import audit
+
+
+class Command(BaseCommand):
+    help = ('EXPLAIN every query the catalog pages run and flag full table scans. Use a database of realistic size, '
+            'such as one filled by generate_catalog.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to audit.')
+        parser.add_argument('--strict', action='store_true', help='Fail if any query scans a whole table.')
+        parser.add_argument('--plans', action='store_true', help='Print the plan of every query, not just scans.')
+
+    def handle(self, *args, database, strict, plans, **options):
+        try:
+            results = list(audit(using=database))
+        except NotImplementedError as e:
+            raise CommandError(str(e))
+
+        flagged = [result for result in results if result['scans']]
+        for result in results:
+            if not (plans or result['scans']):
+                continue
+            style = self.style.WARNING if result['scans'] else self.style.SUCCESS
+            label = f'scans {", ".join(result["scans"])}' if result['scans'] else 'ok'
+            self.stdout.write(style(f'{result["page"]} {result["path"]}: {label}'))
+            self.stdout.write(f'  {result["sql"]}')
+            for line in result['plan']:
+                self.stdout.write(f'    {line}')
+
+        pages = len({result['path'] for result in results})
+        summary = f'{len(results)} queries on {pages} pages, {len(flagged)} with full table scans.'
+        if flagged and strict:
+            raise CommandError(summary)
+        self.stdout.write((self.style.WARNING if flagged else self.style.SUCCESS)(summary))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.exporter import DATASETS, FORMATS, export, parse_since
+
+
+class Command(BaseCommand):
+    help = 'Stream a dataset of the catalog or loan ledger to a CSV or JSON-lines file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument('--format', dest='output_format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--since', help='Only export rows updated after this ISO 8601 timestamp.')
+        parser.add_argument('--output', '-o', help='File to write to (default: standard output).')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per database round trip.')
+
+    def handle(self, *args, dataset, output_format, since, output, chunk_size, **options):
+        if since is not None:
+            try:
+                since = parse_since(since)
+            except ValueError as e:
+                raise CommandError(f'--since: {e}')
+
+        lines = export(dataset, output_format, since=since, chunk_size=chunk_size)
+        if output:
+            with open(output, 'w', newline='', encoding='utf-8') as f:
+                f.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,35 @@
+import argparse
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.synthetic import SCALES, SEEDS, SYNTHETIC_PASSWORD, CatalogGenerator
+
+
+def seed(value):
+    if int(value) not in SEEDS:
+        raise argparse.ArgumentTypeError(f'must be between {SEEDS[0]} and {SEEDS[-1]}')
+    return int(value)
+
+
+class Command(BaseCommand):
+    help = ('Fill the database with a seeded synthetic catalog for benchmarks: authors, books, genres, languages, '
+            f'copies in every loan status, readers and librarians (password "{SYNTHETIC_PASSWORD}").')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, default='10k', help='Number of copies to generate.')
+        parser.add_argument('--copies', type=int, help='Exact number of copies, instead of --scale.')
+        parser.add_argument('--seed', type=seed, default=0,
+                            help='The same seed always gives the same catalog; 0 to 999.')
+        parser.add_argument('--batch-size', type=int, default=20000, help='Rows per bulk INSERT and transaction.')
+
+    def handle(self, *args, scale, copies, seed, batch_size, **options):
+        generator = CatalogGenerator(copies or SCALES[scale], seed=seed, batch_size=batch_size)
+        self.stdout.write('Generating ' + ', '.join(f'{count:,} {kind}' for kind, count in generator.sizes().items()))
+        started = time.perf_counter()
+        try:
+            for stage, rows in generator.run():
+                self.stdout.write(f'{stage}: {rows:,} rows ({time.perf_counter() - started:.1f}s)', ending='\r')
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f'Generated seed {seed} in {time.perf_counter() - started:.1f}s.'))
@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.importer import CatalogImporter, read_records
+
+
+class Command(BaseCommand):
+    help = ('Bulk import catalog records from CSV or JSON-lines files. Books are deduplicated on ISBN; '
+            'authors, genres and languages they reference are created as needed.')
+
+    # Import order matters: copies reference books, books reference the rest.
+    kinds = ('languages', 'genres', 'authors', 'books', 'copies')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--languages', metavar='FILE', help='Records with a "name" column.')
+        parser.add_argument('--genres', metavar='FILE', help='Records with a "name" column.')
+        parser.add_argument('--authors', metavar='FILE',
+                            help='Records with "first_name", "last_name", "date_of_birth", "date_of_death".')
+        parser.add_argument('--books', metavar='FILE',
+                            help='Records with "title", "isbn", "summary", "author_first_name", "author_last_name", '
+                                 '"language" and "genres" (a list, or "|"-separated in CSV).')
+        parser.add_argument('--copies', metavar='FILE',
+                            help='Records with "isbn", "imprint", "status", "due_back", "language", "borrower" '
+                                 '(username) and optionally "id".')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk INSERT and transaction.')
+
+    def handle(self, *args, batch_size, **options):
+        if not any(options[kind] for kind in self.kinds):
+            raise CommandError('Give at least one of --' + ', --'.join(self.kinds) + '.')
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive.')
+
+        importer = CatalogImporter(batch_size=batch_size)
+        try:
+            for kind in self.kinds:
+                if options[kind]:
+                    self.import_file(importer, kind, options[kind])
+        finally:
+            importer.finish()
+
+        for error in importer.errors:
+            self.stderr.write(error)
+
+    def import_file(self, importer, kind, path):
+        started = time.perf_counter()
+        rows = 0
+        try:
+            for count in getattr(importer, f'import_{kind}')(read_records(path)):
+                rows += count
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'{kind}: {rows} rows ({rows / elapsed:,.0f} rows/s)', ending='\r')
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot import {path}: {e}')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{kind}: read {rows} rows, created {importer.created[kind]}, skipped {importer.skipped[kind]} '
+            f'in {elapsed:.1f}s ({rows / elapsed if elapsed else rows:,.0f} rows/s).'
+        ))
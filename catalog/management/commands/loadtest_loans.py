@@ -0,0 +1,117 @@
+import random
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+from catalog import loans
+from catalog.models import Book, BookInstance
+
+LOADTEST_ISBN = 'LOADTEST00000'
+
+
+class Command(BaseCommand):
+    help = ('Hammer a few copies of one popular title with concurrent checkout/return clients and verify that no '
+            'copy is ever lent twice. Creates its own book, copies and users and removes them afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=16, help='Concurrent client threads.')
+        parser.add_argument('--copies', type=int, default=4, help='Copies of the popular title.')
+        parser.add_argument('--operations', type=int, default=200, help='Checkout attempts per client.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, clients, copies, operations, seed, **options):
+        if Book.objects.filter(isbn=LOADTEST_ISBN).exists():
+            raise CommandError('A previous load test left data behind; delete the book with ISBN '
+                               f'{LOADTEST_ISBN} first.')
+
+        book = Book.objects.create(title='Load test', summary='Load test', isbn=LOADTEST_ISBN)
+        copy_ids = [BookInstance.objects.create(book=book, imprint='Load test', status='a').pk
+                    for _ in range(copies)]
+        users = [User.objects.create_user(username=f'loadtest-{seed}-{client}') for client in range(clients)]
+        try:
+            stats = self.run_clients(copy_ids, users, operations, seed)
+            self.verify(copy_ids, stats['holders'])
+        finally:
+            BookInstance.objects.filter(book=book).delete()
+            book.delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{stats["operations"]} operations by {clients} clients on {copies} copies in {stats["elapsed"]:.2f}s '
+            f'({stats["operations"] / stats["elapsed"]:,.0f} ops/s): {stats["checkouts"]} checkouts, '
+            f'{stats["conflicts"]} refused as already lent, {stats["retries"]} lock retries, no double loans.'
+        ))
+
+    def run_clients(self, copy_ids, users, operations, seed):
+        lock = threading.Lock()
+        holders = dict.fromkeys(copy_ids)
+        stats = {'operations': 0, 'checkouts': 0, 'conflicts': 0, 'retries': 0, 'errors': []}
+
+        def attempt(operation):
+            # SQLite reports write contention as an error instead of waiting; real servers just block.
+            while True:
+                try:
+                    return operation()
+                except OperationalError as e:
+                    if 'locked' not in str(e):
+                        raise
+                    with lock:
+                        stats['retries'] += 1
+                    time.sleep(0.001)
+
+        def client(user, rng):
+            try:
+                held = []
+                for _ in range(operations):
+                    if held and rng.random() < 0.5:
+                        copy_id = held.pop(rng.randrange(len(held)))
+                        # Forget the holder first: once the return commits, another client may win the copy.
+                        with lock:
+                            holders[copy_id] = None
+                        attempt(lambda: loans.return_copy(copy_id))
+                    else:
+                        copy_id = rng.choice(copy_ids)
+                        try:
+                            attempt(lambda: loans.checkout(copy_id, user))
+                        except loans.LoanError:
+                            with lock:
+                                stats['conflicts'] += 1
+                        else:
+                            with lock:
+                                if holders[copy_id] is not None:
+                                    stats['errors'].append(f'{copy_id} lent to {user} while held by '
+                                                           f'{holders[copy_id]}')
+                                holders[copy_id] = user
+                                stats['checkouts'] += 1
+                            held.append(copy_id)
+                    with lock:
+                        stats['operations'] += 1
+            except Exception as e:
+                with lock:
+                    stats['errors'].append(repr(e))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=client, args=(user, random.Random(seed + index)))
+                   for index, user in enumerate(users)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats['elapsed'] = time.perf_counter() - started
+        stats['holders'] = holders
+
+        if stats['errors']:
+            raise CommandError('Load test failed:\n' + '\n'.join(stats['errors'][:20]))
+        return stats
+
+    def verify(self, copy_ids, holders):
+        for copy in BookInstance.objects.filter(pk__in=copy_ids):
+            expected = holders[copy.pk]
+            if (copy.borrower_id, copy.status) != ((expected.pk, 'o') if expected else (None, 'a')):
+                raise CommandError(f'Copy {copy.pk} is {copy.status} for borrower {copy.borrower_id}, '
+                                   f'expected {expected}.')
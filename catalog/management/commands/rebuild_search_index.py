@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from catalog.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for all books.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Number of books indexed per INSERT ... SELECT statement.')
+
+    def handle(self, *args, batch_size, **options):
+        started = time.perf_counter()
+        total = 0
+        with transaction.atomic():
+            for indexed in rebuild_index(batch_size):
+                total += indexed
+                self.stdout.write(f'Indexed {total} books', ending='\r')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} books in {elapsed:.1f}s.'))
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from catalog.availability import repair_availability
+
+
+class Command(BaseCommand):
+    help = 'Recompute the denormalized copy counters of every book from its copies.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Books recomputed per UPDATE statement.')
+
+    def handle(self, *args, batch_size, **options):
+        started = time.perf_counter()
+        total = 0
+        for repaired in repair_availability(batch_size):
+            total += repaired
+            self.stdout.write(f'Repaired {total} books', ending='\r')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Repaired {total} books in {elapsed:.1f}s.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from catalog.overdue import send_overdue_notices
+
+
+class Command(BaseCommand):
+    help = 'Email every borrower a single reminder listing all of their overdue books.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Count overdue loans without sending email.')
+        parser.add_argument('--batch-size', type=int, default=100, help='Messages handed to the mail backend at once.')
+
+    def handle(self, *args, dry_run, batch_size, **options):
+        result = send_overdue_notices(batch_size=batch_size, dry_run=dry_run)
+        verb = 'Would notify' if dry_run else 'Notified'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {result["borrowers"]} borrowers about {result["copies"]} overdue copies.'
+        ))
+        if result['without_email']:
+            self.stdout.write(self.style.WARNING(f'{result["without_email"]} borrowers have no email address.'))
@@ -0,0 +1,31 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from catalog.routers import replica_aliases
+
+
+class Command(BaseCommand):
+    help = ('Copy the SQLite primary database onto every SQLite replica, standing in for replication when trying '
+            'out read replicas locally. Run it again whenever replicas should catch up; until then they lag.')
+
+    def handle(self, *args, **options):
+        primary = connections['default']
+        replicas = replica_aliases()
+        if not replicas:
+            raise CommandError('No replicas are configured; set DATABASE_REPLICA_URLS.')
+        for alias in ['default', *replicas]:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'Database "{alias}" is not SQLite.')
+
+        for alias in replicas:
+            connections[alias].close()
+            source = sqlite3.connect(str(primary.settings_dict['NAME']))
+            target = sqlite3.connect(str(connections[alias].settings_dict['NAME']))
+            try:
+                source.backup(target)
+            finally:
+                source.close()
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f'Copied the primary onto {alias}.'))
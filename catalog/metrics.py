@@ -0,0 +1,125 @@
+"""
+Prometheus metrics.
+
+Request, query, cache and session metrics are recorded with ``prometheus_client``. Under gunicorn each worker writes
+its values to memory-mapped files in ``PROMETHEUS_MULTIPROC_DIR`` (set up by ``gunicorn.conf.py``) and a scrape of
+``/metrics`` sums the files of every worker, so totals stay right however many workers serve requests. Without that
+variable, as under ``runserver``, values live in process memory. Loan gauges are read from the database at scrape
+time, so they need no aggregation.
+"""
+import asyncio
+import datetime
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from prometheus_client import REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+
+from .models import BookInstance
+from .queryhooks import query_hook
+
+REQUEST_LATENCY = Histogram(
+    'catalog_request_duration_seconds', 'Time to produce a response, by URL name.', ['view', 'method'])
+REQUEST_QUERIES = Histogram(
+    'catalog_request_db_queries', 'SQL queries run per request, by URL name.', ['view'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, float('inf')))
+REQUEST_DB_TIME = Histogram(
+    'catalog_request_db_duration_seconds', 'Time spent running SQL per request, by URL name.', ['view'],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, float('inf')))
+CACHE_LOOKUPS = Counter(
+    'catalog_cache_lookups', 'Cache lookups by cache and result (hit or miss).', ['cache', 'result'])
+SESSION_OPERATIONS = Counter(
+    'catalog_session_operations', 'Session store operations by kind.', ['operation'])
+
+
+def record_cache_lookup(cache, hit):
+    CACHE_LOOKUPS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+class QueryCounter:
+    """``connection.execute_wrapper`` hook counting and timing queries."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            with self.lock:
+                self.duration += duration
+                self.queries += 1
+
+
+class MetricsMiddleware:
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Tells Django to await the middleware rather than run it on a thread.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with query_hook(counter):
+            response = self.get_response(request)
+        self.observe(request, started, counter)
+        return response
+
+    async def __acall__(self, request):
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with query_hook(counter):
+            response = await self.get_response(request)
+        self.observe(request, started, counter)
+        return response
+
+    def observe(self, request, started, counter):
+        match = request.resolver_match
+        view = match.view_name if match and match.url_name else '<unnamed>'
+        REQUEST_LATENCY.labels(view, request.method).observe(time.perf_counter() - started)
+        REQUEST_QUERIES.labels(view).observe(counter.queries)
+        REQUEST_DB_TIME.labels(view).observe(counter.duration)
+
+
+class LoanCollector:
+    """Loan gauges, counted in the database whenever metrics are scraped."""
+
+    def collect(self):
+        on_loan = BookInstance.objects.on_loan()
+        yield GaugeMetricFamily('catalog_loans_active', 'Copies currently on loan.', value=on_loan.count())
+        yield GaugeMetricFamily('catalog_loans_overdue', 'Copies on loan past their due date.',
+                                value=on_loan.overdue(datetime.date.today()).count())
+
+
+def render_metrics():
+    """The text exposition of every metric, summed over all worker processes when running multi-process."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    loans = CollectorRegistry()
+    loans.register(LoanCollector())
+    return generate_latest(registry) + generate_latest(loans)
+
+
+def is_authorized(request):
+    """Scrapers send the ``METRICS_TOKEN`` bearer token; without one configured, only staff users may look."""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    return request.user.is_staff
@@ -0,0 +1,50 @@
+from django.db import migrations
+
+# The SQL of catalog.search as of this migration, copied so later changes there do not alter it.
+BOOK_DOCUMENTS = (
+    "SELECT b.id, b.title, COALESCE(a.first_name || ' ' || a.last_name, ''), b.summary, b.isbn "
+    "FROM catalog_book b LEFT JOIN catalog_author a ON a.id = b.author_id"
+)
+
+CREATE = {
+    'sqlite': [
+        'CREATE VIRTUAL TABLE IF NOT EXISTS catalog_book_search '
+        'USING fts5(title, author, summary, isbn, tokenize="unicode61 remove_diacritics 2")',
+        f'INSERT INTO catalog_book_search (rowid, title, author, summary, isbn) {BOOK_DOCUMENTS}',
+    ],
+    'postgresql': [
+        'CREATE TABLE IF NOT EXISTS catalog_book_search (book_id bigint PRIMARY KEY, document tsvector NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS catalog_book_search_document_gin ON catalog_book_search USING gin (document)',
+        "INSERT INTO catalog_book_search (book_id, document) "
+        "SELECT d.id, "
+        "setweight(to_tsvector('simple', COALESCE(d.title, '')), 'A') || "
+        "setweight(to_tsvector('simple', COALESCE(d.isbn, '')), 'A') || "
+        "setweight(to_tsvector('simple', d.author), 'B') || "
+        "setweight(to_tsvector('simple', COALESCE(d.summary, '')), 'C') "
+        f"FROM ({BOOK_DOCUMENTS}) AS d (id, title, author, summary, isbn) "
+        "ON CONFLICT (book_id) DO UPDATE SET document = EXCLUDED.document",
+    ],
+}
+
+
+def create_search_index(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for sql in CREATE.get(schema_editor.connection.vendor, []):
+            cursor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute('DROP TABLE IF EXISTS catalog_book_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0007_alter_author_date_of_death'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.7 on 2026-10-18 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_book_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='bookinstance',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='author',
+            name='date_of_birth',
+            field=models.DateField(blank=True, help_text='YYYY-MM-DD', null=True),
+        ),
+        migrations.AlterField(
+            model_name='author',
+            name='date_of_death',
+            field=models.DateField(blank=True, help_text='YYYY-MM-DD', null=True, verbose_name='died'),
+        ),
+        migrations.AlterField(
+            model_name='bookinstance',
+            name='due_back',
+            field=models.DateField(blank=True, help_text='YYYY-MM-DD', null=True),
+        ),
+    ]
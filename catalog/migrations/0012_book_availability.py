@@ -0,0 +1,75 @@
+# Generated by Django 3.2.7 on 2026-10-18 18:08
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+# Counter -> copy status it counts (None for all copies), as catalog.availability defined them for this migration
+COUNTERS = {
+    'copies_total': None,
+    'copies_available': 'a',
+    'copies_on_loan': 'o',
+    'copies_reserved': 'r',
+    'copies_maintenance': 'm',
+}
+
+
+def populate_availability(apps, schema_editor):
+    Book = apps.get_model('catalog', 'Book')
+    BookInstance = apps.get_model('catalog', 'BookInstance')
+    copies = BookInstance.objects.filter(book=OuterRef('pk')).order_by().values('book')
+
+    def count(status):
+        filtered = copies if status is None else copies.filter(status=status)
+        return Coalesce(Subquery(filtered.annotate(n=Count('pk')).values('n')), Value(0),
+                        output_field=IntegerField())
+
+    Book.objects.update(
+        earliest_due_back=Subquery(copies.filter(status='o').annotate(due=Min('due_back')).values('due')),
+        **{name: count(status) for name, status in COUNTERS.items()},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0011_tableversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='copies_available',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_maintenance',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_on_loan',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_reserved',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_total',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='earliest_due_back',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(condition=models.Q(('copies_available__gt', 0)), fields=['title'], name='book_available_title_idx'),
+        ),
+        migrations.RunPython(populate_availability, migrations.RunPython.noop),
+    ]
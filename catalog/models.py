@@ -3,6 +3,7 @@ import uuid
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth.models import User
 from datetime import date
 from django.utils.translation import gettext_lazy as _
@@ -19,6 +20,12 @@ class Genre(models.Model):
     def get_absolute_url(self):
         return reverse('genre-detail', args=[str(self.id)])
 
+    class Meta:
+        indexes = [
+            # GenreList pages by (name, pk)
+            models.Index(fields=['name', 'id'], name='genre_name_idx'),
+        ]
+
 
 class Language(models.Model):
     name = models.CharField(max_length=200,
@@ -31,6 +38,15 @@ class Language(models.Model):
     def get_absolute_url(self):
         return reverse('language-detail', args=[str(self.id)])
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', 'id'], name='language_name_idx'),
+        ]
+
+
+AVAILABILITY_FIELDS = ('copies_total', 'copies_available', 'copies_on_loan', 'copies_reserved', 'copies_maintenance',
+                       'earliest_due_back')
+
 
 class Book(models.Model):
     """Model representing a book (but not a specific copy of a book)."""
@@ -42,9 +58,31 @@ class Book(models.Model):
                             "https://www.isbn-international.org/content/what-isbn">ISBN number</a>')
     genre = models.ManyToManyField(Genre, help_text='Select a genre for this book')
     language_of_origin = models.ForeignKey('Language', on_delete=models.SET_NULL, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Denormalized from BookInstance by catalog.availability; never edit these directly.
+    copies_total = models.PositiveIntegerField(default=0, editable=False)
+    copies_available = models.PositiveIntegerField(default=0, editable=False)
+    copies_on_loan = models.PositiveIntegerField(default=0, editable=False)
+    copies_reserved = models.PositiveIntegerField(default=0, editable=False)
+    copies_maintenance = models.PositiveIntegerField(default=0, editable=False)
+    earliest_due_back = models.DateField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ['title']
+        indexes = [
+            # Keyset pages of the book list, in (title, pk) order
+            models.Index(fields=['title', 'id'], name='book_title_idx'),
+            models.Index(fields=['title'], condition=models.Q(copies_available__gt=0),
+                         name='book_available_title_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # The copy counters change concurrently with edits to the book, so ordinary saves must not overwrite them.
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in AVAILABILITY_FIELDS]
+        super().save(*args, **kwargs)
 
     def display_genre(self):
         """Create a string for the Genre. This is required to display genre in Admin."""
@@ -60,6 +98,15 @@ class Book(models.Model):
         return reverse('book-detail', args=[str(self.id)])
 
 
+class BookInstanceQuerySet(models.QuerySet):
+    def on_loan(self):
+        return self.filter(status__exact='o')
+
+    def overdue(self, today=None):
+        """Copies on loan past their due date, found with the (status, due_back, id) index."""
+        return self.on_loan().filter(due_back__lt=today or date.today())
+
+
 class BookInstance(models.Model):
     """Model representing a specific copy of a book (i.e. that can be borrowed from the library)."""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4,
@@ -84,10 +131,22 @@ class BookInstance(models.Model):
         default='m',
         help_text='Book availability',
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = BookInstanceQuerySet.as_manager()
 
     class Meta:
         ordering = ['due_back']
         permissions = (("can_mark_returned", "Set book as returned"),)
+        indexes = [
+            # Copies by status in due date order: the loan and overdue lists, without a sort for the pk tiebreaker
+            models.Index(fields=['status', 'due_back', 'id'], name='bookinstance_status_due_idx'),
+            # A reader's loans in due date order
+            models.Index(fields=['borrower', 'due_back', 'id'], condition=models.Q(status='o'),
+                         name='bookinstance_borrower_loan_idx'),
+            # All copies in due date order
+            models.Index(fields=['due_back', 'id'], name='bookinstance_due_idx'),
+        ]
 
     def __str__(self):
         """String for representing the particular instance of the book."""
@@ -109,15 +168,56 @@ class BookInstance(models.Model):
         return dict(BookInstance.LOAN_STATUS)[self.status]
 
 
+class Hold(models.Model):
+    """A patron's place in the queue for the next copy of a book to come back."""
+    book = models.ForeignKey(Book, on_delete=models.CASCADE)
+    patron = models.ForeignKey(User, on_delete=models.CASCADE)
+    # The copy set aside for the patron once the hold is ready
+    copy = models.ForeignKey(BookInstance, on_delete=models.SET_NULL, null=True, blank=True)
+
+    HOLD_STATUS = (
+        ('w', 'Waiting'),
+        ('r', 'Ready for pickup'),
+        ('c', 'Collected'),
+        ('x', 'Expired'),
+        ('n', 'Cancelled'),
+    )
+
+    status = models.CharField(max_length=1, choices=HOLD_STATUS, default='w')
+    placed_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(null=True, blank=True, help_text='Pickup deadline of a ready hold')
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # A book's holds by status in order of arrival: the next patron in line is the first waiting entry.
+            # Status is a column rather than a partial index condition, which SQLite cannot match to a bound parameter.
+            models.Index(fields=['book', 'status', 'id'], name='hold_queue_idx'),
+            # Ready holds by pickup deadline, for the expiry job
+            models.Index(fields=['status', 'expires_at', 'id'], name='hold_expiry_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['patron', 'book'], condition=models.Q(status__in=['w', 'r']),
+                                    name='hold_one_open_per_patron'),
+        ]
+
+    def __str__(self):
+        return f'{self.book.title} for {self.patron} ({self.get_status_display()})'
+
+
 class Author(models.Model):
     """Model representing an author."""
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
     date_of_birth = models.DateField(null=True, blank=True, help_text='YYYY-MM-DD')
     date_of_death = models.DateField('died', null=True, blank=True, help_text='YYYY-MM-DD')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ['last_name', 'first_name']
+        indexes = [
+            models.Index(fields=['last_name', 'first_name', 'id'], name='author_name_idx'),
+        ]
 
     def get_absolute_url(self):
         """Returns the url to access a particular author instance."""
@@ -126,3 +226,13 @@ class Author(models.Model):
     def __str__(self):
         """String for representing the Model object."""
         return f'{self.last_name}, {self.first_name}'
+
+
+class TableVersion(models.Model):
+    """Change counter for a catalog table, bumped on every write. Used to build ETags without reading the rows."""
+    table = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'{self.table} v{self.version}'
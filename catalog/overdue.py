@@ -0,0 +1,63 @@
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+from .models import BookInstance
+
+
+def overdue_notices(today=None):
+    """Yield ``(borrower, copies)`` for every borrower with overdue copies, streaming the loans in borrower order."""
+    loans = BookInstance.objects.overdue(today)\
+        .filter(borrower__isnull=False)\
+        .select_related('book', 'borrower')\
+        .only('id', 'due_back', 'book__title', 'borrower__username', 'borrower__email',
+              'borrower__first_name', 'borrower__last_name')\
+        .order_by('borrower_id', 'due_back', 'pk')
+    for _borrower_id, copies in groupby(loans.iterator(chunk_size=2000), key=lambda copy: copy.borrower_id):
+        copies = list(copies)
+        yield copies[0].borrower, copies
+
+
+def build_message(borrower, copies):
+    lines = [f'Dear {borrower.get_full_name() or borrower.username},', '',
+             'The following books are overdue. Please return them to the library as soon as possible:', '']
+    lines += [f'  - {copy.book.title} (due {copy.due_back:%Y-%m-%d})' for copy in copies]
+    return EmailMessage(
+        subject=f'You have {len(copies)} overdue book{"s" if len(copies) != 1 else ""}',
+        body='\n'.join(lines),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[borrower.email],
+    )
+
+
+def send_overdue_notices(today=None, batch_size=100, dry_run=False):
+    """
+    Send one email per borrower listing all their overdue copies, over a single mail server connection.
+
+    Returns counts of borrowers notified, copies listed and borrowers skipped for having no email address.
+    """
+    result = {'borrowers': 0, 'copies': 0, 'without_email': 0}
+    connection = None if dry_run else get_connection()
+    batch = []
+    try:
+        if connection is not None:
+            # Opened here, the connection stays up across batches; send_messages closes only what it opened itself.
+            connection.open()
+        for borrower, copies in overdue_notices(today):
+            if not borrower.email:
+                result['without_email'] += 1
+                continue
+            result['borrowers'] += 1
+            result['copies'] += len(copies)
+            if connection is not None:
+                batch.append(build_message(borrower, copies))
+                if len(batch) >= batch_size:
+                    connection.send_messages(batch)
+                    batch = []
+        if batch:
+            connection.send_messages(batch)
+    finally:
+        if connection is not None:
+            connection.close()
+    return result
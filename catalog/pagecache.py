@@ -0,0 +1,139 @@
+"""
+Rendered page and fragment cache for catalog pages.
+
+Cached entries are keyed by version tokens of the objects they show: ``('book', 5)`` for one book and
+``('book', None)`` for lists of books. Signal handlers in ``catalog.signals`` replace the tokens of exactly the
+objects a write affects, so the next request misses and re-renders; nothing is ever deleted by pattern. Tokens are
+random rather than counters so a token evicted from the cache can never collide with an older one. Every key also
+depends on ``('all', None)``, which ``bump_all()`` replaces after bulk changes such as imports.
+
+Templates cache fragments with ``{% versioned_cache %}`` from ``catalog_cache``.
+
+Everything lives in the ``pages`` cache alias, which must be shared between processes (file-based or Redis) when
+running several gunicorn workers; with the local-memory backend other workers only notice after
+``PAGE_CACHE_TIMEOUT``.
+"""
+import hashlib
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+
+from .metrics import record_cache_lookup
+
+CACHE_ALIAS = 'pages'
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def get_timeout():
+    return getattr(settings, 'PAGE_CACHE_TIMEOUT', 300)
+
+
+def _version_key(dependency):
+    kind, pk = dependency
+    return f'pagecache:v:{kind}:{"*" if pk is None else pk}'
+
+
+def get_versions(dependencies):
+    """Return the current token of every dependency, creating tokens that do not exist yet."""
+    cache = get_cache()
+    keys = [_version_key(dependency) for dependency in dependencies]
+    versions = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    if missing:
+        # Tokens must outlive the entries built on them, so they never expire. A backend evicting one under memory
+        # pressure only costs a re-render: the dependency gets a new token and its entries are rebuilt.
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump(dependencies):
+    """Give new tokens to ``dependencies``, now and again once the current transaction commits."""
+    keys = [_version_key(dependency) for dependency in set(dependencies)]
+    if not keys:
+        return
+
+    def replace():
+        get_cache().set_many({key: uuid.uuid4().hex for key in keys}, timeout=None)
+
+    replace()
+    # A concurrent request may re-render from pre-commit data under the new token; replace it once more after commit.
+    transaction.on_commit(replace)
+
+
+def bump_all():
+    bump([('all', None)])
+
+
+def record(hit, cache='page'):
+    with _stats_lock:
+        _stats['hits' if hit else 'misses'] += 1
+    record_cache_lookup(cache, hit)
+
+
+def get_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = stats['hits'] / lookups if lookups else None
+    return stats
+
+
+def make_key(prefix, name, dependencies, vary=()):
+    versions = get_versions([('all', None), *dependencies])
+    signature = '|'.join([name, *versions, *(str(value) for value in vary)])
+    return f'pagecache:{prefix}:{hashlib.sha1(signature.encode()).hexdigest()}'
+
+
+def get_cached_page(request, dependencies):
+    """Return the cache key of an anonymous GET and the cached response for it, if any."""
+    key = make_key('page', request.get_full_path(), dependencies)
+    cached = get_cache().get(key)
+    record(hit=cached is not None)
+    if cached is None:
+        return key, None
+    response = HttpResponse(cached['content'], content_type=cached['content_type'])
+    response['X-Page-Cache'] = 'hit'
+    return key, response
+
+
+def cache_page(key, response):
+    """Render ``response`` and store it under ``key`` if it is a success that sets no cookies."""
+    if hasattr(response, 'render') and callable(response.render):
+        response.render()
+    if response.status_code == 200 and not response.cookies:
+        get_cache().set(key, {'content': response.content, 'content_type': response['Content-Type']}, get_timeout())
+    response['X-Page-Cache'] = 'miss'
+    return response
+
+
+class AnonymousPageCacheMixin:
+    """
+    Serve whole pages to anonymous users from the page cache.
+
+    Views list what they show in ``get_page_dependencies()``. Only successful GET responses are stored, keyed by full
+    path (so cursors and filters get their own entries) and the dependency tokens.
+    """
+
+    def get_page_dependencies(self):
+        raise NotImplementedError
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET' or not request.user.is_anonymous:
+            return super().dispatch(request, *args, **kwargs)
+
+        self.request, self.args, self.kwargs = request, args, kwargs
+        key, response = get_cached_page(request, self.get_page_dependencies())
+        if response is not None:
+            return response
+        return cache_page(key, super().dispatch(request, *args, **kwargs))
@@ -0,0 +1,184 @@
+import json
+
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F, Q
+from django.http import Http404
+from django.utils.translation import gettext as _
+
+CURSOR_SALT = 'catalog.pagination.cursor'
+
+
+class CursorSerializer:
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(',', ':'), cls=DjangoJSONEncoder).encode('latin-1')
+
+    def loads(self, data):
+        return json.loads(data.decode('latin-1'))
+
+
+def encode_cursor(values, reverse=False):
+    return signing.dumps({'v': values, 'r': reverse}, salt=CURSOR_SALT, serializer=CursorSerializer, compress=True)
+
+
+def decode_cursor(token):
+    """Return ``(values, reverse)`` for a cursor token, raising ``signing.BadSignature`` if it was tampered with."""
+    data = signing.loads(token, salt=CURSOR_SALT, serializer=CursorSerializer)
+    return data['v'], data['r']
+
+
+def approximate_count(queryset):
+    """Planner estimate of the table size on Postgres, or None where no cheap estimate exists."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql' or queryset.query.where:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    return max(row[0], 0) if row else None
+
+
+class CursorPage:
+    """A page of a keyset-paginated queryset. Mirrors the parts of ``django.core.paginator.Page`` templates use."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, approximate_total=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.approximate_total = approximate_total
+        self.next_url = self.previous_url = None
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginationMixin:
+    """
+    Keyset pagination for ListViews.
+
+    Pages are fetched with ``WHERE (ordering columns) > (last row seen)`` instead of ``OFFSET``, so every page costs
+    the same regardless of depth and no ``COUNT(*)`` is run. The ordering defaults to the model's ``Meta.ordering``
+    with ``pk`` appended as a tiebreaker. Links with the legacy ``?page=N`` parameter still use offset pagination.
+    """
+    cursor_ordering = None
+    cursor_query_param = 'cursor'
+    cursor_approximate_total = False
+    allow_offset_pagination = True
+
+    def get_cursor_ordering(self, queryset):
+        ordering = list(self.cursor_ordering or queryset.query.order_by or queryset.model._meta.ordering)
+        if not any(field.lstrip('-') in ('pk', 'id') for field in ordering):
+            ordering.append('pk')
+        for field in ordering:
+            if not isinstance(field, str) or '__' in field or '?' in field:
+                raise ImproperlyConfigured(f'{self.__class__.__name__} can only page on plain model fields, '
+                                           f'not {field!r}.')
+        return ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.allow_offset_pagination and self.page_kwarg in self.request.GET:
+            return super().paginate_queryset(queryset, page_size)
+
+        ordering = self.get_cursor_ordering(queryset)
+        token = self.request.GET.get(self.cursor_query_param)
+        values, reverse = None, False
+        if token:
+            try:
+                values, reverse = decode_cursor(token)
+            except (signing.BadSignature, ValueError, KeyError, TypeError):
+                raise Http404(_('Invalid cursor.'))
+            if not isinstance(values, list) or len(values) != len(ordering):
+                raise Http404(_('Invalid cursor.'))
+
+        approximate_total = approximate_count(queryset) if self.cursor_approximate_total else None
+        fields = [self._resolve_field(queryset.model, name) for name in ordering]
+        queryset = queryset.order_by(*self._order_expressions(fields, reverse))
+        if values is not None:
+            queryset = queryset.filter(self._after(fields, values, reverse))
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            # Walking backwards from a cursor: the row we came from is always ahead.
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_next:
+                next_cursor = encode_cursor(self._row_values(rows[-1], fields))
+            if has_previous:
+                previous_cursor = encode_cursor(self._row_values(rows[0], fields), reverse=True)
+
+        page = CursorPage(rows, next_cursor, previous_cursor, approximate_total)
+        page.next_url = next_cursor and self._cursor_url(next_cursor)
+        page.previous_url = previous_cursor and self._cursor_url(previous_cursor)
+        return None, page, rows, page.has_other_pages()
+
+    def _cursor_url(self, cursor):
+        query = self.request.GET.copy()
+        query[self.cursor_query_param] = cursor
+        return f'{self.request.path}?{query.urlencode()}'
+
+    @staticmethod
+    def _resolve_field(model, name):
+        descending = name.startswith('-')
+        name = name.lstrip('-')
+        field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+        return field, descending
+
+    @staticmethod
+    def _order_expressions(fields, reverse):
+        # NULLs sort first when ascending and last when descending, on every backend.
+        expressions = []
+        for field, descending in fields:
+            if descending != reverse:
+                expressions.append(F(field.attname).desc(nulls_last=True) if field.null else F(field.attname).desc())
+            else:
+                expressions.append(F(field.attname).asc(nulls_first=True) if field.null else F(field.attname).asc())
+        return expressions
+
+    @staticmethod
+    def _row_values(obj, fields):
+        return [getattr(obj, field.attname) for field, _descending in fields]
+
+    @staticmethod
+    def _after(fields, values, reverse):
+        """Build ``(f1, f2, ...) > (v1, v2, ...)`` in the page's sort order, with NULLs placed as above."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (field, descending), value in zip(fields, values):
+            name = field.attname
+            if descending != reverse:
+                if value is None:
+                    # NULLs sort last, so nothing follows them.
+                    after = Q(pk__in=[])
+                else:
+                    after = Q(**{f'{name}__lt': value})
+                    if field.null:
+                        after |= Q(**{f'{name}__isnull': True})
+            else:
+                after = Q(**{f'{name}__isnull': False}) if value is None else Q(**{f'{name}__gt': value})
+            condition |= equal & after
+            equal &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+        return condition
@@ -0,0 +1,241 @@
+"""
+Opt-in request profiling.
+
+With ``REQUEST_PROFILING`` on, ``ProfilingMiddleware`` records for every request the resolved URL name, the number of
+SQL queries and how many of them repeated an earlier query verbatim, the time spent in the database, in template
+rendering (through the ``ProfilingTemplates`` backend) and in total. Records go to a per-process ring buffer of the
+last ``REQUEST_PROFILING_BUFFER`` requests; the ``profiling`` view serves percentiles per URL name to staff, and each
+response carries the same numbers in a ``Server-Timing`` header for browser dev tools.
+
+A ``REQUEST_PROFILING_SAMPLE_RATE`` fraction of requests also runs under cProfile. The slowest
+``REQUEST_PROFILING_DUMPS`` of those are kept as ``.prof`` files in ``REQUEST_PROFILING_DUMP_DIR``, readable with
+``python -m pstats``. Streaming responses are timed up to the first byte only. cProfile sees a single thread, so
+requests served by the async handler under ASGI are never sampled.
+"""
+import asyncio
+import contextvars
+import cProfile
+import heapq
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.template.backends.django import DjangoTemplates, Template
+
+from .queryhooks import query_hook
+
+_current = contextvars.ContextVar('catalog_request_profile', default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.render_depth = 0
+        self.statements = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        """``connection.execute_wrapper`` hook counting and timing every query."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            key = (sql, repr(params))
+            with self.lock:
+                self.db_time += duration
+                self.queries += 1
+                self.statements[key] = self.statements.get(key, 0) + 1
+
+    @property
+    def duplicates(self):
+        return self.queries - len(self.statements)
+
+
+class ProfilingTemplate(Template):
+    def render(self, context=None, request=None):
+        profile = _current.get()
+        if profile is None:
+            return super().render(context, request)
+        # Included and extended templates render inside the outermost one; count that one only.
+        profile.render_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.render_depth -= 1
+            if not profile.render_depth:
+                profile.render_time += time.perf_counter() - started
+
+
+class ProfilingTemplates(DjangoTemplates):
+    """The Django template backend, timing renders while a request is profiled."""
+
+    def from_string(self, template_code):
+        return ProfilingTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return ProfilingTemplate(super().get_template(template_name).template, self)
+
+
+class RequestLog:
+    """Thread-safe ring buffer of request records."""
+
+    def __init__(self, size=1000):
+        self.lock = threading.Lock()
+        self.records = deque(maxlen=size)
+        self.dumps = []  # min-heap of (total_ms, path)
+
+    def resize(self, size):
+        with self.lock:
+            if self.records.maxlen != size:
+                self.records = deque(self.records, maxlen=size)
+
+    def add(self, record):
+        with self.lock:
+            self.records.append(record)
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.records)
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+
+    def dump_paths(self):
+        with self.lock:
+            return [path for _total_ms, path in sorted(self.dumps, reverse=True)]
+
+    def keep_dump(self, total_ms, path, limit):
+        """Remember a cProfile dump; return the path of a dump that no longer ranks among the slowest, if any."""
+        with self.lock:
+            heapq.heappush(self.dumps, (total_ms, path))
+            if len(self.dumps) > limit:
+                return heapq.heappop(self.dumps)[1]
+        return None
+
+
+request_log = RequestLog()
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def summarize(records):
+    """Per URL name: request count, p50/p95/p99 of total, DB and render time, and query statistics."""
+    by_name = {}
+    for record in records:
+        by_name.setdefault(record['url_name'], []).append(record)
+
+    summary = {}
+    for name, group in sorted(by_name.items()):
+        row = {'requests': len(group)}
+        for field in ('total_ms', 'db_ms', 'render_ms'):
+            values = sorted(record[field] for record in group)
+            for label, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+                row[f'{field[:-3]}_{label}_ms'] = round(percentile(values, fraction), 2)
+        row['queries_avg'] = round(sum(record['queries'] for record in group) / len(group), 1)
+        row['queries_max'] = max(record['queries'] for record in group)
+        row['duplicate_queries_max'] = max(record['duplicates'] for record in group)
+        summary[name] = row
+    return summary
+
+
+def server_timing(record):
+    return ', '.join([
+        f'db;dur={record["db_ms"]:.2f};desc="{record["queries"]} queries, {record["duplicates"]} duplicate"',
+        f'render;dur={record["render_ms"]:.2f}',
+        f'total;dur={record["total_ms"]:.2f}',
+    ])
+
+
+class ProfilingMiddleware:
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Tells Django to await the middleware rather than run it on a thread.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        self.sample_rate = getattr(settings, 'REQUEST_PROFILING_SAMPLE_RATE', 0.0)
+        self.dump_limit = getattr(settings, 'REQUEST_PROFILING_DUMPS', 10)
+        self.dump_dir = getattr(settings, 'REQUEST_PROFILING_DUMP_DIR', None)
+        request_log.resize(getattr(settings, 'REQUEST_PROFILING_BUFFER', 1000))
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        profiler = cProfile.Profile() if self.dump_dir and random.random() < self.sample_rate else None
+        try:
+            with query_hook(profile):
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+        finally:
+            _current.reset(token)
+        record = self.record(request, response, profile)
+        if profiler is not None:
+            self.dump(profiler, record)
+        return response
+
+    async def __acall__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            with query_hook(profile):
+                response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, profile)
+        return response
+
+    def record(self, request, response, profile):
+        match = request.resolver_match
+        record = {
+            'url_name': match.view_name if match and match.url_name else '<unnamed>',
+            'method': request.method,
+            'status': response.status_code,
+            'queries': profile.queries,
+            'duplicates': profile.duplicates,
+            'db_ms': profile.db_time * 1000,
+            'render_ms': profile.render_time * 1000,
+            'total_ms': (time.perf_counter() - profile.started) * 1000,
+            'time': time.time(),
+        }
+        request_log.add(record)
+        response['Server-Timing'] = server_timing(record)
+        return record
+
+    def dump(self, profiler, record):
+        os.makedirs(self.dump_dir, exist_ok=True)
+        name = f'{record["total_ms"]:010.1f}ms-{record["url_name"].replace(":", "_")}-{os.getpid()}-{record["time"]:.0f}'
+        path = os.path.join(self.dump_dir, f'{name}.prof')
+        profiler.dump_stats(path)
+        dropped = request_log.keep_dump(record['total_ms'], path, self.dump_limit)
+        if dropped:
+            try:
+                os.remove(dropped)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,40 @@
+"""
+Query hooks that follow a request from thread to thread.
+
+``connection.execute_wrapper`` hooks the connection of one thread, but under ASGI a request's queries run on other
+threads: its sync middleware and views on asgiref's shared thread, the queries of the async views on pool threads.
+``query_hook`` keeps hooks in a context variable instead, which asgiref carries over to whichever thread runs the
+request's code, and every connection runs the hooks of the context it is used in. Hooks may so be called from several
+threads at once.
+"""
+import contextvars
+import functools
+from contextlib import contextmanager
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_hooks = contextvars.ContextVar('catalog_query_hooks', default=())
+
+
+def run_hooks(execute, sql, params, many, context):
+    """``connection.execute_wrapper`` hook running the current context's hooks, the first added outermost."""
+    for hook in reversed(_hooks.get()):
+        execute = functools.partial(hook, execute)
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def install(sender, connection, **kwargs):
+    if run_hooks not in connection.execute_wrappers:
+        connection.execute_wrappers.append(run_hooks)
+
+
+@contextmanager
+def query_hook(hook):
+    """Run ``hook``, an ``execute_wrapper`` hook, around the queries of the current context on every connection."""
+    token = _hooks.set(_hooks.get() + (hook,))
+    try:
+        yield
+    finally:
+        _hooks.reset(token)
@@ -0,0 +1,125 @@
+"""
+Query plan audit of the catalog pages.
+
+``audit()`` renders each page in ``AUDITED_PAGES`` as a superuser, without middleware or the page cache, records every
+SELECT it runs and asks the database for the plan of each one. Plans that read a whole table rather than an index
+(``SCAN table`` on SQLite, ``Seq Scan`` on PostgreSQL) are flagged. List pages are audited on their first page and on
+the page behind their "next" link, whose keyset condition makes for a different query. Run it against a database of
+realistic size, such as one filled by ``generate_catalog``: planners rightly scan tables of a few rows.
+"""
+import re
+from urllib.parse import urlsplit
+
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from .models import Author, Book, BookInstance, Genre, Language
+
+# (URL name, model whose first row is the detail page's object, query string)
+AUDITED_PAGES = [
+    ('books', None, {}),
+    ('books', None, {'available': '1'}),
+    ('book-detail', Book, {}),
+    ('authors', None, {}),
+    ('author-detail', Author, {}),
+    ('genres', None, {}),
+    ('genre-detail', Genre, {}),
+    ('languages', None, {}),
+    ('language-detail', Language, {}),
+    ('bookinstances', None, {}),
+    ('bookinstance-detail', BookInstance, {}),
+    ('my-borrowed', None, {}),
+    ('all-borrowed', None, {}),
+    ('overdue', None, {}),
+]
+
+SQLITE_TABLE_SCAN = re.compile(r'^SCAN (TABLE )?(?!CONSTANT ROW)(?P<table>\S+)(?!.* USING )')
+POSTGRESQL_TABLE_SCAN = re.compile(r'Seq Scan on (?P<table>\S+)')
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` hook keeping the SQL and parameters of every SELECT."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith('SELECT'):
+            self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def explain(sql, params, using='default'):
+    """The plan of a query as a list of lines."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN {sql}', params)
+            return [row[0] for row in cursor.fetchall()]
+    raise NotImplementedError(f'Plans are only read on SQLite and PostgreSQL, not {connection.vendor}.')
+
+
+def table_scans(plan, vendor):
+    """Tables a plan reads in full."""
+    pattern = SQLITE_TABLE_SCAN if vendor == 'sqlite' else POSTGRESQL_TABLE_SCAN
+    return [match.group('table') for match in map(pattern.search, (line.strip() for line in plan)) if match]
+
+
+def render_page(path, user, using='default'):
+    """Render ``path`` for ``user``; return the SELECTs it ran and the response."""
+    parts = urlsplit(path)
+    request = RequestFactory().get(path)
+    request.user = user
+    request.session = {}
+    match = resolve(parts.path)
+    request.resolver_match = match
+    recorder = QueryRecorder()
+    with connections[using].execute_wrapper(recorder):
+        response = match.func(request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+    return recorder.queries, response
+
+
+def audit_user():
+    """An unsaved superuser standing in for a reader with loans, so every page is allowed and has rows to show."""
+    borrower_id = BookInstance.objects.on_loan().exclude(borrower=None).values_list('borrower', flat=True).first()
+    return User(pk=borrower_id or 0, username='audit', is_superuser=True, is_staff=True)
+
+
+def page_paths():
+    """The path of every audited page that has something to show."""
+    for url_name, model, query in AUDITED_PAGES:
+        args = []
+        if model is not None:
+            pk = model.objects.order_by('pk').values_list('pk', flat=True).first()
+            if pk is None:
+                continue
+            args = [pk]
+        path = reverse(url_name, args=args)
+        if query:
+            path += '?' + '&'.join(f'{key}={value}' for key, value in query.items())
+        yield url_name, path
+
+
+def audit(using='default'):
+    """Yield ``{'page', 'path', 'sql', 'plan', 'scans'}`` for every query the audited pages run."""
+    vendor = connections[using].vendor
+    user = audit_user()
+    for url_name, path in page_paths():
+        paths = [path]
+        while paths:
+            path = paths.pop()
+            queries, response = render_page(path, user, using)
+            for sql, params in queries:
+                plan = explain(sql, params, using)
+                yield {'page': url_name, 'path': path, 'sql': sql, 'plan': plan, 'scans': table_scans(plan, vendor)}
+            page = (getattr(response, 'context_data', None) or {}).get('page_obj')
+            next_url = getattr(page, 'next_url', None)
+            if next_url and 'cursor=' not in path:
+                paths.append(next_url)
@@ -0,0 +1,108 @@
+"""
+Read replica routing.
+
+``ReplicaRoutingMiddleware`` lets a request read from a randomly chosen replica (the ``replica*`` database aliases,
+see ``DATABASE_REPLICA_URLS``) when it is a GET or HEAD to one of ``REPLICA_READ_VIEWS``. Everything else, including
+management commands and tests, reads from ``default``. ``ReplicaRouter`` sends every write to ``default``.
+
+Replicas lag behind the primary, so whoever just wrote must not read from one:
+
+- Once a request writes, its remaining reads go to the primary.
+- The response then sets the ``PIN_COOKIE`` cookie for ``REPLICA_PIN_SECONDS``, which keeps the browser's following
+  requests, such as the redirect after a renewal, on the primary as well.
+
+Sessions are always read and written on the primary, and writing one does not pin. Anonymous pages rendered from a
+replica go into the page cache like any other, so a lagging replica can serve a stale page until it expires.
+"""
+import asyncio
+import contextvars
+import random
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE = 'primarydb'
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_current = contextvars.ContextVar('catalog_replica_routing', default=None)
+
+
+def replica_aliases():
+    return sorted(alias for alias in settings.DATABASES if alias.startswith('replica'))
+
+
+class RoutingState:
+    """Where the current request may read from."""
+
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        if state is None or state.wrote or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        return state.replica or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _current.get()
+        if state is not None and model._meta.app_label not in PRIMARY_ONLY_APPS:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary.
+        return None if db == DEFAULT_DB_ALIAS else False
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        self.replicas = replica_aliases()
+        if not self.replicas:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Tells Django to await the middleware rather than run it on a thread.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state = RoutingState()
+        token = _current.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.pin(response, state)
+
+    async def __acall__(self, request):
+        state = RoutingState()
+        token = _current.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.pin(response, state)
+
+    def pin(self, response, state):
+        if state.wrote:
+            response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True,
+                                samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _current.get()
+        if (state is not None and request.method in ('GET', 'HEAD') and PIN_COOKIE not in request.COOKIES
+                and request.resolver_match.view_name in settings.REPLICA_READ_VIEWS):
+            state.replica = random.choice(self.replicas)
@@ -0,0 +1,206 @@
+"""
+Full-text search over books.
+
+Every book has one row in the ``catalog_book_search`` shadow table holding its title, author name, summary and ISBN.
+On Postgres the row is a weighted ``tsvector`` behind a GIN index, on SQLite it lives in an FTS5 virtual table, and
+other backends fall back to ``icontains`` scans. The rows are kept in sync by the signal handlers in
+``catalog.signals`` and can be rebuilt with ``manage.py rebuild_search_index``.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Author, Book
+
+SEARCH_TABLE = 'catalog_book_search'
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(query):
+    return TOKEN_RE.findall(query.lower())[:16]
+
+
+def _book_document_sql(where):
+    """SELECT producing ``(id, title, author name, summary, isbn)`` for the books matching ``where``."""
+    return (
+        f'SELECT b.id, b.title, COALESCE(a.first_name || \' \' || a.last_name, \'\'), b.summary, b.isbn '
+        f'FROM {Book._meta.db_table} b LEFT JOIN {Author._meta.db_table} a ON a.id = b.author_id '
+        f'WHERE {where}'
+    )
+
+
+def _id_list(ids):
+    return ', '.join(['%s'] * len(ids))
+
+
+class SQLiteSearchBackend:
+    """FTS5 virtual table whose rowid is the book id."""
+
+    # bm25() column weights for (title, author, summary, isbn)
+    weights = (10.0, 5.0, 1.0, 10.0)
+
+    def create(self, cursor):
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} '
+            f'USING fts5(title, author, summary, isbn, tokenize="unicode61 remove_diacritics 2")'
+        )
+
+    def drop(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+    def index(self, cursor, where, params):
+        cursor.execute(f'INSERT INTO {SEARCH_TABLE} (rowid, title, author, summary, isbn) {_book_document_sql(where)}',
+                       params)
+
+    def remove(self, cursor, ids):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({_id_list(ids)})', ids)
+
+    def clear(self, cursor):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+    def search(self, cursor, tokens, limit, after=None):
+        match = ' AND '.join(f'"{token}"*' for token in tokens)
+        weights = ', '.join(str(weight) for weight in self.weights)
+        # bm25() is lower-is-better; negate it so every backend ranks descending.
+        sql = (
+            f'SELECT book_id, rank FROM ('
+            f'SELECT rowid AS book_id, -bm25({SEARCH_TABLE}, {weights}) AS rank '
+            f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s)'
+        )
+        params = [match]
+        if after is not None:
+            sql += ' WHERE rank < %s OR (rank = %s AND book_id > %s)'
+            book_id, rank = after
+            params += [rank, rank, book_id]
+        sql += ' ORDER BY rank DESC, book_id LIMIT %s'
+        cursor.execute(sql, params + [limit])
+        return cursor.fetchall()
+
+
+class PostgresSearchBackend:
+    """Weighted ``tsvector`` per book, behind a GIN index."""
+
+    def create(self, cursor):
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} '
+                       f'(book_id bigint PRIMARY KEY, document tsvector NOT NULL)')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_gin '
+                       f'ON {SEARCH_TABLE} USING gin (document)')
+
+    def drop(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+    def index(self, cursor, where, params):
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (book_id, document) '
+            f'SELECT d.id, '
+            f"setweight(to_tsvector('simple', COALESCE(d.title, '')), 'A') || "
+            f"setweight(to_tsvector('simple', COALESCE(d.isbn, '')), 'A') || "
+            f"setweight(to_tsvector('simple', d.author), 'B') || "
+            f"setweight(to_tsvector('simple', COALESCE(d.summary, '')), 'C') "
+            f'FROM ({_book_document_sql(where)}) AS d (id, title, author, summary, isbn) '
+            f'ON CONFLICT (book_id) DO UPDATE SET document = EXCLUDED.document',
+            params,
+        )
+
+    def remove(self, cursor, ids):
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE book_id IN ({_id_list(ids)})', ids)
+
+    def clear(self, cursor):
+        cursor.execute(f'TRUNCATE {SEARCH_TABLE}')
+
+    def search(self, cursor, tokens, limit, after=None):
+        tsquery = ' & '.join(f"'{token}':*" for token in tokens)
+        sql = (
+            f'SELECT book_id, rank FROM ('
+            f'SELECT book_id, ts_rank(document, query)::float8 AS rank '
+            f"FROM {SEARCH_TABLE}, to_tsquery('simple', %s) query WHERE document @@ query) AS matches"
+        )
+        params = [tsquery]
+        if after is not None:
+            sql += ' WHERE rank < %s OR (rank = %s AND book_id > %s)'
+            book_id, rank = after
+            params += [rank, rank, book_id]
+        sql += ' ORDER BY rank DESC, book_id LIMIT %s'
+        cursor.execute(sql, params + [limit])
+        return cursor.fetchall()
+
+
+class LikeSearchBackend:
+    """Unindexed fallback for other databases: every match ranks equally and pages in id order."""
+
+    def create(self, cursor):
+        pass
+
+    drop = clear = create
+
+    def index(self, cursor, where, params):
+        pass
+
+    def remove(self, cursor, ids):
+        pass
+
+    def search(self, cursor, tokens, limit, after=None):
+        books = Book.objects.all()
+        for token in tokens:
+            books = books.filter(Q(title__icontains=token) | Q(summary__icontains=token) | Q(isbn__icontains=token)
+                                 | Q(author__first_name__icontains=token) | Q(author__last_name__icontains=token))
+        if after is not None:
+            books = books.filter(id__gt=after[0])
+        return [(book_id, 0.0) for book_id in books.order_by('id').values_list('id', flat=True)[:limit]]
+
+
+def get_search_backend(vendor=None):
+    vendor = vendor or connection.vendor
+    if vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if vendor == 'sqlite':
+        return SQLiteSearchBackend()
+    return LikeSearchBackend()
+
+
+def index_books(book_ids):
+    """(Re)index the given books, dropping rows for books that no longer exist."""
+    book_ids = list(book_ids)
+    if not book_ids:
+        return
+    backend = get_search_backend()
+    with connection.cursor() as cursor:
+        backend.remove(cursor, book_ids)
+        backend.index(cursor, f'b.id IN ({_id_list(book_ids)})', book_ids)
+
+
+def remove_books(book_ids):
+    book_ids = list(book_ids)
+    if book_ids:
+        with connection.cursor() as cursor:
+            get_search_backend().remove(cursor, book_ids)
+
+
+def rebuild_index(batch_size=10000):
+    """Repopulate the whole index in id-range batches. Yields the number of books indexed per batch."""
+    backend = get_search_backend()
+    with connection.cursor() as cursor:
+        backend.clear(cursor)
+        last_id = 0
+        while True:
+            ids = list(Book.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return
+            backend.index(cursor, 'b.id >= %s AND b.id <= %s', [ids[0], ids[-1]])
+            last_id = ids[-1]
+            yield len(ids)
+
+
+def search_books(query, limit=10, after=None):
+    """
+    Return ``[(book_id, rank), ...]`` for books matching every word of ``query`` as a prefix, best match first.
+
+    ``after`` is the last ``(book_id, rank)`` of the previous page.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    with connection.cursor() as cursor:
+        return [tuple(row) for row in get_search_backend().search(cursor, tokens, limit, after)]
@@ -0,0 +1,22 @@
+"""Database-backed sessions that count store operations for ``catalog.metrics``."""
+from django.contrib.sessions.backends import db
+
+from .metrics import SESSION_OPERATIONS
+
+
+class SessionStore(db.SessionStore):
+    def load(self):
+        SESSION_OPERATIONS.labels('load').inc()
+        return super().load()
+
+    def exists(self, session_key):
+        SESSION_OPERATIONS.labels('exists').inc()
+        return super().exists(session_key)
+
+    def save(self, must_create=False):
+        SESSION_OPERATIONS.labels('create' if must_create else 'save').inc()
+        return super().save(must_create)
+
+    def delete(self, session_key=None):
+        SESSION_OPERATIONS.labels('delete').inc()
+        return super().delete(session_key)
@@ -0,0 +1,144 @@
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import pagecache
+from .availability import refresh_availability
+from .models import Author, Book, BookInstance, Genre, Language
+from .search import index_books, remove_books
+from .stats import invalidate_catalog_stats
+from .versions import bump
+
+
+@receiver([post_save, post_delete], sender=Book)
+@receiver([post_save, post_delete], sender=BookInstance)
+@receiver([post_save, post_delete], sender=Author)
+@receiver([post_save, post_delete], sender=Genre)
+def catalog_stats_changed(sender, **kwargs):
+    invalidate_catalog_stats()
+
+
+@receiver([post_save, post_delete], sender=Book)
+@receiver([post_save, post_delete], sender=BookInstance)
+@receiver([post_save, post_delete], sender=Author)
+@receiver([post_save, post_delete], sender=Genre)
+@receiver([post_save, post_delete], sender=Language)
+def table_changed(sender, **kwargs):
+    bump(sender)
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def book_genres_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        bump(Book)
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_books([instance.pk])
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted(sender, instance, **kwargs):
+    remove_books([instance.pk])
+
+
+@receiver(post_save, sender=Author)
+def author_saved(sender, instance, created=False, raw=False, **kwargs):
+    if not created and not raw:
+        index_books(instance.book_set.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Author)
+def author_deleting(sender, instance, **kwargs):
+    # Books keep their rows (author is SET_NULL) but lose the author name once the delete goes through.
+    instance._search_book_ids = list(instance.book_set.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Author)
+def author_deleted(sender, instance, **kwargs):
+    index_books(getattr(instance, '_search_book_ids', []))
+
+
+@receiver(post_init, sender=BookInstance)
+def copy_loaded(sender, instance, **kwargs):
+    # Remember which book the copy belonged to, so moving it refreshes both books. Read it from __dict__: a deferred
+    # book_id would otherwise cost a query per row of every only() queryset.
+    instance._loaded_book_id = instance.__dict__.get('book_id')
+
+
+@receiver(post_save, sender=BookInstance)
+def copy_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refresh_availability([instance.book_id, instance._loaded_book_id])
+        instance._loaded_book_id = instance.book_id
+
+
+@receiver(post_delete, sender=BookInstance)
+def copy_deleted(sender, instance, **kwargs):
+    refresh_availability([instance.book_id])
+
+
+@receiver(post_init, sender=Book)
+def book_loaded(sender, instance, **kwargs):
+    # Remember the author, so moving a book refreshes both authors' pages. Read it from __dict__: a deferred
+    # author_id would otherwise cost a query per row of every only() queryset.
+    instance._loaded_author_id = instance.__dict__.get('author_id')
+
+
+@receiver(pre_delete, sender=Book)
+@receiver(pre_delete, sender=Genre)
+@receiver(pre_delete, sender=Language)
+def page_source_deleting(sender, instance, **kwargs):
+    # Genre links and language references vanish with the row, without signals of their own.
+    if sender is Book:
+        instance._page_genre_ids = list(instance.genre.values_list('id', flat=True))
+    else:
+        instance._page_book_ids = list(_book_ids(instance))
+
+
+def _book_ids(instance):
+    if isinstance(instance, Language):
+        return Book.objects.filter(language_of_origin=instance).values_list('id', flat=True)
+    return instance.book_set.values_list('id', flat=True)
+
+
+@receiver([post_save, post_delete], sender=Book)
+def book_pages_changed(sender, instance, **kwargs):
+    genre_ids = getattr(instance, '_page_genre_ids', None)
+    if genre_ids is None:
+        genre_ids = instance.genre.values_list('id', flat=True)
+    pagecache.bump([('book', instance.pk), ('book', None),
+                    ('author', instance.author_id), ('author', instance._loaded_author_id),
+                    *(('genre', genre_id) for genre_id in genre_ids)])
+    instance._loaded_author_id = instance.author_id
+
+
+@receiver([post_save, post_delete], sender=Author)
+@receiver([post_save, post_delete], sender=Genre)
+@receiver([post_save, post_delete], sender=Language)
+def book_source_pages_changed(sender, instance, created=False, **kwargs):
+    if created:
+        book_ids = []
+    elif hasattr(instance, '_page_book_ids'):
+        book_ids = instance._page_book_ids
+    elif sender is Author and hasattr(instance, '_search_book_ids'):
+        book_ids = instance._search_book_ids
+    else:
+        book_ids = _book_ids(instance)
+    book_pages = [('book', book_id) for book_id in book_ids]
+    if book_pages:
+        book_pages.append(('book', None))
+    kind = sender._meta.model_name
+    pagecache.bump([(kind, instance.pk), (kind, None), *book_pages])
+
+
+@receiver(m2m_changed, sender=Book.genre.through)
+def book_genre_pages_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        related = instance.book_set if reverse else instance.genre
+        instance._page_cleared_ids = set(related.values_list('id', flat=True))
+    elif action.startswith('post_'):
+        related_ids = instance.__dict__.pop('_page_cleared_ids', set()) if action == 'post_clear' else pk_set
+        book_ids, genre_ids = (related_ids, [instance.pk]) if reverse else ([instance.pk], related_ids)
+        pagecache.bump([*(('book', book_id) for book_id in book_ids), *(('genre', genre_id) for genre_id in genre_ids)])
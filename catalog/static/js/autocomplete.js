@@ -0,0 +1,53 @@
+// Search boxes for <select class="autocomplete" data-lookup="..."> (catalog.widgets): typing fetches the matching
+// options from the lookup endpoint. Selected options are kept; the other matches are replaced on every search.
+(function () {
+    'use strict';
+
+    function attach(select) {
+        var input = document.createElement('input');
+        input.type = 'search';
+        input.placeholder = 'Type to search';
+        input.setAttribute('aria-label', 'Search ' + select.name);
+        select.parentNode.insertBefore(input, select);
+
+        var timer = null;
+        var latest = 0;
+
+        function search(query) {
+            var request = ++latest;
+            if (!query) {
+                return;
+            }
+            fetch(select.dataset.lookup + '?q=' + encodeURIComponent(query), {credentials: 'same-origin'})
+                .then(function (response) { return response.json(); })
+                .then(function (data) {
+                    if (request !== latest) {
+                        return;
+                    }
+                    var present = {};
+                    Array.prototype.slice.call(select.options).forEach(function (option) {
+                        if (option.selected || !option.value) {
+                            present[option.value] = true;
+                        } else {
+                            select.removeChild(option);
+                        }
+                    });
+                    data.results.forEach(function (result) {
+                        var value = String(result.id);
+                        if (!present[value]) {
+                            select.appendChild(new Option(result.text, value));
+                        }
+                    });
+                });
+        }
+
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(function () { search(input.value.trim()); }, 200);
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        Array.prototype.slice.call(document.querySelectorAll('select.autocomplete')).forEach(attach);
+    });
+})();
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .metrics import record_cache_lookup
+from .models import Author, Book, BookInstance, Genre
+
+CATALOG_STATS_CACHE_KEY = 'catalog:stats'
+
+
+def compute_catalog_stats():
+    """Compute all home page counters with a single aggregate query."""
+    qn = connection.ops.quote_name
+    book = qn(Book._meta.db_table)
+    instance = qn(BookInstance._meta.db_table)
+    sql = (
+        f'SELECT '
+        f'(SELECT COUNT(*) FROM {book}), '
+        f'(SELECT COUNT(*) FROM {instance}), '
+        f'(SELECT COUNT(*) FROM {instance} WHERE {qn("status")} = %s), '
+        f'(SELECT COUNT(*) FROM {qn(Author._meta.db_table)}), '
+        f'(SELECT COUNT(*) FROM {qn(Genre._meta.db_table)}), '
+        f'(SELECT COUNT(*) FROM {book} WHERE {qn("title")} LIKE %s)'
+    )
+    # Plain LIKE matches what title__contains generates on both SQLite and Postgres.
+    with connection.cursor() as cursor:
+        cursor.execute(sql, ['a', '%Crime%'])
+        row = cursor.fetchone()
+
+    keys = ('num_books', 'num_instances', 'num_instances_available',
+            'num_authors', 'num_genres', 'num_books_with_crime_word')
+    return dict(zip(keys, row))
+
+
+def get_catalog_stats():
+    """Return the home page counters, computing them only on a cache miss."""
+    stats = cache.get(CATALOG_STATS_CACHE_KEY)
+    record_cache_lookup('stats', hit=stats is not None)
+    if stats is None:
+        stats = compute_catalog_stats()
+        cache.set(CATALOG_STATS_CACHE_KEY, stats, getattr(settings, 'CATALOG_STATS_TIMEOUT', 60))
+    return stats
+
+
+def invalidate_catalog_stats():
+    cache.delete(CATALOG_STATS_CACHE_KEY)
+    # A concurrent request may repopulate the cache from pre-commit data, so drop it again after commit.
+    transaction.on_commit(lambda: cache.delete(CATALOG_STATS_CACHE_KEY))
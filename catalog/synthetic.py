@@ -0,0 +1,270 @@
+"""
+Seeded synthetic catalogs for tests and benchmarks.
+
+``CatalogGenerator(copies, seed)`` builds a catalog around a target number of copies with roughly the shape of a real
+library: a few authors write most of the books, a few books own most of the copies, most books are in English, and
+genre popularity falls off steeply (all Zipf-like). Copies are spread over every loan status, with loans and
+reservations held mostly by a minority of heavy readers and some loans overdue. The same seed always gives the same
+catalog, down to the copies' UUIDs. Tests call ``generate_catalog()``; ``manage.py generate_catalog`` wraps it.
+
+Authors and users go through ``bulk_create``. Books, genre links and copies, the bulk of the rows, are written with
+plain ``executemany`` INSERTs of tuples, skipping model instances and signals. Which book each copy belongs to and in
+which status is decided before any book is written, so books are inserted with their availability counters already
+filled in and only the search index and caches need refreshing at the end. A million copies take well under a minute
+on SQLite.
+"""
+import datetime
+import random
+from array import array
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Permission, User
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import pagecache
+from .availability import COUNTERS
+from .models import Author, Book, BookInstance, Genre, Language
+from .search import rebuild_index
+from .stats import invalidate_catalog_stats
+from .versions import bump
+
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+# Every generated reader and librarian can log in with this password.
+SYNTHETIC_PASSWORD = 'synthetic-library'
+# Book ISBNs are 'S', the seed in three digits and the book number in nine: 13 characters, with no seed's prefix
+# the start of another's.
+SEEDS = range(1000)
+
+GENRES = ['Fiction', 'Fantasy', 'Science fiction', 'Mystery', 'Romance', 'Thriller', 'Historical fiction', 'Horror',
+          'Biography', 'History', 'Poetry', 'Children', 'Young adult', 'Philosophy', 'Travel', 'Science', 'Cookery',
+          'Art', 'Religion', 'Drama', 'Humour', 'Crime', 'Western', 'Classics', 'Essays', 'Politics', 'Economics',
+          'Psychology', 'Sport', 'Music']
+LANGUAGES = ['English', 'Spanish', 'French', 'German', 'Ukrainian', 'Italian', 'Portuguese', 'Russian', 'Japanese',
+             'Chinese', 'Polish', 'Dutch']
+FIRST_NAMES = ['Anna', 'Ivan', 'Maria', 'John', 'Olena', 'Pierre', 'Hanna', 'Carlos', 'Yuki', 'Li', 'Sofia', 'Omar',
+               'Emma', 'Taras', 'Lucia', 'Jan', 'Grace', 'Mateo', 'Ingrid', 'Ahmed']
+LAST_NAMES = ['Smith', 'Shevchenko', 'Garcia', 'Dubois', 'Muller', 'Rossi', 'Tanaka', 'Wang', 'Kowalski', 'Silva',
+              'Ivanova', 'Jansen', 'Brown', 'Kovalenko', 'Lopez', 'Martin', 'Novak', 'Berg', 'Hassan', 'Moreau']
+TITLE_WORDS = ['Silent', 'River', 'Garden', 'Night', 'Stone', 'Winter', 'Glass', 'Empire', 'Letters', 'Shadow',
+               'Island', 'Memory', 'Fire', 'Orchard', 'Harbour', 'Mountain', 'Secret', 'Clock', 'Salt', 'Crime']
+IMPRINTS = ['Penguin', 'Vintage', 'Ace', 'Folio', 'Harper', 'Faber', 'Knopf', 'Tor', 'Macmillan', 'Bloomsbury']
+
+STATUS_WEIGHTS = {'a': 55, 'o': 25, 'r': 5, 'm': 15}
+
+
+def zipf_cum_weights(n, exponent=1.1):
+    """Cumulative weights favouring low ranks, for ``random.choices(..., cum_weights=...)``."""
+    return list(accumulate(1 / rank ** exponent for rank in range(1, n + 1)))
+
+
+def insert_rows(model, fields, rows):
+    """``INSERT`` tuples of raw column values for ``fields`` of ``model`` in one ``executemany``."""
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(name).column) for name in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    with connection.cursor() as cursor:
+        cursor.executemany(f'INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES ({placeholders})', rows)
+
+
+def generate_catalog(copies, seed=0, **kwargs):
+    """Generate a whole catalog and return its generator, whose ``sizes()`` tell what was made."""
+    generator = CatalogGenerator(copies, seed=seed, **kwargs)
+    for _stage, _rows in generator.run():
+        pass
+    return generator
+
+
+class CatalogGenerator:
+    def __init__(self, copies, seed=0, batch_size=20000, today=None):
+        if seed not in SEEDS:
+            raise ValueError(f'The seed must be between {SEEDS[0]} and {SEEDS[-1]}.')
+        self.copies = copies
+        self.seed = seed
+        self.batch_size = batch_size
+        self.today = today or datetime.date.today()
+        self.rng = random.Random(seed)
+
+        self.books = max(1, copies // 4)
+        self.authors = max(1, self.books // 8)
+        self.readers = max(1, copies // 100)
+        self.librarians = max(1, self.readers // 50)
+        self.isbn_prefix = f'S{seed:03d}'
+
+    def sizes(self):
+        return {'authors': self.authors, 'books': self.books, 'copies': self.copies, 'readers': self.readers,
+                'librarians': self.librarians}
+
+    def isbn(self, number):
+        return f'{self.isbn_prefix}{number:09d}'
+
+    def run(self):
+        """Generate the whole catalog, yielding ``(stage, rows written so far)`` after every batch."""
+        if Book.objects.filter(isbn__startswith=self.isbn_prefix).exists():
+            raise ValueError(f'A catalog with seed {self.seed} was already generated; pick another seed.')
+
+        self.now = connection.ops.adapt_datetimefield_value(timezone.now())
+        language_ids = self.names(Language, LANGUAGES)
+        genre_ids = self.names(Genre, GENRES)
+        author_ids = yield from self.generate_authors()
+        reader_ids = yield from self.generate_users()
+        yield from self.plan_copies()
+        book_ids = yield from self.generate_books(author_ids, genre_ids, language_ids)
+        yield from self.generate_copies(book_ids, reader_ids, language_ids)
+        yield from self.finish()
+
+    def names(self, model, names):
+        """Ids of ``names`` in ``model``, creating the missing ones, most popular first."""
+        existing = dict(model.objects.filter(name__in=names).values_list('name', 'id'))
+        model.objects.bulk_create([model(name=name) for name in names if name not in existing])
+        existing.update(model.objects.filter(name__in=names).values_list('name', 'id'))
+        return [existing[name] for name in names]
+
+    def batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield range(start, min(start + self.batch_size, total))
+
+    def new_ids(self, model, after):
+        return list(model.objects.filter(pk__gt=after).order_by('pk').values_list('pk', flat=True))
+
+    def max_id(self, model):
+        return model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+    def generate_authors(self):
+        rng = self.rng
+        before = self.max_id(Author)
+        for batch in self.batches(self.authors):
+            with transaction.atomic():
+                Author.objects.bulk_create([
+                    Author(first_name=rng.choice(FIRST_NAMES), last_name=f'{rng.choice(LAST_NAMES)} {number}',
+                           date_of_birth=datetime.date(rng.randint(1800, 2000), rng.randint(1, 12), rng.randint(1, 28)))
+                    for number in batch
+                ])
+            yield 'authors', batch.stop
+        # Autoincrement ids of one bulk insert are consecutive, so the new rows are those after the old maximum.
+        return self.new_ids(Author, before)
+
+    def generate_users(self):
+        password = make_password(SYNTHETIC_PASSWORD)  # hashing is slow, so every user shares one hash
+        before = self.max_id(User)
+        User.objects.bulk_create(
+            [User(username=f'reader-{self.seed}-{number}', password=password) for number in range(self.readers)] +
+            [User(username=f'librarian-{self.seed}-{number}', password=password, is_staff=True)
+             for number in range(self.librarians)]
+        )
+        user_ids = self.new_ids(User, before)
+        permission = Permission.objects.get(codename='can_mark_returned')
+        User.user_permissions.through.objects.bulk_create([
+            User.user_permissions.through(user_id=user_id, permission_id=permission.pk)
+            for user_id in user_ids[self.readers:]
+        ])
+        yield 'users', len(user_ids)
+        return user_ids[:self.readers]
+
+    def plan_copies(self):
+        """Pick the book, status and due date of every copy, and count what each book will hold."""
+        rng = self.rng
+        statuses, status_weights = zip(*STATUS_WEIGHTS.items())
+        self.statuses = statuses
+        book_weights = zipf_cum_weights(self.books, exponent=0.8)
+        self.copy_books = array('l')
+        self.copy_statuses = array('B')
+        self.copy_due = array('b')
+        self.counts = {status: [0] * self.books for status in statuses}
+        self.earliest_due = [None] * self.books
+        for batch in self.batches(self.copies):
+            books = rng.choices(range(self.books), cum_weights=book_weights, k=len(batch))
+            picked = rng.choices(range(len(statuses)), status_weights, k=len(batch))
+            for book, status in zip(books, picked):
+                self.counts[statuses[status]][book] += 1
+                due = 0
+                if statuses[status] == 'o':
+                    # About one loan in five is overdue.
+                    due = rng.randint(-6, 21)
+                    if self.earliest_due[book] is None or due < self.earliest_due[book]:
+                        self.earliest_due[book] = due
+                self.copy_due.append(due)
+            self.copy_books.extend(books)
+            self.copy_statuses.extend(picked)
+            yield 'planned copies', batch.stop
+
+    def date(self, offset):
+        return connection.ops.adapt_datefield_value(self.today + datetime.timedelta(days=offset))
+
+    def generate_books(self, author_ids, genre_ids, language_ids):
+        rng = self.rng
+        author_weights = zipf_cum_weights(len(author_ids))
+        language_weights = zipf_cum_weights(len(language_ids), exponent=2)
+        genre_weights = zipf_cum_weights(len(genre_ids))
+        counters = [field for status in self.statuses for field, counted in COUNTERS.items() if counted == status]
+        fields = ('title', 'summary', 'isbn', 'author', 'language_of_origin', 'updated_at', 'copies_total',
+                  *counters, 'earliest_due_back')
+        book_ids = []
+        for batch in self.batches(self.books):
+            with transaction.atomic():
+                authors = rng.choices(author_ids, cum_weights=author_weights, k=len(batch))
+                languages = rng.choices(language_ids, cum_weights=language_weights, k=len(batch))
+                rows = []
+                for number, author_id, language_id in zip(batch, authors, languages):
+                    counts = [self.counts[status][number] for status in self.statuses]
+                    due = self.earliest_due[number]
+                    rows.append((f'The {rng.choice(TITLE_WORDS)} {rng.choice(TITLE_WORDS)} {number}',
+                                 f'A synthetic book about {rng.choice(TITLE_WORDS).lower()}.',
+                                 self.isbn(number), author_id, language_id, self.now, sum(counts), *counts,
+                                 None if due is None else self.date(due)))
+                insert_rows(Book, fields, rows)
+                ids = list(Book.objects.filter(isbn__gte=self.isbn(batch.start), isbn__lte=self.isbn(batch.stop - 1))
+                           .order_by('isbn').values_list('id', flat=True))
+                insert_rows(Book.genre.through, ('book', 'genre'), [
+                    (book_id, genre_id)
+                    for book_id in ids
+                    for genre_id in sorted(set(rng.choices(genre_ids, cum_weights=genre_weights,
+                                                           k=rng.choices((1, 2, 3), (50, 35, 15))[0])))
+                ])
+                book_ids.extend(ids)
+            yield 'books', batch.stop
+        return book_ids
+
+    def generate_copies(self, book_ids, reader_ids, language_ids):
+        rng = self.rng
+        reader_weights = zipf_cum_weights(len(reader_ids), exponent=0.7)
+        language_weights = zipf_cum_weights(len(language_ids), exponent=2)
+        dates = {offset: self.date(offset) for offset in range(-6, 22)}
+        # Copies go in book by book under ids that grow with every row, so the primary key and book indexes are
+        # appended to rather than written all over; that halves the time of the largest insert. The seeded prefix
+        # keeps catalogs of different seeds apart. Stored as UUIDField stores them on SQLite, and valid uuid input.
+        id_prefix = f'{rng.getrandbits(64):016x}'
+        order = sorted(range(self.copies), key=self.copy_books.__getitem__)
+        fields = ('id', 'book', 'imprint', 'due_back', 'status', 'language', 'borrower', 'updated_at')
+        for batch in self.batches(self.copies):
+            with transaction.atomic():
+                rows = []
+                for number, language_id, imprint in zip(
+                        batch,
+                        rng.choices(language_ids, cum_weights=language_weights, k=len(batch)),
+                        rng.choices(IMPRINTS, k=len(batch))):
+                    copy = order[number]
+                    status = self.statuses[self.copy_statuses[copy]]
+                    borrower_id = None
+                    if status in ('o', 'r'):
+                        borrower_id = rng.choices(reader_ids, cum_weights=reader_weights)[0]
+                    rows.append((
+                        f'{id_prefix}{number:016x}',
+                        book_ids[self.copy_books[copy]],
+                        f'{imprint}, {rng.randrange(1950, 2022)}',
+                        dates[self.copy_due[copy]] if status == 'o' else None,
+                        status, language_id, borrower_id, self.now,
+                    ))
+                insert_rows(BookInstance, fields, rows)
+            yield 'copies', batch.stop
+
+    def finish(self):
+        books = 0
+        for count in rebuild_index(self.batch_size):
+            books += count
+            yield 'search index', books
+        invalidate_catalog_stats()
+        bump(Language, Genre, Author, Book, BookInstance)
+        pagecache.bump_all()
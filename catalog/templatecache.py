@@ -0,0 +1,51 @@
+"""
+Template preloading for production workers.
+
+With ``PRELOAD_TEMPLATES`` on, settings wrap the template loaders in Django's cached loader and ``LocalLibrary.wsgi``
+(or ``asgi``) compiles every project template when a worker imports the application, before it accepts requests.
+A template that fails to compile raises there, so gunicorn refuses to boot the worker instead of serving 500s.
+"""
+import os
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+
+
+def cached_loaders():
+    """The ``loaders`` option equivalent to ``APP_DIRS: True``, wrapped in the cached loader."""
+    return [('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ])]
+
+
+def project_template_dirs(engine):
+    """Template directories inside the project, leaving out those of installed third-party apps."""
+    base_dir = os.path.realpath(settings.BASE_DIR)
+    return [str(path) for path in [*engine.dirs, *get_app_template_dirs('templates')]
+            if os.path.realpath(path).startswith(base_dir + os.sep)]
+
+
+def template_names(engine):
+    """Names of every ``.html`` template under the project's template directories."""
+    names = []
+    for directory in project_template_dirs(engine):
+        for root, _dirs, files in os.walk(directory):
+            for filename in sorted(files):
+                if filename.endswith('.html'):
+                    names.append(os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/'))
+    return sorted(set(names))
+
+
+def preload_templates(using='django'):
+    """Compile every project template into the loader cache and return their names."""
+    engine = engines[using].engine
+    names = template_names(engine)
+    for name in names:
+        try:
+            engine.get_template(name)
+        except TemplateSyntaxError as e:
+            raise TemplateSyntaxError(f'Template {name!r} does not compile: {e}') from e
+    return names
+
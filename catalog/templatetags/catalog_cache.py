@@ -0,0 +1,47 @@
+from django import template
+
+from catalog import pagecache
+
+register = template.Library()
+
+
+class VersionedCacheNode(template.Node):
+    def __init__(self, nodelist, name, kind, pk, vary):
+        self.nodelist = nodelist
+        self.name = name
+        self.kind = kind
+        self.pk = pk
+        self.vary = vary
+
+    def render(self, context):
+        dependency = (self.kind.resolve(context), self.pk.resolve(context))
+        key = pagecache.make_key('fragment', self.name.resolve(context), [dependency],
+                                 [value.resolve(context) for value in self.vary])
+        cache = pagecache.get_cache()
+        content = cache.get(key)
+        pagecache.record(hit=content is not None, cache='fragment')
+        if content is None:
+            content = self.nodelist.render(context)
+            cache.set(key, content, pagecache.get_timeout())
+        return content
+
+
+@register.tag('versioned_cache')
+def do_versioned_cache(parser, token):
+    """
+    Cache the enclosed fragment until the object it shows changes::
+
+        {% versioned_cache "book-copies" "book" book.pk perms.catalog.can_mark_returned %}
+            ...
+        {% endversioned_cache %}
+
+    The arguments are a fragment name, the object kind and primary key whose version token keys the fragment
+    (see ``catalog.pagecache``), then any values the output varies on.
+    """
+    nodelist = parser.parse(('endversioned_cache',))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 4:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes at least three arguments: name, kind and pk.")
+    name, kind, pk, *vary = (parser.compile_filter(bit) for bit in bits[1:])
+    return VersionedCacheNode(nodelist, name, kind, pk, vary)
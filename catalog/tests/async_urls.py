@@ -0,0 +1,10 @@
+"""The project's URLs with the async catalog views, as when ``ASYNC_VIEWS`` is on."""
+from django.urls import include, path
+
+from catalog import urls as catalog_urls
+from catalog.async_views import use_async_views
+from LocalLibrary.urls import urlpatterns as project_urlpatterns
+
+urlpatterns = [path('catalog/', include(use_async_views(catalog_urls.urlpatterns)))] + [
+    pattern for pattern in project_urlpatterns if getattr(pattern, 'urlconf_name', None) != 'catalog.urls'
+]
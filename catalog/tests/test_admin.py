@@ -0,0 +1,103 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog.admin import EstimatedCountPaginator, estimated_count
+from catalog.models import Author, Book, BookInstance, Genre, Language
+
+
+class AdminQueriesTest(TestCase):
+    """Admin pages run the same number of queries however many rows they show."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', '1X<ISRUkw+tuK')
+        cls.author = Author.objects.create(first_name='Terry', last_name='Pratchett')
+        cls.language = Language.objects.create(name='English')
+        cls.genres = [Genre.objects.create(name=name) for name in ('Fantasy', 'Humour', 'Satire', 'Comedy')]
+        cls.book = cls.add_books(1)[0]
+
+    @classmethod
+    def add_books(cls, count):
+        books = []
+        for _ in range(count):
+            number = Book.objects.count()
+            book = Book.objects.create(title=f'Discworld {number}', summary='Turtles', isbn=f'{number:013d}',
+                                       author=cls.author, language_of_origin=cls.language)
+            book.genre.set(cls.genres)
+            BookInstance.objects.create(book=book, imprint='Corgi', status='o', borrower=cls.admin,
+                                        due_back='2030-01-01', language=cls.language)
+            books.append(book)
+        return books
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assertQueriesIndependentOfRows(self, url, add_rows):
+        self.queries(url)  # fills the content type cache
+        before = self.queries(url)
+        add_rows()
+        self.assertEqual(self.queries(url), before)
+
+    def test_changelists(self):
+        for name in ('catalog_book_changelist', 'catalog_bookinstance_changelist', 'catalog_author_changelist'):
+            with self.subTest(name):
+                self.assertQueriesIndependentOfRows(reverse(f'admin:{name}'), lambda: self.add_books(5))
+
+    def add_copies(self, count):
+        for _ in range(count):
+            BookInstance.objects.create(book=self.book, imprint='Gollancz', status='o', borrower=self.admin,
+                                        due_back='2030-01-01', language=self.language)
+
+    def test_change_pages_with_inlines(self):
+        # Rows cost queries for their autocomplete widgets' selected values, but only the rows of one page.
+        self.add_copies(19)
+        self.add_books(19)
+        self.assertQueriesIndependentOfRows(reverse('admin:catalog_book_change', args=[self.book.pk]),
+                                            lambda: self.add_copies(25))
+        self.assertQueriesIndependentOfRows(reverse('admin:catalog_author_change', args=[self.author.pk]),
+                                            lambda: self.add_books(25))
+
+    def test_inlines_are_paginated(self):
+        self.add_copies(24)
+        url = reverse('admin:catalog_book_change', args=[self.book.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.context['inline_admin_formsets'][0].formset.initial_form_count(), 20)
+        self.assertContains(response, 'Book instances 1&ndash;20 of 25')
+
+        response = self.client.get(url + '?bookinstance_set-page=2')
+        self.assertEqual(response.context['inline_admin_formsets'][0].formset.initial_form_count(), 5)
+
+    def test_foreign_keys_use_autocomplete(self):
+        response = self.client.get(reverse('admin:catalog_bookinstance_add'))
+        self.assertNotContains(response, f'<option value="{self.admin.pk}"')
+        response = self.client.get(reverse('admin:autocomplete'), {'term': 'disc', 'app_label': 'catalog',
+                                                                   'model_name': 'bookinstance', 'field_name': 'book'})
+        self.assertEqual(response.json()['results'][0]['text'], 'Discworld 0')
+
+
+class EstimatedCountTest(TestCase):
+    def test_large_unfiltered_tables_are_estimated(self):
+        Genre.objects.bulk_create(Genre(name=f'Genre {number}') for number in range(5))
+        self.assertEqual(estimated_count(Genre), Genre.objects.order_by('pk').last().pk)
+
+        paginator = EstimatedCountPaginator(Genre.objects.order_by('pk'), 2)
+        paginator.estimate_above = 2
+        estimate = estimated_count(Genre)
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, estimate)
+
+    def test_small_or_filtered_tables_are_counted(self):
+        Genre.objects.create(name='Fantasy')
+        self.assertEqual(EstimatedCountPaginator(Genre.objects.order_by('pk'), 2).count, 1)
+        paginator = EstimatedCountPaginator(Genre.objects.filter(name='Horror').order_by('pk'), 2)
+        paginator.estimate_above = -1
+        self.assertEqual(paginator.count, 0)
@@ -0,0 +1,87 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog import loans
+from catalog.models import Author, Book, BookInstance, Genre, Language
+
+
+class CatalogApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.author = Author.objects.create(first_name='Frank', last_name='Herbert')
+            cls.language = Language.objects.create(name='English')
+            cls.genre = Genre.objects.create(name='Science Fiction')
+            for book_id in range(25):
+                book = Book.objects.create(title=f'Dune {book_id:02}', summary='Spice', isbn=f'ISBN{book_id}',
+                                           author=cls.author, language_of_origin=cls.language)
+                book.genre.set([cls.genre])
+            cls.book = Book.objects.get(title='Dune 00')
+            cls.copy = BookInstance.objects.create(book=cls.book, imprint='Ace', status='a', language=cls.language)
+
+    def test_book_list_default_projection_and_paging(self):
+        response = self.client.get(reverse('api-books'))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data['results']), 20)
+        self.assertEqual(data['results'][0], {'id': self.book.pk, 'title': 'Dune 00', 'author_name': 'Herbert, Frank',
+                                              'isbn': 'ISBN0', 'copies_available': 1})
+        self.assertIsNone(data['previous'])
+
+        data = self.client.get(data['next']).json()
+        self.assertEqual([book['title'] for book in data['results']], [f'Dune {i}' for i in range(20, 25)])
+        self.assertIsNone(data['next'])
+
+    def test_field_selection(self):
+        with self.assertNumQueries(3):  # versions, books, prefetched genres
+            response = self.client.get(reverse('api-books'), {'fields': 'id,genres,language', 'limit': 5})
+        self.assertEqual(response.json()['results'][0], {'id': self.book.pk, 'genres': ['Science Fiction'],
+                                                         'language': 'English'})
+        response = self.client.get(reverse('api-books'), {'fields': 'author,url', 'limit': 1})
+        self.assertEqual(response.json()['results'], [{'author': self.author.pk, 'url': self.book.get_absolute_url()}])
+        response = self.client.get(reverse('api-books'), {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_detail(self):
+        response = self.client.get(reverse('api-bookinstance-detail', args=[self.copy.pk]),
+                                   {'fields': 'id,title,status,language,url'})
+        self.assertEqual(response.json(), {'id': str(self.copy.pk), 'title': 'Dune 00', 'status': 'a',
+                                           'language': 'English', 'url': self.copy.get_absolute_url()})
+        self.assertEqual(self.client.get(reverse('api-author-detail', args=[0])).status_code, 404)
+
+    def test_conditional_get(self):
+        url = reverse('api-bookinstances')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Loans change copies through UPDATE, which bypasses post_save; the version must still move. It moves after
+        # the loan commits, so loan transactions never wait on each other for the version row.
+        reader = User.objects.create_user(username='reader')
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as context:
+            loans.checkout(self.copy.pk, reader)
+            self.assertFalse([query for query in context.captured_queries if 'catalog_tableversion' in query['sql']])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['results'][0]['status'], 'o')
+
+    def test_etag_follows_dependent_tables(self):
+        url = reverse('api-books')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.author.first_name = 'Brian'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_read_only(self):
+        self.assertEqual(self.client.post(reverse('api-books')).status_code, 405)
@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import AsyncClient, Client, SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import path, reverse
+
+from catalog import pagecache
+from catalog.models import Author, Book, BookInstance, Genre, Language
+from catalog.profiling import request_log
+from catalog.tests.async_urls import urlpatterns as async_urlpatterns
+
+WAIT = 0.3
+
+
+async def waiting_view(request):
+    await asyncio.sleep(WAIT)
+    return HttpResponse('done')
+
+
+urlpatterns = [path('wait/', waiting_view, name='wait')] + async_urlpatterns
+
+
+class AsyncViewsTest(TransactionTestCase):
+    # The async views query on pool threads, which cannot see rows of a test's open transaction.
+
+    def setUp(self):
+        self.author = Author.objects.create(first_name='Frank', last_name='Herbert')
+        self.genre = Genre.objects.create(name='Science fiction')
+        self.language = Language.objects.create(name='English')
+        self.book = Book.objects.create(title='Dune', summary='Spice', isbn='9780441013593', author=self.author,
+                                        language_of_origin=self.language)
+        self.book.genre.add(self.genre)
+        BookInstance.objects.create(book=self.book, imprint='Ace', status='a', language=self.language)
+        BookInstance.objects.create(book=self.book, imprint='Chilton', status='m')
+        User.objects.create_user(username='reader', password='1X<ISRUkw+tuK')
+        pagecache.get_cache().clear()
+
+    def pages(self):
+        return [reverse('index'), reverse('books'), reverse('book-detail', args=[self.book.pk]),
+                reverse('authors'), reverse('author-detail', args=[self.author.pk]),
+                reverse('genres'), reverse('genre-detail', args=[self.genre.pk]),
+                reverse('languages'), reverse('language-detail', args=[self.language.pk])]
+
+    def render_all(self, login):
+        # A fresh session each time, so both home pages count the same number of visits.
+        pagecache.get_cache().clear()
+        client = Client()
+        if login:
+            client.login(username='reader', password='1X<ISRUkw+tuK')
+        return {url: client.get(url) for url in self.pages()}
+
+    def assertSamePages(self, login=False):
+        sync_pages = self.render_all(login)
+        with override_settings(ROOT_URLCONF='catalog.tests.async_urls'):
+            async_pages = self.render_all(login)
+        for url, response in sync_pages.items():
+            self.assertEqual(async_pages[url].status_code, response.status_code, url)
+            self.assertEqual(async_pages[url].content, response.content, url)
+
+    def test_async_pages_match_the_sync_pages(self):
+        self.assertSamePages()
+
+    def test_async_pages_match_the_sync_pages_when_logged_in(self):
+        self.assertSamePages(login=True)
+
+    @override_settings(ROOT_URLCONF='catalog.tests.async_urls')
+    def test_anonymous_pages_are_cached(self):
+        url = reverse('book-detail', args=[self.book.pk])
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+
+    @override_settings(ROOT_URLCONF='catalog.tests.async_urls')
+    def test_missing_objects_are_not_found(self):
+        for name in ('book-detail', 'author-detail', 'genre-detail', 'language-detail'):
+            self.assertEqual(self.client.get(reverse(name, args=[9999])).status_code, 404, name)
+
+    @override_settings(ROOT_URLCONF='catalog.tests.async_urls', REQUEST_PROFILING=True)
+    async def test_profiling_counts_queries_on_pool_threads(self):
+        request_log.clear()
+        response = await AsyncClient().get(reverse('book-detail', args=[self.book.pk]))
+        self.assertEqual(response.status_code, 200)
+        [record] = request_log.snapshot()
+        # The book, its copies and its genres, each fetched on a pool thread
+        self.assertGreaterEqual(record['queries'], 3)
+
+
+@override_settings(ROOT_URLCONF=__name__, REQUEST_PROFILING=True)
+class ConcurrencyTest(SimpleTestCase):
+    async def test_requests_overlap(self):
+        # Any middleware Django has to run on asgiref's shared thread would serve the requests one after the other.
+        client = AsyncClient()
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(client.get('/wait/') for _ in range(4)))
+        self.assertEqual([response.status_code for response in responses], [200] * 4)
+        self.assertLess(time.perf_counter() - started, 2 * WAIT)
@@ -0,0 +1,69 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import loans
+from catalog.models import Book, BookInstance
+
+
+class AvailabilityTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader', password='1X<ISRUkw+tuK')
+        cls.dune = Book.objects.create(title='Dune', summary='Spice', isbn='9780441013593')
+        cls.messiah = Book.objects.create(title='Dune Messiah', summary='More spice', isbn='9780441172696')
+
+    def counters(self, book):
+        book.refresh_from_db()
+        return (book.copies_total, book.copies_available, book.copies_on_loan, book.copies_reserved,
+                book.copies_maintenance, book.earliest_due_back)
+
+    def test_counters_follow_copy_changes(self):
+        due_back = datetime.date.today() + datetime.timedelta(days=3)
+        copy = BookInstance.objects.create(book=self.dune, imprint='Ace', status='a')
+        BookInstance.objects.create(book=self.dune, imprint='Ace', status='o', borrower=self.reader, due_back=due_back)
+        BookInstance.objects.create(book=self.dune, imprint='Ace', status='m')
+        self.assertEqual(self.counters(self.dune), (3, 1, 1, 0, 1, due_back))
+
+        loans.reserve(copy.pk, self.reader)
+        self.assertEqual(self.counters(self.dune), (3, 0, 1, 1, 1, due_back))
+
+        copy = BookInstance.objects.get(pk=copy.pk)
+        copy.book = self.messiah
+        copy.save()
+        self.assertEqual(self.counters(self.dune), (2, 0, 1, 0, 1, due_back))
+        self.assertEqual(self.counters(self.messiah), (1, 0, 0, 1, 0, None))
+
+        copy.delete()
+        self.assertEqual(self.counters(self.messiah), (0, 0, 0, 0, 0, None))
+
+    def test_book_save_keeps_counters(self):
+        stale = Book.objects.get(pk=self.dune.pk)
+        BookInstance.objects.create(book=self.dune, imprint='Ace', status='a')
+        stale.title = 'Dune (1965)'
+        stale.save()
+        self.assertEqual(self.counters(self.dune)[:2], (1, 1))
+
+    def test_loading_copies_without_book_costs_no_queries(self):
+        for _ in range(3):
+            BookInstance.objects.create(book=self.dune, imprint='Ace', status='a')
+        with self.assertNumQueries(1):
+            self.assertEqual(len(BookInstance.objects.only('imprint')), 3)
+
+    def test_repair_command(self):
+        BookInstance.objects.create(book=self.dune, imprint='Ace', status='a')
+        Book.objects.update(copies_total=7, copies_available=0)
+        call_command('repair_availability', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.counters(self.dune)[:2], (1, 1))
+        self.assertEqual(self.counters(self.messiah)[:2], (0, 0))
+
+    def test_available_now_filter(self):
+        BookInstance.objects.create(book=self.messiah, imprint='Ace', status='a')
+        BookInstance.objects.create(book=self.dune, imprint='Ace', status='m')
+        response = self.client.get(reverse('books'), {'available': 1})
+        self.assertEqual(list(response.context['book_list']), [self.messiah])
+        self.assertEqual(len(self.client.get(reverse('books')).context['book_list']), 2)
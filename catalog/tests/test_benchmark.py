@@ -0,0 +1,76 @@
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.test import LiveServerTestCase, TestCase
+
+from catalog import benchmark
+from catalog.availability import COUNTERS, repair_availability
+from catalog.models import Author, Book, BookInstance
+from catalog.synthetic import STATUS_WEIGHTS, generate_catalog
+
+
+def generate(copies, seed=0):
+    generate_catalog(copies, seed=seed, batch_size=100)
+
+
+class CatalogGeneratorTest(TestCase):
+    def test_builds_a_skewed_catalog_in_every_loan_status(self):
+        generate(2000)
+        self.assertEqual(BookInstance.objects.count(), 2000)
+        self.assertEqual(Book.objects.count(), 500)
+        self.assertEqual(Author.objects.count(), 62)
+        self.assertEqual(set(BookInstance.objects.values_list('status', flat=True)), {'a', 'o', 'r', 'm'})
+        self.assertTrue(BookInstance.objects.overdue().exists())
+
+        # The most prolific author writes far more than an average one.
+        counts = sorted((author.book_set.count() for author in Author.objects.all()), reverse=True)
+        self.assertGreater(counts[0], 4 * sum(counts) / len(counts))
+
+        book = Book.objects.order_by('-copies_total').first()
+        self.assertEqual(book.copies_total, book.bookinstance_set.count())
+
+    def test_precomputed_counters_match_the_copies(self):
+        generate(1000)
+        fields = [*COUNTERS, 'earliest_due_back']
+        generated = list(Book.objects.order_by('pk').values_list(*fields))
+        list(repair_availability())
+        self.assertEqual(list(Book.objects.order_by('pk').values_list(*fields)), generated)
+        self.assertEqual(set(STATUS_WEIGHTS), set(COUNTERS.values()) - {None})
+        self.assertFalse(BookInstance.objects.filter(status='a', borrower__isnull=False).exists())
+
+    def test_same_seed_same_catalog(self):
+        catalogs = []
+        for _ in range(2):
+            with transaction.atomic():
+                generate(200, seed=7)
+                catalogs.append((
+                    list(Book.objects.order_by('isbn').values_list('isbn', 'title', 'copies_total')),
+                    list(BookInstance.objects.order_by('id').values_list('id', 'book__isbn', 'status', 'due_back')),
+                ))
+                transaction.set_rollback(True)
+        self.assertEqual(catalogs[0], catalogs[1])
+
+    def test_refuses_to_generate_a_seed_twice(self):
+        generate(40)
+        with self.assertRaises(ValueError):
+            generate(40)
+
+    def test_seeds_fit_the_isbn(self):
+        generate(4, seed=999)
+        self.assertEqual({len(isbn) for isbn in Book.objects.values_list('isbn', flat=True)}, {13})
+        with self.assertRaisesMessage(ValueError, 'The seed must be between 0 and 999.'):
+            generate(4, seed=1000)
+        with self.assertRaisesMessage(CommandError, 'must be between 0 and 999'):
+            call_command('generate_catalog', '--seed', '1000')
+
+
+class BenchmarkTest(LiveServerTestCase):
+    def test_short_run_reports_latency(self):
+        generate(400)
+        report = benchmark.run(self.live_server_url, mix='browse', clients=1, duration=2)
+        self.assertEqual(report['errors'], [])
+        self.assertEqual(report['total']['errors'], 0)
+        self.assertGreater(report['total']['requests'], 0)
+        self.assertIsNotNone(report['total']['p95_ms'])
+
+        changes = benchmark.compare(report, report)
+        self.assertEqual(changes['total']['p95_ms'], 0)
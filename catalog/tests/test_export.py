@@ -0,0 +1,74 @@
+import csv
+import datetime
+import json
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from catalog.models import Author, Book, BookInstance, Genre, Language
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', password='2HJ1vRV0Z&3iD', is_staff=True)
+        User.objects.create_user(username='reader', password='1X<ISRUkw+tuK')
+        author = Author.objects.create(first_name='Frank', last_name='Herbert')
+        language = Language.objects.create(name='English')
+        for book_id in range(5):
+            book = Book.objects.create(title=f'Dune {book_id}', summary='Spice', isbn=f'ISBN{book_id}',
+                                       author=author, language_of_origin=language)
+            book.genre.set([Genre.objects.create(name=f'Genre {book_id}'), Genre.objects.get_or_create(name='SF')[0]])
+            BookInstance.objects.create(book=book, imprint='Ace', status='o', borrower=cls.staff,
+                                        due_back=datetime.date.today())
+
+    def test_books_csv_without_per_row_queries(self):
+        out = StringIO()
+        # Main query plus one genre query per chunk of two books
+        with self.assertNumQueries(4):
+            call_command('export_catalog', 'books', chunk_size=2, stdout=out)
+        rows = list(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]['author_last_name'], 'Herbert')
+        self.assertEqual(rows[0]['language_of_origin'], 'English')
+        self.assertEqual(rows[0]['genres'], 'Genre 0|SF')
+
+    def test_copies_jsonl(self):
+        out = StringIO()
+        call_command('export_catalog', 'copies', format='jsonl', stdout=out)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[0]['borrower'], 'staff')
+        self.assertEqual(records[0]['status'], 'o')
+
+    def test_incremental_export(self):
+        since = timezone.now()
+        copy = BookInstance.objects.first()
+        copy.status = 'a'
+        copy.borrower = copy.due_back = None
+        copy.save()
+
+        out = StringIO()
+        call_command('export_catalog', 'copies', format='jsonl', since=since.isoformat(), stdout=out)
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([record['id'] for record in records], [str(copy.id)])
+
+    def test_http_export_is_staff_only(self):
+        url = reverse('export', args=['authors', 'csv'])
+        self.client.login(username='reader', password='1X<ISRUkw+tuK')
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.login(username='staff', password='2HJ1vRV0Z&3iD')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn('Frank,Herbert', content)
+
+        self.assertEqual(self.client.get(url, {'since': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export', args=['users', 'csv'])).status_code, 404)
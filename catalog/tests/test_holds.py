@@ -0,0 +1,158 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from catalog import holds, loans
+from catalog.forms import BookInstanceForm, UpdateBookInstanceModelForm
+from catalog.models import Book, BookInstance, Hold, Language
+
+
+class HoldTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.first, cls.second, cls.third = [
+            User.objects.create_user(username=name, password='1X<ISRUkw+tuK') for name in ('first', 'second', 'third')]
+        cls.book = Book.objects.create(title='Dune', summary='Spice', isbn='9780441013593')
+
+    def setUp(self):
+        self.copy = BookInstance.objects.create(book=self.book, imprint='Ace', status='o', borrower=self.third,
+                                                due_back=datetime.date.today())
+
+    def copy_state(self):
+        self.copy.refresh_from_db()
+        return self.copy.status, self.copy.borrower
+
+    def test_return_sets_copy_aside_for_first_in_line(self):
+        first = holds.place_hold(self.book.pk, self.first)
+        second = holds.place_hold(self.book.pk, self.second)
+        self.assertEqual((holds.position(first), holds.position(second)), (1, 2))
+
+        loans.return_copy(self.copy.pk)
+        self.assertEqual(self.copy_state(), ('r', self.first))
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.copy_id), ('r', self.copy.pk))
+        second.refresh_from_db()
+        self.assertEqual(holds.position(second), 1)
+        self.assertEqual(Book.objects.get(pk=self.book.pk).copies_reserved, 1)
+
+        loans.checkout(self.copy.pk, self.first)
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'c')
+
+    def test_batch_return_serves_the_queue(self):
+        holds.place_hold(self.book.pk, self.first)
+        loans.apply_batch('return', [self.copy.pk])
+        self.assertEqual(self.copy_state(), ('r', self.first))
+
+    def test_allocation_retries_a_locking_read_that_lost_its_hold(self):
+        holds.place_hold(self.book.pk, self.first)
+        locking_reads = [Hold.objects.none(), Hold.objects.select_for_update()]
+        with mock.patch.object(Hold.objects, 'select_for_update', side_effect=locking_reads):
+            loans.return_copy(self.copy.pk)
+        self.assertEqual(self.copy_state(), ('r', self.first))
+
+    def test_hold_on_available_copy_is_ready_at_once(self):
+        loans.return_copy(self.copy.pk)
+        hold = holds.place_hold(self.book.pk, self.first)
+        self.assertEqual((hold.status, hold.copy_id), ('r', self.copy.pk))
+        with self.assertRaisesMessage(holds.HoldError, 'You already have a hold on this book.'):
+            holds.place_hold(self.book.pk, self.first)
+
+    def test_cancel_passes_copy_on(self):
+        first = holds.place_hold(self.book.pk, self.first)
+        holds.place_hold(self.book.pk, self.second)
+        loans.return_copy(self.copy.pk)
+        holds.cancel(first.pk, self.first)
+        self.assertEqual(self.copy_state(), ('r', self.second))
+        with self.assertRaises(holds.HoldError):
+            holds.cancel(first.pk, self.first)
+        with self.assertRaises(Hold.DoesNotExist):
+            holds.cancel(first.pk, self.second)
+
+    def test_expiry_passes_copy_on(self):
+        first = holds.place_hold(self.book.pk, self.first)
+        holds.place_hold(self.book.pk, self.second)
+        loans.return_copy(self.copy.pk)
+        self.assertEqual(holds.expire_holds(), {'expired': 0, 'passed_on': 0})
+
+        later = timezone.now() + holds.PICKUP_PERIOD + datetime.timedelta(hours=1)
+        self.assertEqual(holds.expire_holds(now=later, batch_size=1), {'expired': 1, 'passed_on': 1})
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'x')
+        self.assertEqual(self.copy_state(), ('r', self.second))
+
+        self.assertEqual(holds.expire_holds(now=later + holds.PICKUP_PERIOD * 2), {'expired': 1, 'passed_on': 0})
+        self.assertEqual(self.copy_state(), ('a', None))
+
+    def test_command_serves_copies_made_available_by_hand(self):
+        holds.place_hold(self.book.pk, self.first)
+        BookInstance.objects.filter(pk=self.copy.pk).update(status='a', borrower=None, due_back=None)
+        out = StringIO()
+        call_command('expire_holds', stdout=out)
+        self.assertIn('Expired 0 holds; set 1 copies aside', out.getvalue())
+        self.assertEqual(self.copy_state(), ('r', self.first))
+
+    def test_copies_added_or_moved_by_hand_serve_the_queue(self):
+        holds.place_hold(self.book.pk, self.first)
+        language = Language.objects.create(name='English')
+        form = BookInstanceForm(data={'book': self.book.pk, 'language': language.pk, 'imprint': 'Ace',
+                                      'status': 'a'})
+        self.assertTrue(form.is_valid())
+        copy = form.save()
+        self.assertEqual((copy.status, copy.borrower), ('r', self.first))
+        self.assertEqual(Book.objects.get(pk=self.book.pk).copies_reserved, 1)
+
+        emma = Book.objects.create(title='Emma', summary='Matchmaking', isbn='9780141439587')
+        holds.place_hold(emma.pk, self.second)
+        spare = BookInstance.objects.create(book=self.book, imprint='Chilton', status='a', language=language)
+        form = UpdateBookInstanceModelForm(data={'book': emma.pk, 'language': language.pk, 'imprint': 'Penguin'},
+                                           instance=spare)
+        self.assertTrue(form.is_valid())
+        spare = form.save()
+        self.assertEqual((spare.status, spare.borrower), ('r', self.second))
+
+    def test_end_of_maintenance_serves_the_queue(self):
+        holds.place_hold(self.book.pk, self.first)
+        BookInstance.objects.filter(pk=self.copy.pk).update(status='m', borrower=None, due_back=None)
+        loans.end_maintenance(self.copy.pk)
+        self.assertEqual(self.copy_state(), ('r', self.first))
+
+    def test_queue_lookups_do_not_grow_with_the_queue(self):
+        holds.place_hold(self.book.pk, self.first)
+        for patron in (self.second, self.third):
+            Hold.objects.create(book=self.book, patron=patron)
+        Hold.objects.bulk_create(Hold(book=self.book, patron=self.first, status='x') for _ in range(50))
+        last = Hold.objects.filter(patron=self.third).get()
+        with self.assertNumQueries(1):
+            self.assertEqual(holds.next_in_line(self.book.pk).patron_id, self.first.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(holds.position(last), 3)
+
+    def test_views(self):
+        self.client.login(username='first', password='1X<ISRUkw+tuK')
+        self.assertContains(self.client.get(reverse('book-detail', args=[self.book.pk])), 'Place hold')
+        url = reverse('place-hold', args=[self.book.pk])
+        self.assertContains(self.client.get(url), 'You will get the next copy')
+        self.assertRedirects(self.client.post(url), reverse('my-holds'))
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(self.client.post(reverse('place-hold', args=[self.book.pk + 1])).status_code, 404)
+
+        Hold.objects.create(book=self.book, patron=self.second)
+        Hold.objects.create(book=Book.objects.create(title='Emma', summary='Matchmaking', isbn='9780141439587'),
+                            patron=self.second)
+        self.client.login(username='second', password='1X<ISRUkw+tuK')
+        # Session, user, the holds with their positions, then permissions for the sidebar
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('my-holds'))
+        self.assertContains(response, 'number 2 in line')
+        self.assertContains(response, 'number 1 in line')
+
+        hold = Hold.objects.get(patron=self.second, book=self.book)
+        self.assertRedirects(self.client.post(reverse('cancel-hold', args=[hold.pk])), reverse('my-holds'))
+        self.assertNotContains(self.client.get(reverse('my-holds')), 'number 2 in line')
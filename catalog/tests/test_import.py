@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from catalog.importer import CatalogImporter
+from catalog.models import Author, Book, BookInstance, Genre, Language
+from catalog.search import search_books
+from catalog.versions import get_versions
+
+
+class ImportCatalogCommandTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        User.objects.create_user(username='reader', password='1X<ISRUkw+tuK')
+        Book.objects.create(title='Existing', summary='Already here', isbn='9780000000000')
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_imports_books_and_copies(self):
+        books = self.write('books.csv', (
+            'title,isbn,summary,author_first_name,author_last_name,language,genres\n'
+            'Dune,9780441013593,Spice,Frank,Herbert,English,Science Fiction|Adventure\n'
+            'Children of Dune,9780441104024,More spice,Frank,Herbert,English,Science Fiction\n'
+            'Duplicate,9780441013593,Same ISBN,Frank,Herbert,English,\n'
+            'Existing,9780000000000,Already here,,,,\n'
+        ))
+        copies = self.write('copies.jsonl', '\n'.join(json.dumps(record) for record in [
+            {'isbn': '9780441013593', 'imprint': 'Ace', 'status': 'a', 'language': 'English'},
+            {'isbn': '9780441013593', 'imprint': 'Ace', 'status': 'o', 'due_back': '2030-01-01',
+             'borrower': 'reader'},
+            {'isbn': '9780441104024', 'imprint': 'Ace', 'status': 'm', 'language': 'French'},
+            {'isbn': '0000000000000', 'imprint': 'Unknown book'},
+            {'isbn': '9780441104024', 'imprint': 'Bad', 'status': 'a', 'borrower': 'reader'},
+        ]))
+
+        out, err = StringIO(), StringIO()
+        call_command('import_catalog', books=books, copies=copies, batch_size=2, stdout=out, stderr=err)
+
+        self.assertEqual(Book.objects.count(), 3)
+        self.assertEqual(Author.objects.count(), 1)
+        self.assertEqual(set(Language.objects.values_list('name', flat=True)), {'English', 'French'})
+        dune = Book.objects.get(isbn='9780441013593')
+        self.assertEqual(dune.author.last_name, 'Herbert')
+        self.assertEqual(sorted(dune.genre.values_list('name', flat=True)), ['Adventure', 'Science Fiction'])
+        self.assertEqual(Genre.objects.count(), 2)
+
+        self.assertEqual(BookInstance.objects.count(), 3)
+        self.assertEqual(BookInstance.objects.get(status='o').borrower.username, 'reader')
+        self.assertIn('copies record 4: unknown ISBN', err.getvalue())
+        self.assertIn('copies record 5: available or maintenance', err.getvalue())
+        self.assertIn('books: read 4 rows, created 2, skipped 2', out.getvalue())
+
+        # Bulk inserts bypass post_save, so the importer indexes books itself.
+        self.assertCountEqual([book_id for book_id, _rank in search_books('herbert')],
+                              [dune.pk, Book.objects.get(isbn='9780441104024').pk])
+
+    def test_reimport_reuses_lookups(self):
+        authors = self.write('authors.jsonl', json.dumps({'first_name': 'Frank', 'last_name': 'Herbert',
+                                                          'date_of_birth': '1920-10-08'}))
+        call_command('import_catalog', authors=authors, stdout=StringIO())
+        call_command('import_catalog', authors=authors, stdout=StringIO())
+        self.assertEqual(Author.objects.get().date_of_birth.year, 1920)
+
+    def test_unsupported_file(self):
+        with self.assertRaises(CommandError):
+            call_command('import_catalog', genres=self.write('genres.xml', '<genres/>'), stdout=StringIO())
+
+    def test_every_batch_moves_the_table_versions(self):
+        importer = CatalogImporter(batch_size=1)
+        records = [{'title': f'Book {n}', 'isbn': f'978000000000{n}'} for n in range(1, 4)]
+        batches = importer.import_books(records)
+        for expected in (1, 2, 3):
+            with self.captureOnCommitCallbacks(execute=True):
+                next(batches)
+            self.assertEqual(get_versions(Book)['catalog.book'][0], expected)
@@ -0,0 +1,173 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth.models import Permission, User
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog import loans
+from catalog.forms import UpdateBookInstanceModelForm
+from catalog.models import Book, BookInstance, Language
+
+
+class LoanServiceTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader', password='1X<ISRUkw+tuK')
+        cls.other = User.objects.create_user(username='other', password='2HJ1vRV0Z&3iD')
+        cls.book = Book.objects.create(title='Dune', summary='Spice', isbn='9780441013593')
+
+    def setUp(self):
+        self.copy = BookInstance.objects.create(book=self.book, imprint='Ace', status='a')
+
+    def test_checkout_and_return(self):
+        due_back = loans.checkout(self.copy.pk, self.reader)
+        self.copy.refresh_from_db()
+        self.assertEqual((self.copy.status, self.copy.borrower, self.copy.due_back), ('o', self.reader, due_back))
+
+        with self.assertRaisesMessage(loans.LoanError, 'Cannot lend a copy that is on loan.'):
+            loans.checkout(self.copy.pk, self.other)
+
+        loans.return_copy(self.copy.pk)
+        self.copy.refresh_from_db()
+        self.assertEqual((self.copy.status, self.copy.borrower, self.copy.due_back), ('a', None, None))
+        self.copy.clean()
+
+    def test_checkout_is_one_conditional_update(self):
+        with CaptureQueriesContext(connection) as context:
+            loans.checkout(self.copy.pk, self.reader)
+        writes = [query['sql'] for query in context.captured_queries
+                  if query['sql'].startswith('UPDATE "catalog_bookinstance"')]
+        self.assertEqual(len(writes), 1)
+        self.assertNotIn('"imprint"', writes[0])
+
+    def test_reserved_copy_only_lent_to_holder(self):
+        loans.reserve(self.copy.pk, self.reader)
+        with self.assertRaises(loans.LoanError):
+            loans.checkout(self.copy.pk, self.other)
+        loans.checkout(self.copy.pk, self.reader)
+        self.assertEqual(BookInstance.objects.get(pk=self.copy.pk).status, 'o')
+
+    def test_renew(self):
+        with self.assertRaisesMessage(loans.LoanError, 'Cannot renew a copy that is available.'):
+            loans.renew(self.copy.pk, datetime.date.today())
+        loans.checkout(self.copy.pk, self.reader)
+        with self.assertRaises(ValidationError):
+            loans.renew(self.copy.pk, datetime.date.today() + datetime.timedelta(weeks=5))
+        loans.renew(self.copy.pk, datetime.date.today() + datetime.timedelta(weeks=4))
+        self.assertEqual(BookInstance.objects.get(pk=self.copy.pk).due_back,
+                         datetime.date.today() + datetime.timedelta(weeks=4))
+
+    def test_views(self):
+        librarian = User.objects.create_user(username='librarian', password='3HJ1vRV0Z&3iD')
+        librarian.user_permissions.add(Permission.objects.get(name='Set book as returned'))
+        self.client.login(username='librarian', password='3HJ1vRV0Z&3iD')
+
+        response = self.client.post(reverse('checkout-book-librarian', args=[self.copy.pk]),
+                                    {'borrower': self.reader.pk, 'due_back': datetime.date.today()})
+        self.assertRedirects(response, reverse('all-borrowed'))
+        response = self.client.post(reverse('checkout-book-librarian', args=[self.copy.pk]),
+                                    {'borrower': self.other.pk, 'due_back': datetime.date.today()})
+        self.assertContains(response, 'Cannot lend a copy that is on loan.')
+
+        response = self.client.post(reverse('return-book-librarian', args=[self.copy.pk]))
+        self.assertRedirects(response, reverse('bookinstance-detail', args=[self.copy.pk]))
+        self.assertEqual(self.client.post(reverse('return-book-librarian', args=[self.copy.pk])).status_code, 400)
+
+        response = self.client.post(reverse('reserve-book', args=[self.copy.pk]))
+        self.assertEqual(BookInstance.objects.get(pk=self.copy.pk).borrower, librarian)
+
+    def test_maintenance(self):
+        loans.send_to_maintenance(self.copy.pk)
+        self.assertEqual(BookInstance.objects.get(pk=self.copy.pk).status, 'm')
+        with self.assertRaisesMessage(loans.LoanError, 'Cannot lend a copy that is maintenance.'):
+            loans.checkout(self.copy.pk, self.reader)
+        loans.end_maintenance(self.copy.pk)
+        self.assertEqual(BookInstance.objects.get(pk=self.copy.pk).status, 'a')
+        with self.assertRaises(loans.LoanError):
+            loans.end_maintenance(self.copy.pk)
+
+    def test_edit_form_does_not_undo_a_loan(self):
+        stale = BookInstance.objects.get(pk=self.copy.pk)
+        loans.checkout(self.copy.pk, self.reader)
+        english = Language.objects.create(name='English')
+        form = UpdateBookInstanceModelForm({'book': self.book.pk, 'language': english.pk, 'imprint': 'Chilton'},
+                                           instance=stale)
+        self.assertNotIn('status', form.fields)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        self.copy.refresh_from_db()
+        self.assertEqual((self.copy.imprint, self.copy.status, self.copy.borrower), ('Chilton', 'o', self.reader))
+
+
+class BatchOperationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader', password='1X<ISRUkw+tuK')
+        cls.book = Book.objects.create(title='Dune', summary='Spice', isbn='9780441013593')
+
+    def setUp(self):
+        self.on_loan = [BookInstance.objects.create(book=self.book, imprint='Ace', status='o', borrower=self.reader,
+                                                    due_back=datetime.date.today()) for _ in range(3)]
+        self.available = BookInstance.objects.create(book=self.book, imprint='Ace', status='a')
+
+    def test_return_reports_every_copy_it_leaves_alone(self):
+        missing = '00000000-0000-0000-0000-000000000000'
+        ids = [str(copy.pk) for copy in self.on_loan] + [str(self.available.pk), missing, 'not-an-id']
+        result = loans.apply_batch('return', ids)
+
+        self.assertEqual(sorted(result.changed), sorted(copy.pk for copy in self.on_loan))
+        self.assertEqual(result.errors, {str(self.available.pk): 'Cannot return a copy that is available.',
+                                         missing: 'No copy with this id.', 'not-an-id': 'Not a copy id.'})
+        for copy in BookInstance.objects.filter(pk__in=result.changed):
+            self.assertEqual((copy.status, copy.borrower, copy.due_back), ('a', None, None))
+            copy.clean()
+        self.book.refresh_from_db()
+        self.assertEqual((self.book.copies_available, self.book.copies_on_loan), (4, 0))
+
+    def test_batches_are_set_based(self):
+        with CaptureQueriesContext(connection) as context:
+            loans.apply_batch('maintenance', [self.available.pk])
+            loans.apply_batch('renew', [copy.pk for copy in self.on_loan],
+                              datetime.date.today() + datetime.timedelta(weeks=2))
+        writes = [query['sql'] for query in context.captured_queries
+                  if query['sql'].startswith('UPDATE "catalog_bookinstance"')]
+        self.assertEqual(len(writes), 2)
+        self.assertNotIn('"imprint"', writes[1])
+        self.assertEqual(BookInstance.objects.get(pk=self.available.pk).status, 'm')
+        self.assertEqual(BookInstance.objects.filter(due_back=datetime.date.today() + datetime.timedelta(weeks=2))
+                         .count(), 3)
+
+    def test_renewals_follow_the_four_week_rule(self):
+        with self.assertRaises(ValidationError):
+            loans.apply_batch('renew', [self.on_loan[0].pk], datetime.date.today() + datetime.timedelta(weeks=5))
+        self.assertEqual(BookInstance.objects.get(pk=self.on_loan[0].pk).due_back, datetime.date.today())
+
+    def test_view(self):
+        librarian = User.objects.create_user(username='librarian', password='3HJ1vRV0Z&3iD')
+        librarian.user_permissions.add(Permission.objects.get(name='Set book as returned'))
+        self.client.login(username='librarian', password='3HJ1vRV0Z&3iD')
+        url = reverse('bookinstance-batch')
+
+        response = self.client.post(url, {'operation': 'renew', 'copy_ids': str(self.on_loan[0].pk)})
+        self.assertFormError(response, 'form', 'renewal_date', 'Renewals need a date.')
+
+        pasted = '\n'.join(str(copy.pk) for copy in [*self.on_loan, self.available])
+        response = self.client.post(url, {'operation': 'return', 'copy_ids': pasted})
+        self.assertContains(response, 'Changed 3 copies.')
+        self.assertContains(response, 'Cannot return a copy that is available.')
+
+
+class LoanConcurrencyTest(TransactionTestCase):
+    def test_concurrent_clients_never_double_lend(self):
+        # Django's SQLite backend rules out concurrent connections to any test database; settings put ours in a file.
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('The clients need a test database in a file.')
+        out = StringIO()
+        call_command('loadtest_loans', clients=8, copies=2, operations=25, stdout=out)
+        self.assertIn('no double loans', out.getvalue())
+        self.assertFalse(Book.objects.exists())
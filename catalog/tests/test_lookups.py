@@ -0,0 +1,81 @@
+from django.contrib.auth.models import Permission, User
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import lookups
+from catalog.models import Author, Book, BookInstance, Genre, Language
+
+
+class LookupTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.herbert = Author.objects.create(first_name='Frank', last_name='Herbert')
+        cls.herriot = Author.objects.create(first_name='James', last_name='Herriot')
+        cls.dune = Book.objects.create(title='Dune', summary='Spice', isbn='9780441013593', author=cls.herbert)
+        cls.messiah = Book.objects.create(title='Dune Messiah', summary='Jihad', isbn='9780593098233',
+                                          author=cls.herbert)
+        cls.dunes = Book.objects.create(title='dunes of the world', summary='Sand', isbn='9780000000001')
+        Book.objects.create(title='Emma', summary='Matchmaking', isbn='9780141439587')
+        Genre.objects.create(name='Science fiction')
+        Language.objects.create(name='English')
+        cls.librarian = User.objects.create_user(username='librarian', password='1X<ISRUkw+tuK')
+        cls.librarian.user_permissions.add(Permission.objects.get(codename='can_mark_returned'))
+        User.objects.create_user(username='reader', password='1X<ISRUkw+tuK')
+
+    def names(self, kind, query, limit=10):
+        return [str(obj) for obj in lookups.lookup(kind, query, limit)]
+
+    def test_prefixes_match_in_any_likely_case(self):
+        self.assertEqual(self.names('book', 'dune'), ['Dune', 'Dune Messiah', 'dunes of the world'])
+        self.assertEqual(self.names('book', 'messiah'), [])
+        self.assertEqual(self.names('book', 'dune m'), ['Dune Messiah'])
+        self.assertEqual(self.names('genre', 'science'), ['Science fiction'])
+        self.assertEqual(self.names('language', 'eng'), ['English'])
+        self.assertEqual(self.names('user', 'Read'), ['reader'])
+
+    def test_exact_matches_rank_first_and_limit(self):
+        self.assertEqual(self.names('book', 'dune', limit=2), ['Dune', 'Dune Messiah'])
+        self.assertEqual(self.names('author', 'her'), ['Herbert, Frank', 'Herriot, James'])
+        self.assertEqual(self.names('author', 'herriot'), ['Herriot, James'])
+
+    def test_isbns_and_full_names(self):
+        self.assertEqual(self.names('book', '97805930'), ['Dune Messiah'])
+        self.assertEqual(self.names('author', 'jam her'), ['Herriot, James'])
+        self.assertEqual(self.names('author', '  '), [])
+
+    def test_endpoint(self):
+        url = reverse('lookup', args=['book'])
+        self.client.login(username='reader', password='1X<ISRUkw+tuK')
+        self.assertEqual(self.client.get(url, {'q': 'dune'}).status_code, 403)
+
+        self.client.login(username='librarian', password='1X<ISRUkw+tuK')
+        response = self.client.get(url, {'q': 'dune', 'limit': 1})
+        self.assertEqual(response.json(), {'results': [{'id': self.dune.pk, 'text': 'Dune'}]})
+        self.assertEqual(self.client.get(reverse('lookup', args=['shelf']), {'q': 'a'}).status_code, 404)
+        self.assertEqual(self.client.get(url, {'q': 'a', 'limit': 'all'}).status_code, 400)
+
+    def test_forms_list_only_the_selected_options(self):
+        self.client.login(username='librarian', password='1X<ISRUkw+tuK')
+        response = self.client.get(reverse('bookinstance-create'))
+        self.assertContains(response, reverse('lookup', args=['book']))
+        self.assertNotContains(response, 'Dune')
+
+        copy = BookInstance.objects.create(book=self.messiah, imprint='Ace', status='o', borrower=self.librarian,
+                                           due_back='2030-01-01')
+        response = self.client.get(reverse('bookinstance-update', args=[copy.pk]))
+        self.assertContains(response, f'<option value="{self.messiah.pk}" selected>Dune Messiah</option>', html=True)
+        self.assertNotContains(response, 'dunes of the world')
+        self.assertNotContains(response, 'reader')
+
+        response = self.client.get(reverse('book-update', args=[self.dune.pk]))
+        self.assertContains(response, 'Herbert, Frank')
+        self.assertNotContains(response, 'Herriot')
+
+    def test_invalid_choices_are_form_errors(self):
+        self.client.login(username='librarian', password='1X<ISRUkw+tuK')
+        response = self.client.post(reverse('book-create'), {
+            'title': 'Dune', 'summary': 'Spice', 'isbn': '9780441013594', 'author': 'abc', 'genre': ['x']})
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response, 'form', 'author',
+                             'Select a valid choice. That choice is not one of the available choices.')
+        self.assertFormError(response, 'form', 'genre', '“x” is not a valid value.')
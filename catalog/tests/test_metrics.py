@@ -0,0 +1,77 @@
+import datetime
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from catalog.metrics import render_metrics
+from catalog.models import Book, BookInstance
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader', password='1X<ISRUkw+tuK')
+        book = Book.objects.create(title='Dune', summary='Spice', isbn='9780441013593')
+        today = datetime.date.today()
+        BookInstance.objects.create(book=book, status='o', borrower=cls.reader, due_back=today - datetime.timedelta(1))
+        BookInstance.objects.create(book=book, status='o', borrower=cls.reader, due_back=today + datetime.timedelta(1))
+        BookInstance.objects.create(book=book, status='a')
+
+    def test_request_metrics_by_view(self):
+        before = sample('catalog_request_duration_seconds_count', view='books', method='GET')
+        self.client.get(reverse('books'))
+        self.assertEqual(sample('catalog_request_duration_seconds_count', view='books', method='GET'), before + 1)
+        self.assertGreater(sample('catalog_request_db_queries_sum', view='books'), 0)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_loan_gauges(self):
+        text = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret').content.decode()
+        self.assertIn('catalog_loans_active 2.0', text)
+        self.assertIn('catalog_loans_overdue 1.0', text)
+
+    def test_cache_and_session_counters(self):
+        hits = sample('catalog_cache_lookups_total', cache='stats', result='hit')
+        self.client.get(reverse('index'))
+        self.client.get(reverse('index'))
+        self.assertEqual(sample('catalog_cache_lookups_total', cache='stats', result='hit'), hits + 1)
+
+        created = sample('catalog_session_operations_total', operation='create')
+        self.client.login(username='reader', password='1X<ISRUkw+tuK')
+        self.assertGreater(sample('catalog_session_operations_total', operation='create'), created)
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer guess').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_only_staff_without_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.client.login(username='reader', password='1X<ISRUkw+tuK')
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        User.objects.filter(pk=self.reader.pk).update(is_staff=True)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    def test_values_of_all_worker_processes_are_summed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': directory, 'DJANGO_SETTINGS_MODULE': 'LocalLibrary.settings'}
+            script = ('import django; django.setup(); from catalog.metrics import CACHE_LOOKUPS; '
+                      'CACHE_LOOKUPS.labels("page", "hit").inc(3)')
+            for _ in range(2):
+                subprocess.run([sys.executable, '-c', script], env=env, cwd=settings.BASE_DIR, check=True)
+            with mock.patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': directory}):
+                text = render_metrics().decode()
+        self.assertIn('catalog_cache_lookups_total{cache="page",result="hit"} 6.0', text)
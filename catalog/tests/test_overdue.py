@@ -0,0 +1,99 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth.models import Permission, User
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from catalog.models import Book, BookInstance
+from catalog.overdue import send_overdue_notices
+
+
+class ConnectingBackend(locmem.EmailBackend):
+    """The locmem backend, connecting like the SMTP one: ``send_messages`` opens and closes unless already open."""
+    connects = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connected = False
+
+    def open(self):
+        if self.connected:
+            return False
+        ConnectingBackend.connects += 1
+        self.connected = True
+        return True
+
+    def close(self):
+        self.connected = False
+
+    def send_messages(self, messages):
+        new_connection = self.open()
+        try:
+            return super().send_messages(messages)
+        finally:
+            if new_connection:
+                self.close()
+
+
+class OverdueTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user(username='librarian', password='2HJ1vRV0Z&3iD',
+                                                 email='librarian@example.com')
+        cls.librarian.user_permissions.add(Permission.objects.get(name='Set book as returned'))
+        cls.reader = User.objects.create_user(username='reader', password='1X<ISRUkw+tuK', email='reader@example.com')
+        no_email = User.objects.create_user(username='noemail', password='1X<ISRUkw+tuK')
+        book = Book.objects.create(title='Dune', summary='Spice', isbn='9780441013593')
+
+        today = datetime.date.today()
+        for borrower, days, status in [
+            (cls.reader, -3, 'o'),
+            (cls.reader, -1, 'o'),
+            (cls.reader, 2, 'o'),
+            (cls.librarian, -5, 'o'),
+            (cls.librarian, -5, 'r'),
+            (no_email, -2, 'o'),
+        ]:
+            BookInstance.objects.create(book=book, imprint='Ace', status=status, borrower=borrower,
+                                        due_back=today + datetime.timedelta(days=days))
+
+    def test_overdue_queryset(self):
+        self.assertEqual(BookInstance.objects.overdue().count(), 4)
+        for copy in BookInstance.objects.overdue():
+            self.assertTrue(copy.is_overdue)
+
+    def test_scan_sends_one_email_per_borrower(self):
+        out = StringIO()
+        call_command('scan_overdue', stdout=out)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         ['librarian@example.com', 'reader@example.com'])
+        reader_mail = next(message for message in mail.outbox if message.to == ['reader@example.com'])
+        self.assertEqual(reader_mail.subject, 'You have 2 overdue books')
+        self.assertIn('Notified 2 borrowers about 3 overdue copies.', out.getvalue())
+        self.assertIn('1 borrowers have no email address.', out.getvalue())
+
+    @override_settings(EMAIL_BACKEND='catalog.tests.test_overdue.ConnectingBackend')
+    def test_one_connection_for_all_batches(self):
+        ConnectingBackend.connects = 0
+        result = send_overdue_notices(batch_size=1)
+        self.assertEqual((result['borrowers'], len(mail.outbox)), (2, 2))
+        self.assertEqual(ConnectingBackend.connects, 1)
+
+    def test_dry_run_sends_nothing(self):
+        call_command('scan_overdue', dry_run=True, stdout=StringIO())
+        self.assertEqual(mail.outbox, [])
+
+    def test_librarian_view(self):
+        self.client.login(username='reader', password='1X<ISRUkw+tuK')
+        self.assertEqual(self.client.get(reverse('overdue')).status_code, 403)
+
+        self.client.login(username='librarian', password='2HJ1vRV0Z&3iD')
+        response = self.client.get(reverse('overdue'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'catalog/bookinstance_list_overdue.html')
+        self.assertEqual(len(response.context['bookinstance_list']), 4)
+        self.assertContains(response, 'Overdue books')
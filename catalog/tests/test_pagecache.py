@@ -0,0 +1,112 @@
+from django.contrib.auth.models import User
+from django.template import Context, Template
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog import loans, pagecache
+from catalog.models import Author, Book, BookInstance, Genre
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader', password='1X<ISRUkw+tuK')
+        cls.author = Author.objects.create(first_name='Frank', last_name='Herbert')
+        cls.genre = Genre.objects.create(name='Science fiction')
+        cls.book = Book.objects.create(title='Dune', summary='Spice', isbn='9780441013593', author=cls.author)
+        cls.book.genre.add(cls.genre)
+        cls.copy = BookInstance.objects.create(book=cls.book, imprint='Ace', status='a')
+
+    def setUp(self):
+        pagecache.get_cache().clear()
+
+    def get(self, url):
+        return self.client.get(url)
+
+    def test_second_anonymous_request_is_served_from_cache(self):
+        url = reverse('book-detail', args=[self.book.pk])
+        first = self.get(url)
+        self.assertEqual(first['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            second = self.get(url)
+        self.assertEqual(second['X-Page-Cache'], 'hit')
+        self.assertEqual(second.content, first.content)
+
+    def test_logged_in_users_bypass_the_page_cache(self):
+        self.client.login(username='reader', password='1X<ISRUkw+tuK')
+        url = reverse('book-detail', args=[self.book.pk])
+        self.get(url)
+        self.assertNotIn('X-Page-Cache', self.get(url))
+
+    def test_cursor_pages_are_cached_separately(self):
+        self.get(reverse('books'))
+        self.assertEqual(self.get(reverse('books') + '?available=1')['X-Page-Cache'], 'miss')
+
+    def test_book_change_invalidates_its_pages(self):
+        urls = [reverse('book-detail', args=[self.book.pk]), reverse('books'),
+                reverse('author-detail', args=[self.author.pk]), reverse('genre-detail', args=[self.genre.pk])]
+        for url in urls:
+            self.get(url)
+        self.book.title = 'Dune (1965)'
+        self.book.save()
+        for url in urls:
+            response = self.get(url)
+            self.assertEqual(response['X-Page-Cache'], 'miss', url)
+            self.assertContains(response, 'Dune (1965)')
+
+    def test_unrelated_pages_stay_cached(self):
+        other = Book.objects.create(title='Emma', summary='Matchmaking', isbn='9780141439587')
+        url = reverse('book-detail', args=[self.book.pk])
+        self.get(url)
+        other.title = 'Emma (1815)'
+        other.save()
+        self.assertEqual(self.get(url)['X-Page-Cache'], 'hit')
+
+    def test_copy_status_change_invalidates_book_pages(self):
+        url = reverse('book-detail', args=[self.book.pk])
+        self.get(url)
+        loans.reserve(self.copy.pk, self.reader)
+        response = self.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Reserved')
+
+    def test_author_rename_invalidates_book_pages(self):
+        url = reverse('book-detail', args=[self.book.pk])
+        self.get(url)
+        self.author.first_name = 'Franklin'
+        self.author.save()
+        self.assertContains(self.get(url), 'Franklin')
+
+    def test_genre_links_invalidate_genre_pages(self):
+        genre = Genre.objects.create(name='Ecology')
+        url = reverse('genre-detail', args=[genre.pk])
+        self.assertNotContains(self.get(url), 'Dune')
+        self.book.genre.add(genre)
+        self.assertContains(self.get(url), 'Dune')
+        genre.book_set.clear()
+        self.assertNotContains(self.get(url), 'Dune')
+
+    def test_hits_and_misses_are_counted(self):
+        before = pagecache.get_stats()
+        url = reverse('genres')
+        self.get(url)
+        self.get(url)
+        after = pagecache.get_stats()
+        self.assertEqual(after['hits'] - before['hits'], 1)
+        self.assertEqual(after['misses'] - before['misses'], 1)
+
+
+class VersionedCacheTagTest(TestCase):
+    template = Template('{% load catalog_cache %}{% versioned_cache "title" "book" book.pk %}{{ book.title }}'
+                        '{% endversioned_cache %}')
+
+    def setUp(self):
+        pagecache.get_cache().clear()
+
+    def test_fragment_is_rendered_again_after_a_bump(self):
+        book = Book.objects.create(title='Dune', summary='Spice', isbn='9780441013593')
+        self.assertEqual(self.template.render(Context({'book': book})), 'Dune')
+        book.title = 'Changed behind the cache'
+        self.assertEqual(self.template.render(Context({'book': book})), 'Dune')
+        pagecache.bump([('book', book.pk)])
+        self.assertEqual(self.template.render(Context({'book': book})), 'Changed behind the cache')
@@ -0,0 +1,67 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog.models import Author, Book, BookInstance, Genre
+
+
+class CursorPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Duplicate surnames make the pk tiebreaker matter
+        for author_id in range(25):
+            Author.objects.create(first_name='Christian', last_name=f'Surname {author_id % 7}')
+
+    def walk(self, url, context_name):
+        seen = []
+        response = self.client.get(url)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            seen.extend(response.context[context_name])
+            if not response.context['page_obj'].has_next():
+                return seen, response
+            response = self.client.get(response.context['page_obj'].next_url)
+
+    def test_walks_all_authors_in_order(self):
+        seen, _response = self.walk(reverse('authors'), 'author_list')
+        self.assertEqual(seen, list(Author.objects.order_by('last_name', 'first_name', 'pk')))
+
+    def test_previous_returns_to_same_page(self):
+        first = self.client.get(reverse('authors'))
+        second = self.client.get(first.context['page_obj'].next_url)
+        self.assertTrue(second.context['page_obj'].has_previous())
+        back = self.client.get(second.context['page_obj'].previous_url)
+        self.assertEqual(list(back.context['author_list']), list(first.context['author_list']))
+        self.assertFalse(back.context['page_obj'].has_previous())
+
+    def test_page_does_not_count_rows(self):
+        first = self.client.get(reverse('authors'))
+        # One query for the page, none for COUNT(*) or OFFSET
+        with self.assertNumQueries(1):
+            self.client.get(first.context['page_obj'].next_url)
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(reverse('authors') + '?cursor=tampered')
+        self.assertEqual(response.status_code, 404)
+
+    def test_legacy_page_parameter_still_works(self):
+        response = self.client.get(reverse('authors') + '?page=3')
+        self.assertEqual(len(response.context['author_list']), 5)
+
+    def test_nullable_ordering_field(self):
+        User.objects.create_user(username='testuser1', password='1X<ISRUkw+tuK')
+        book = Book.objects.create(title='Book Title', summary='Summary', isbn='ABCDEFG')
+        book.genre.set([Genre.objects.create(name='Fantasy')])
+        for copy in range(23):
+            due_back = None if copy % 3 else datetime.date.today() + datetime.timedelta(days=copy % 4)
+            BookInstance.objects.create(book=book, imprint='Imprint', due_back=due_back, status='m')
+
+        self.client.login(username='testuser1', password='1X<ISRUkw+tuK')
+        seen, last = self.walk(reverse('bookinstances'), 'bookinstance_list')
+        self.assertEqual(len(seen), 23)
+        self.assertEqual(len(set(copy.pk for copy in seen)), 23)
+
+        back = self.client.get(last.context['page_obj'].previous_url)
+        self.assertEqual(list(back.context['bookinstance_list']), seen[10:20])
@@ -0,0 +1,74 @@
+import os
+import tempfile
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from catalog import pagecache
+from catalog.models import Book
+from catalog.profiling import RequestProfile, percentile, request_log, summarize
+
+
+class ProfilingMiddlewareTest(TestCase):
+    def setUp(self):
+        pagecache.get_cache().clear()
+        request_log.clear()
+        Book.objects.create(title='Dune', summary='Spice', isbn='9780441013593')
+
+    def test_disabled_by_default(self):
+        response = self.client.get(reverse('books'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(request_log.snapshot(), [])
+
+    @override_settings(REQUEST_PROFILING=True)
+    def test_records_requests_per_url_name(self):
+        response = self.client.get(reverse('books'))
+        self.assertIn('render;dur=', response['Server-Timing'])
+
+        [record] = request_log.snapshot()
+        self.assertEqual(record['url_name'], 'books')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['render_ms'], 0)
+        self.assertGreaterEqual(record['total_ms'], record['db_ms'] + record['render_ms'])
+
+    @override_settings(REQUEST_PROFILING=True, REQUEST_PROFILING_SAMPLE_RATE=1.0, REQUEST_PROFILING_DUMPS=1)
+    def test_keeps_profiles_of_the_slowest_sampled_requests(self):
+        with tempfile.TemporaryDirectory() as dump_dir, override_settings(REQUEST_PROFILING_DUMP_DIR=dump_dir):
+            self.client.get(reverse('books'))
+            self.client.get(reverse('genres'))
+            self.assertEqual(len([name for name in os.listdir(dump_dir) if name.endswith('.prof')]), 1)
+            request_log.dumps.clear()
+
+    @override_settings(REQUEST_PROFILING=True)
+    def test_report_is_staff_only(self):
+        User.objects.create_user(username='reader', password='1X<ISRUkw+tuK')
+        User.objects.create_user(username='staff', password='2HJ1vRV0Z&3iD', is_staff=True)
+        self.client.get(reverse('books'))
+
+        self.client.login(username='reader', password='1X<ISRUkw+tuK')
+        self.assertEqual(self.client.get(reverse('profiling')).status_code, 302)
+
+        self.client.login(username='staff', password='2HJ1vRV0Z&3iD')
+        report = self.client.get(reverse('profiling')).json()
+        self.assertTrue(report['enabled'])
+        self.assertEqual(report['views']['books']['requests'], 1)
+
+
+class RequestProfileTest(TestCase):
+    def test_counts_repeated_queries(self):
+        profile = RequestProfile()
+        with connection.execute_wrapper(profile):
+            for isbn in ('1', '1', '2'):
+                list(Book.objects.filter(isbn=isbn))
+        self.assertEqual(profile.queries, 3)
+        self.assertEqual(profile.duplicates, 1)
+
+    def test_percentiles(self):
+        values = list(range(1, 101))
+        self.assertEqual([percentile(values, fraction) for fraction in (0.5, 0.95, 0.99)], [50, 95, 99])
+        records = [{'url_name': 'books', 'total_ms': float(ms), 'db_ms': 1.0, 'render_ms': 2.0, 'queries': 2,
+                    'duplicates': 0} for ms in values]
+        self.assertEqual(summarize(records)['books']['total_p95_ms'], 95.0)
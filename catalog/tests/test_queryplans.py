@@ -0,0 +1,44 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, skipUnlessDBFeature
+
+from catalog.queryplans import audit, table_scans
+from catalog.synthetic import generate_catalog
+
+
+class TableScanTest(TestCase):
+    def test_flags_scans_without_an_index(self):
+        plan = ['SCAN catalog_book', 'SCAN catalog_author USING INDEX author_name_idx', 'SCAN CONSTANT ROW',
+                'SEARCH catalog_language USING INTEGER PRIMARY KEY (rowid=?)', 'USE TEMP B-TREE FOR ORDER BY']
+        self.assertEqual(table_scans(plan, 'sqlite'), ['catalog_book'])
+        self.assertEqual(table_scans(['SCAN TABLE catalog_genre'], 'sqlite'), ['catalog_genre'])
+
+        plan = ['Limit  (cost=0.29..1.02 rows=11 width=56)',
+                '  ->  Index Scan using book_title_idx on catalog_book  (cost=0.29..16.3 rows=250 width=56)',
+                '  ->  Seq Scan on catalog_genre  (cost=0.00..1.30 rows=30 width=40)']
+        self.assertEqual(table_scans(plan, 'postgresql'), ['catalog_genre'])
+
+
+@skipUnlessDBFeature('supports_partial_indexes')
+class CatalogQueryPlanTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_catalog(400, batch_size=100)
+
+    def test_catalog_pages_use_indexes(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest('Plans are only read on SQLite and PostgreSQL.')
+        results = list(audit())
+        self.assertIn('my-borrowed', {result['page'] for result in results})
+        # Keyset pages after the first are audited too.
+        self.assertTrue(any('cursor=' in result['path'] for result in results))
+        self.assertEqual([(result['path'], result['scans']) for result in results if result['scans']], [])
+
+    def test_command_reports_summary(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest('Plans are only read on SQLite and PostgreSQL.')
+        out = StringIO()
+        call_command('explain_views', '--strict', stdout=out)
+        self.assertIn('0 with full table scans', out.getvalue())
@@ -0,0 +1,82 @@
+import unittest
+from contextlib import ExitStack
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.sessions.models import Session
+from django.db import connections, router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from catalog.models import Author, Book
+from catalog.routers import PIN_COOKIE, ReplicaRoutingMiddleware, replica_aliases
+
+
+class ReplicaRoutingTest(SimpleTestCase):
+    def serve(self, path, method='get', cookies=None, view=None):
+        """Pass a request through the middleware; return where Book and Session reads went, and the response."""
+        request = getattr(RequestFactory(), method)(path)
+        request.COOKIES.update(cookies or {})
+        request.resolver_match = resolve(path)
+        reads = []
+
+        def get_response(request):
+            middleware.process_view(request, None, (), {})
+            if view:
+                view()
+            reads.extend([router.db_for_read(Book), router.db_for_read(Session)])
+            return HttpResponse()
+
+        with mock.patch('catalog.routers.replica_aliases', return_value=['replica1']):
+            middleware = ReplicaRoutingMiddleware(get_response)
+        response = middleware(request)
+        return reads, response
+
+    def test_catalog_pages_read_from_a_replica(self):
+        reads, response = self.serve(reverse('books'))
+        self.assertEqual(reads, ['replica1', 'default'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(router.db_for_read(Book), 'default')
+
+    def test_other_requests_read_from_the_primary(self):
+        self.assertEqual(self.serve(reverse('my-borrowed'))[0], ['default', 'default'])
+        self.assertEqual(self.serve(reverse('books'), method='post')[0], ['default', 'default'])
+        self.assertEqual(self.serve(reverse('books'), cookies={PIN_COOKIE: '1'})[0], ['default', 'default'])
+
+    def test_writes_pin_the_rest_of_the_request_and_the_browser(self):
+        reads, response = self.serve(reverse('book-detail', args=[1]), view=lambda: router.db_for_write(Author))
+        self.assertEqual(reads, ['default', 'default'])
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 10)
+
+    def test_session_writes_do_not_pin(self):
+        reads, response = self.serve(reverse('books'), view=lambda: router.db_for_write(Session))
+        self.assertEqual(reads, ['replica1', 'default'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    async def test_async_requests_pin_after_writes_on_other_threads(self):
+        request = RequestFactory().get(reverse('book-detail', args=[1]))
+
+        async def get_response(request):
+            await sync_to_async(router.db_for_write)(Author)
+            return HttpResponse()
+
+        with mock.patch('catalog.routers.replica_aliases', return_value=['replica1']):
+            middleware = ReplicaRoutingMiddleware(get_response)
+        response = await middleware(request)
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 10)
+
+
+@unittest.skipUnless(replica_aliases(), 'Set DATABASE_REPLICA_URLS to test against replicas.')
+class ReplicaQueryTest(TransactionTestCase):
+    # Replicas mirror the test database, and on SQLite must not read rows the primary holds in an open transaction.
+    databases = '__all__'
+
+    def test_book_list_queries_a_replica(self):
+        Book.objects.create(title='Replicated', summary='', isbn='0000000000001')
+        with ExitStack() as stack:
+            captures = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in replica_aliases()]
+            response = self.client.get(reverse('books'))
+        self.assertContains(response, 'Replicated')
+        self.assertTrue(any(capture.captured_queries for capture in captures))
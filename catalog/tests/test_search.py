@@ -0,0 +1,89 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog.models import Author, Book
+from catalog.search import SEARCH_TABLE, search_books
+
+
+class SearchIndexTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name='Fyodor', last_name='Dostoevsky')
+        cls.crime = Book.objects.create(title='Crime and Punishment', summary='A student in St. Petersburg.',
+                                        isbn='9780140449136', author=cls.author)
+        cls.idiot = Book.objects.create(title='The Idiot', summary='A prince returns from a sanatorium.',
+                                        isbn='9780140447927', author=cls.author)
+        cls.other = Book.objects.create(title='Crime Novel', summary='Punishment is mentioned here.',
+                                        isbn='9780000000001')
+
+    def ids(self, query, **kwargs):
+        return [book_id for book_id, _rank in search_books(query, **kwargs)]
+
+    def test_matches_title_author_summary_and_isbn(self):
+        self.assertEqual(set(self.ids('dostoevsky')), {self.crime.pk, self.idiot.pk})
+        self.assertEqual(self.ids('sanatorium'), [self.idiot.pk])
+        self.assertEqual(self.ids('9780140449136'), [self.crime.pk])
+
+    def test_prefix_and_all_words_match(self):
+        self.assertEqual(self.ids('punish crim'), [self.crime.pk, self.other.pk])
+
+    def test_title_ranks_above_summary(self):
+        self.assertEqual(self.ids('punishment')[0], self.crime.pk)
+
+    def test_paging_after_last_result(self):
+        results = search_books('crime')
+        self.assertEqual(len(results), 2)
+        self.assertEqual(search_books('crime', after=results[0]), results[1:])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.idiot.title = 'The Gambler'
+        self.idiot.save()
+        self.assertEqual(self.ids('gambler'), [self.idiot.pk])
+        self.assertEqual(self.ids('idiot'), [])
+
+        self.author.last_name = 'Dostoyevsky'
+        self.author.save()
+        self.assertEqual(len(self.ids('dostoyevsky')), 2)
+
+        self.author.delete()
+        self.assertEqual(self.ids('fyodor'), [])
+        self.assertEqual(len(self.ids('crime')), 2)
+
+        self.other.delete()
+        self.assertEqual(self.ids('novel'), [])
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        self.assertEqual(self.ids('crime'), [])
+        out = StringIO()
+        call_command('rebuild_search_index', batch_size=2, stdout=out)
+        self.assertIn('Indexed 3 books', out.getvalue())
+        self.assertEqual(len(self.ids('crime')), 2)
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for book_id in range(13):
+            Book.objects.create(title=f'Crime {book_id}', summary='Summary', isbn=f'ISBN{book_id}')
+
+    def test_pages_through_ranked_results(self):
+        response = self.client.get(reverse('search'), {'q': 'crime'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'catalog/book_search.html')
+        self.assertEqual(len(response.context['book_list']), 10)
+        self.assertTrue(response.context['is_paginated'])
+
+        response = self.client.get(response.context['page_obj'].next_url)
+        self.assertEqual(len(response.context['book_list']), 3)
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_empty_query(self):
+        response = self.client.get(reverse('search'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['book_list'], [])
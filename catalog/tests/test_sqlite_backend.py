@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from django.db import connection
+from django.db.utils import OperationalError, load_backend
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'SQLite only')
+class TunedSQLiteBackendTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.settings_dict = {**connection.settings_dict, 'ENGINE': 'catalog.backends.sqlite3',
+                              'NAME': os.path.join(directory.name, 'tuned.sqlite3'),
+                              'OPTIONS': {'pragmas': {'busy_timeout': 50}}}
+
+    def connect(self):
+        wrapper = load_backend(self.settings_dict['ENGINE']).DatabaseWrapper(self.settings_dict, 'tuned')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def query(self, wrapper, sql):
+        with wrapper.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchone()[0]
+
+    def pragma(self, wrapper, name):
+        return self.query(wrapper, f'PRAGMA {name}')
+
+    def test_new_connections_are_tuned(self):
+        wrapper = self.connect()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 50)  # from OPTIONS
+        self.assertEqual(self.pragma(wrapper, 'foreign_keys'), 1)
+
+    def test_transactions_take_the_write_lock_up_front(self):
+        writer, other = self.connect(), self.connect()
+        with writer.cursor() as cursor:
+            cursor.execute('CREATE TABLE counter (n integer)')
+
+        with CaptureQueriesContext(writer) as queries:
+            writer._start_transaction_under_autocommit()
+        try:
+            # Another connection can still read, but cannot begin a transaction of its own.
+            self.assertEqual(self.query(other, 'SELECT count(*) FROM counter'), 0)
+            with self.assertRaises(OperationalError):
+                other._start_transaction_under_autocommit()
+        finally:
+            writer.cursor().execute('ROLLBACK')
+        self.assertEqual(queries.captured_queries[0]['sql'], 'BEGIN IMMEDIATE')
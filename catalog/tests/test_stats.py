@@ -0,0 +1,55 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog.models import Author, Book, BookInstance, Genre, Language
+from catalog.stats import compute_catalog_stats, get_catalog_stats
+
+
+class CatalogStatsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name='John', last_name='Smith')
+        language = Language.objects.create(name='English')
+        Genre.objects.create(name='Fantasy')
+        cls.book = Book.objects.create(title='Crime and Punishment', summary='Summary', isbn='1234567890123',
+                                       author=author, language_of_origin=language)
+        Book.objects.create(title='Other Title', summary='Summary', isbn='1234567890124',
+                            author=author, language_of_origin=language)
+        BookInstance.objects.create(book=cls.book, imprint='Imprint', status='a')
+        BookInstance.objects.create(book=cls.book, imprint='Imprint', status='m')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_compute_counts_everything_in_one_query(self):
+        with self.assertNumQueries(1):
+            stats = compute_catalog_stats()
+        self.assertEqual(stats, {
+            'num_books': 2,
+            'num_instances': 2,
+            'num_instances_available': 1,
+            'num_authors': 1,
+            'num_genres': 1,
+            'num_books_with_crime_word': 1,
+        })
+
+    def test_cached_stats_need_no_queries(self):
+        get_catalog_stats()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_catalog_stats()['num_books'], 2)
+
+    def test_save_and_delete_invalidate_cache(self):
+        get_catalog_stats()
+        copy = BookInstance.objects.create(book=self.book, imprint='Imprint', status='a')
+        self.assertEqual(get_catalog_stats()['num_instances_available'], 2)
+        copy.delete()
+        self.assertEqual(get_catalog_stats()['num_instances_available'], 1)
+        Genre.objects.create(name='Crime')
+        self.assertEqual(get_catalog_stats()['num_genres'], 2)
+
+    def test_index_uses_cached_stats(self):
+        self.client.get(reverse('index'))
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.context['num_books'], 2)
+        self.assertEqual(response.context['num_books_with_crime_word'], 1)
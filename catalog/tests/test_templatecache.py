@@ -0,0 +1,50 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.template import TemplateSyntaxError, engines
+from django.test import TestCase, override_settings
+
+from catalog.models import Author, Book, Genre
+from catalog.templatecache import cached_loaders, preload_templates, template_names
+
+CACHED_TEMPLATES = {
+    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'DIRS': [],
+    'OPTIONS': {'loaders': cached_loaders()},
+}
+
+
+class PreloadTemplatesTest(TestCase):
+    def test_project_templates_are_found(self):
+        names = template_names(engines['django'].engine)
+        self.assertIn('base_generic.html', names)
+        self.assertIn('catalog/book_detail.html', names)
+        self.assertIn('registration/login.html', names)
+        self.assertNotIn('admin/base.html', names)
+
+    def test_preload_fills_the_cached_loader(self):
+        with override_settings(TEMPLATES=[CACHED_TEMPLATES]):
+            names = preload_templates()
+            loader = engines['django'].engine.template_loaders[0]
+            self.assertEqual(len(loader.get_template_cache), len(names))
+
+    def test_broken_template_fails_fast(self):
+        broken = {**CACHED_TEMPLATES, 'OPTIONS': {'loaders': [
+            ('django.template.loaders.locmem.Loader', {'broken.html': '{% if %}{% endif %}'}),
+        ]}}
+        with override_settings(TEMPLATES=[broken]), \
+                mock.patch('catalog.templatecache.template_names', return_value=['broken.html']):
+            with self.assertRaisesMessage(TemplateSyntaxError, "'broken.html'"):
+                preload_templates()
+
+
+class BenchTemplatesCommandTest(TestCase):
+    def test_reports_every_page(self):
+        author = Author.objects.create(first_name='Frank', last_name='Herbert')
+        book = Book.objects.create(title='Dune', summary='Spice', isbn='9780441013593', author=author)
+        book.genre.add(Genre.objects.create(name='Science fiction'))
+        out = StringIO()
+        call_command('bench_templates', repeat=2, stdout=out)
+        for label in ('books', 'book-detail', 'author-detail', 'genre-detail'):
+            self.assertIn(label, out.getvalue())
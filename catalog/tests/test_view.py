@@ -1,4 +1,6 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 import datetime
 from django.utils import timezone
@@ -7,6 +9,7 @@ import uuid
 from django.contrib.auth.models import Permission
 
 from catalog.models import Author, BookInstance, Book, Genre, Language
+from catalog import pagecache
 
 class AuthorListViewTest(TestCase):
     @classmethod
@@ -283,3 +286,84 @@ class RenewBookInstancesViewTest(TestCase):
         response = self.client.post(reverse('renew-book-librarian', kwargs={'pk': self.test_bookinstance1.pk}), {'renewal_date': invalid_date_in_future})
         self.assertEqual(response.status_code, 200)
         self.assertFormError(response, 'form', 'renewal_date', 'Invalid date - renewal more than 4 weeks ahead')
+
+
+class QueryCountBudgetTest(TestCase):
+    """Each page must run a fixed number of queries, however many rows it renders."""
+
+    def setUp(self):
+        self.librarian = User.objects.create_user(username='librarian', password='2HJ1vRV0Z&3iD')
+        self.librarian.user_permissions.add(Permission.objects.get(name='Set book as returned'))
+        self.author = Author.objects.create(first_name='John', last_name='Smith')
+        self.genre = Genre.objects.create(name='Fantasy')
+        self.language = Language.objects.create(name='English')
+        self.book = None
+        self.add_rows(2)
+
+    def add_rows(self, count):
+        for _ in range(count):
+            author = Author.objects.create(first_name='Jane', last_name=f'Doe {Author.objects.count()}')
+            book = Book.objects.create(
+                title=f'Book {Book.objects.count()}',
+                summary='My book summary',
+                isbn=f'ISBN{Book.objects.count()}',
+                author=author,
+                language_of_origin=self.language,
+            )
+            book.genre.set([self.genre, Genre.objects.create(name=f'Genre {Genre.objects.count()}')])
+            self.book = self.book or book
+            for copy_book in (book, self.book):
+                BookInstance.objects.create(
+                    book=copy_book,
+                    imprint='Unlikely Imprint, 2016',
+                    due_back=datetime.date.today() + datetime.timedelta(days=3),
+                    borrower=self.librarian,
+                    status='o',
+                    language=self.language,
+                )
+
+    def count_queries(self, url):
+        # Measure rendering, not the anonymous page cache.
+        pagecache.get_cache().clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assertQueryBudget(self, url, budget):
+        small = self.count_queries(url)
+        self.add_rows(6)
+        large = self.count_queries(url)
+        self.assertEqual(small, large, f'{url} runs a query per row')
+        self.assertLessEqual(large, budget, f'{url} exceeds its query budget')
+
+    def test_public_pages(self):
+        pages = [
+            (reverse('books'), 1),
+            (reverse('book-detail', args=[self.book.pk]), 3),
+            (reverse('authors'), 1),
+            (reverse('author-detail', args=[self.book.author.pk]), 2),
+            (reverse('genres'), 1),
+            (reverse('genre-detail', args=[self.genre.pk]), 2),
+            (reverse('languages'), 1),
+        ]
+        for url, budget in pages:
+            with self.subTest(url=url):
+                self.assertQueryBudget(url, budget)
+
+    def test_librarian_pages(self):
+        self.client.login(username='librarian', password='2HJ1vRV0Z&3iD')
+        # Session, user and permission lookups account for the fixed overhead.
+        overhead = self.count_queries(reverse('languages')) - 1
+        copy = BookInstance.objects.filter(book=self.book).first()
+        pages = [
+            (reverse('book-detail', args=[self.book.pk]), 3),
+            (reverse('bookinstances'), 1),
+            (reverse('bookinstance-detail', args=[copy.pk]), 2),
+            (reverse('my-borrowed'), 1),
+            (reverse('all-borrowed'), 1),
+            (reverse('renew-book-librarian', args=[copy.pk]), 1),
+        ]
+        for url, budget in pages:
+            with self.subTest(url=url):
+                self.assertQueryBudget(url, budget + overhead)
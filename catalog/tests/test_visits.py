@@ -0,0 +1,66 @@
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from catalog import visits
+from catalog.sessions import SessionStore
+
+
+@override_settings(VISIT_COUNTER='buffered', VISIT_FLUSH_SIZE=100, VISIT_FLUSH_SECONDS=3600)
+class BufferedVisitsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user(username='reader', password='1X<ISRUkw+tuK')
+
+    def setUp(self):
+        visits.buffer.take()
+        self.addCleanup(visits.buffer.take)
+
+    def visit(self):
+        return self.client.get(reverse('index'))
+
+    def stored_count(self):
+        return SessionStore(self.client.session.session_key).load().get(visits.SESSION_KEY)
+
+    def test_anonymous_visits_are_counted_in_a_cookie(self):
+        self.visit()
+        self.visit()
+        self.assertContains(self.visit(), 'You have visited this page 2 times.')
+        self.assertFalse(Session.objects.exists())
+
+    def test_tampered_cookies_start_over(self):
+        self.client.cookies[visits.COOKIE] = '41'
+        self.assertNotContains(self.visit(), 'You have visited this page')
+
+    def test_logged_in_visits_are_buffered(self):
+        self.client.login(username='reader', password='1X<ISRUkw+tuK')
+        self.visit()
+        self.assertContains(self.visit(), 'You have visited this page 1 time.')
+        self.assertIsNone(self.stored_count())
+
+        self.assertEqual(visits.flush(), 1)
+        self.assertEqual(self.stored_count(), 2)
+        self.assertContains(self.visit(), 'You have visited this page 2 times.')
+
+    @override_settings(VISIT_FLUSH_SIZE=1)
+    def test_a_full_buffer_is_flushed(self):
+        self.client.login(username='reader', password='1X<ISRUkw+tuK')
+        self.visit()
+        self.assertEqual(self.stored_count(), 1)
+        self.assertEqual(visits.buffer.pending, {})
+
+    def test_visits_of_ended_sessions_are_dropped(self):
+        self.client.login(username='reader', password='1X<ISRUkw+tuK')
+        self.visit()
+        self.client.logout()
+        self.assertEqual(visits.flush(), 0)
+
+
+@override_settings(VISIT_COUNTER='session')
+class SessionVisitsTest(TestCase):
+    def test_visits_are_counted_in_the_session(self):
+        self.client.get(reverse('index'))
+        self.assertContains(self.client.get(reverse('index')), 'You have visited this page 1 time.')
+        self.assertEqual(self.client.session[visits.SESSION_KEY], 2)
+        self.assertNotIn(visits.COOKIE, self.client.cookies)
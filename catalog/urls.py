@@ -1,16 +1,28 @@
+from django.conf import settings
 from django.urls import path
 # from django.urls import re_path
-from . import views
+from . import api, async_views, views
 
 urlpatterns = [
     path('', views.index, name='index'),
     path('books/', views.BookListView.as_view(), name='books'),
+    path('search/', views.search, name='search'),
+    path('lookup/<slug:kind>/', views.lookup, name='lookup'),
+    path('export/<slug:dataset>.<slug:output_format>', views.export_dataset, name='export'),
+    path('profiling/', views.profiling_report, name='profiling'),
     path('book/<int:pk>/', views.BookDetailView.as_view(), name='book-detail'),
     path('book/<uuid:pk>/renew/', views.renew_book_librarian, name='renew-book-librarian'),
+    path('book/<uuid:pk>/checkout/', views.checkout_book_librarian, name='checkout-book-librarian'),
+    path('book/<uuid:pk>/return/', views.return_book_librarian, name='return-book-librarian'),
+    path('book/<uuid:pk>/maintenance/', views.maintenance_book_librarian, name='maintenance-book-librarian'),
+    path('book/<uuid:pk>/reserve/', views.reserve_book, name='reserve-book'),
+    path('book/<int:pk>/hold/', views.place_hold, name='place-hold'),
+    path('hold/<int:pk>/cancel/', views.cancel_hold, name='cancel-hold'),
     path('book/create/', views.BookCreate.as_view(), name='book-create'),
     path('book/<int:pk>/update/', views.BookUpdate.as_view(), name='book-update'),
     path('book/<int:pk>/delete/', views.BookDelete.as_view(), name='book-delete'),
     path('bookinstances/', views.BookInstanceListView.as_view(), name='bookinstances'),
+    path('bookinstances/batch/', views.batch_update_copies, name='bookinstance-batch'),
     path('bookinstance/<uuid:pk>/', views.BookInstanceDetailView.as_view(), name='bookinstance-detail'),
     path('bookinstance/create/', views.BookInstanceCreate.as_view(), name='bookinstance-create'),
     path('bookinstance/<uuid:pk>/update/', views.BookInstanceUpdate.as_view(), name='bookinstance-update'),
@@ -18,7 +30,9 @@ urlpatterns = [
     path('authors/', views.AuthorListView.as_view(), name='authors'),
     path('author/<int:pk>/', views.AuthorDetailView.as_view(), name='author-detail'),
     path('mybooks/', views.LoanedBooksByUserListView.as_view(), name='my-borrowed'),
+    path('myholds/', views.HoldsByUserListView.as_view(), name='my-holds'),
     path('borrowed/', views.LoanedBooksListView.as_view(), name='all-borrowed'),
+    path('overdue/', views.OverdueBooksListView.as_view(), name='overdue'),
     path('author/create/', views.AuthorCreate.as_view(), name='author-create'),
     path('author/<int:pk>/update/', views.AuthorUpdate.as_view(), name='author-update'),
     path('author/<int:pk>/delete/', views.AuthorDelete.as_view(), name='author-delete'),
@@ -32,6 +46,19 @@ urlpatterns = [
     path('language/create/', views.LanguageCreate.as_view(), name='language-create'),
     path('language/<int:pk>/update/', views.LanguageUpdate.as_view(), name='language-update'),
     path('language/<int:pk>/delete/', views.LanguageDelete.as_view(), name='language-delete'),
+    path('api/books/', api.BookList.as_view(), name='api-books'),
+    path('api/book/<int:pk>/', api.BookDetail.as_view(), name='api-book-detail'),
+    path('api/authors/', api.AuthorList.as_view(), name='api-authors'),
+    path('api/author/<int:pk>/', api.AuthorDetail.as_view(), name='api-author-detail'),
+    path('api/genres/', api.GenreList.as_view(), name='api-genres'),
+    path('api/genre/<int:pk>/', api.GenreDetail.as_view(), name='api-genre-detail'),
+    path('api/languages/', api.LanguageList.as_view(), name='api-languages'),
+    path('api/language/<int:pk>/', api.LanguageDetail.as_view(), name='api-language-detail'),
+    path('api/bookinstances/', api.BookInstanceList.as_view(), name='api-bookinstances'),
+    path('api/bookinstance/<uuid:pk>/', api.BookInstanceDetail.as_view(), name='api-bookinstance-detail'),
     # re_path(r'^book/(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})',
     #         views.FilteredBookListView.as_view, name='filtered-book-detail'),
 ]
+
+if settings.ASYNC_VIEWS:
+    urlpatterns = async_views.use_async_views(urlpatterns)
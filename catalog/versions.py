@@ -0,0 +1,45 @@
+"""
+Per-table change tracking.
+
+Each catalog table has a ``TableVersion`` row whose counter is bumped after every transaction that writes to the
+table commits, in a short transaction of its own. Comparing counters tells whether anything in a set of tables changed
+with a single primary key lookup, which the API uses for ``ETag`` and ``Last-Modified`` headers.
+
+Bumping inside the writing transaction would hold the counter row's lock until commit, so every checkout and return
+in the library would wait for the one before it. Bumping after the commit leaves a moment in which readers see the
+new rows under the old version; they get the new version as soon as the bump lands.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import TableVersion
+
+
+def table_name(model):
+    return model._meta.label_lower
+
+
+def bump(*models):
+    """Count a write to the tables of ``models`` once the current transaction commits, or at once outside one."""
+    names = sorted({table_name(model) for model in models})
+    transaction.on_commit(lambda: _bump(names))
+
+
+def _bump(names):
+    now = timezone.now()
+    with transaction.atomic():
+        updated = TableVersion.objects.filter(table__in=names).update(version=F('version') + 1, updated_at=now)
+        if updated < len(names):
+            TableVersion.objects.bulk_create([TableVersion(table=name, version=1, updated_at=now) for name in names],
+                                             ignore_conflicts=True)
+
+
+def get_versions(*models):
+    """Return ``{table name: (version, updated_at)}``; tables never written to report version 0."""
+    names = [table_name(model) for model in models]
+    versions = dict.fromkeys(names, (0, None))
+    for table, version, updated_at in TableVersion.objects.filter(table__in=names)\
+            .values_list('table', 'version', 'updated_at'):
+        versions[table] = (version, updated_at)
+    return versions
@@ -1,58 +1,132 @@
 import datetime
 import os.path
+from urllib.parse import urlencode
 
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from django.http import HttpResponseRedirect
+from django.core import signing
+from django.db.models import Prefetch
+from django.http import (Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, HttpResponseRedirect,
+                         JsonResponse, StreamingHttpResponse)
 from django.shortcuts import render, get_object_or_404
 from django.views import generic
+from django.views.decorators.http import require_POST
 from django.urls import reverse, reverse_lazy
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
+from prometheus_client import CONTENT_TYPE_LATEST
 
-from .forms import RenewBookForm, UpdateBookInstanceModelForm
-from .models import Author, Book, BookInstance, Genre, Language
+from .exporter import DATASETS, FORMATS, export, parse_since
+from . import holds, loans, lookups, visits
+from .metrics import is_authorized, render_metrics
+from .forms import (BatchOperationForm, BookForm, BookInstanceForm, CheckoutBookForm, RenewBookForm,
+                    UpdateBookInstanceModelForm)
+from .models import Author, Book, BookInstance, Genre, Hold, Language
+from .pagecache import AnonymousPageCacheMixin
+from .profiling import request_log, summarize
+from .pagination import CursorPage, CursorPaginationMixin, decode_cursor, encode_cursor
+from .search import search_books
+from .stats import get_catalog_stats
 
 
 def index(request):
-    num_books = Book.objects.all().count()
-    num_instances = BookInstance.objects.all().count()
-    num_instances_available = BookInstance.objects.all().filter(status__exact='a').count()
-    num_authors = Author.objects.all().count()
-    num_genres = Genre.objects.all().count()
-    num_books_with_crime_word = Book.objects.all().filter(title__contains='Crime').count()
-
-    num_visits = request.session.get('num_visits', 0)
-    request.session['num_visits'] = num_visits + 1
+    num_visits = visits.count_visit(request)
 
     context = {
-        'num_books': num_books,
-        'num_instances': num_instances,
-        'num_instances_available': num_instances_available,
-        'num_authors': num_authors,
-        'num_genres': num_genres,
-        'num_books_with_crime_word': num_books_with_crime_word,
+        **get_catalog_stats(),
         'num_visits': num_visits,
     }
 
-    return render(request, 'index.html', context)
+    return visits.set_cookie(request, render(request, 'index.html', context))
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_size = 10
+
+    after = None
+    token = request.GET.get('cursor')
+    if token:
+        try:
+            after, _reverse = decode_cursor(token)
+        except (signing.BadSignature, ValueError, KeyError, TypeError):
+            raise Http404('Invalid cursor.')
+
+    matches = search_books(query, limit=page_size + 1, after=after) if query else []
+    books = Book.objects.select_related('author').in_bulk([book_id for book_id, _rank in matches[:page_size]])
+    book_list = [books[book_id] for book_id, _rank in matches[:page_size] if book_id in books]
+
+    page_obj = CursorPage(book_list)
+    if len(matches) > page_size:
+        page_obj.next_cursor = encode_cursor(list(matches[page_size - 1]))
+        page_obj.next_url = f'{request.path}?{urlencode({"q": query, "cursor": page_obj.next_cursor})}'
+
+    context = {
+        'query': query,
+        'book_list': book_list,
+        'page_obj': page_obj,
+        'is_paginated': page_obj.has_other_pages(),
+    }
+
+    return render(request, 'catalog/book_search.html', context)
+
+
+@staff_member_required
+def export_dataset(request, dataset, output_format):
+    if dataset not in DATASETS or output_format not in FORMATS:
+        raise Http404('Unknown export.')
+
+    since = None
+    if request.GET.get('since'):
+        try:
+            since = parse_since(request.GET['since'])
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+
+    response = StreamingHttpResponse(export(dataset, output_format, since=since), content_type=FORMATS[output_format])
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{output_format}"'
+    return response
+
+
+@staff_member_required
+def profiling_report(request):
+    """Percentiles of the requests this process profiled, per URL name. Empty unless REQUEST_PROFILING is on."""
+    records = request_log.snapshot()
+    return JsonResponse({
+        'enabled': settings.REQUEST_PROFILING,
+        'requests': len(records),
+        'views': summarize(records),
+        'slowest_profiles': request_log.dump_paths(),
+    })
+
+
+def metrics(request):
+    """Prometheus scrape endpoint."""
+    if not is_authorized(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
 
 
 @login_required
 @permission_required('catalog.can_mark_returned', raise_exception=True)
 def renew_book_librarian(request, pk):
     # If this is a POST request then process the Form data
-    book_instance = get_object_or_404(BookInstance, pk=pk)
+    book_instance = get_object_or_404(BookInstance.objects.select_related('book', 'borrower'), pk=pk)
 
     # Create a form instance and populate it with data from the request (binding):
     if request.method == 'POST':
         # Create a form instance and populate it with data from the request (binding):
         form = RenewBookForm(request.POST)
         if form.is_valid():
-            # process the data in form.cleaned_data as required (here we just write it to the model due_back field)
-            book_instance.due_back = form.cleaned_data['renewal_date']
-            book_instance.save()
-            # redirect to a new URL:
-            return HttpResponseRedirect(reverse('all-borrowed'))
+            # process the data in form.cleaned_data as required (here we just move the due_back date of the loan)
+            try:
+                loans.renew(book_instance.pk, form.cleaned_data['renewal_date'])
+            except loans.LoanError as e:
+                form.add_error(None, str(e))
+            else:
+                # redirect to a new URL:
+                return HttpResponseRedirect(reverse('all-borrowed'))
 
     # If this is a GET (or any other method) create the default form.
     else:
@@ -67,13 +141,155 @@ def renew_book_librarian(request, pk):
     return render(request, 'catalog/book_renew_librarian.html', context)
 
 
-class BookListView(generic.ListView):
+@login_required
+@permission_required('catalog.can_mark_returned', raise_exception=True)
+def checkout_book_librarian(request, pk):
+    book_instance = get_object_or_404(BookInstance.objects.select_related('book'), pk=pk)
+
+    if request.method == 'POST':
+        form = CheckoutBookForm(request.POST)
+        if form.is_valid():
+            try:
+                loans.checkout(book_instance.pk, form.cleaned_data['borrower'], form.cleaned_data['due_back'])
+            except loans.LoanError as e:
+                form.add_error(None, str(e))
+            else:
+                return HttpResponseRedirect(reverse('all-borrowed'))
+    else:
+        form = CheckoutBookForm(initial={'due_back': datetime.date.today() + loans.LOAN_PERIOD,
+                                         'borrower': book_instance.borrower_id})
+
+    context = {
+        'form': form,
+        'book_instance': book_instance,
+    }
+
+    return render(request, 'catalog/book_checkout_librarian.html', context)
+
+
+@login_required
+@permission_required('catalog.can_mark_returned', raise_exception=True)
+def batch_update_copies(request):
+    """Return, renew or send to maintenance many copies at once, listing those that could not be changed."""
+    result = None
+    if request.method == 'POST':
+        form = BatchOperationForm(request.POST)
+        if form.is_valid():
+            result = loans.apply_batch(form.cleaned_data['operation'], form.cleaned_data['copy_ids'],
+                                       form.cleaned_data['renewal_date'])
+    else:
+        form = BatchOperationForm()
+
+    return render(request, 'catalog/bookinstance_batch.html', {'form': form, 'result': result})
+
+
+@require_POST
+@login_required
+@permission_required('catalog.can_mark_returned', raise_exception=True)
+def return_book_librarian(request, pk):
+    try:
+        loans.return_copy(pk)
+    except BookInstance.DoesNotExist:
+        raise Http404('No copy with this id.')
+    except loans.LoanError as e:
+        return HttpResponseBadRequest(str(e))
+    return HttpResponseRedirect(reverse('bookinstance-detail', args=[pk]))
+
+
+@require_POST
+@login_required
+@permission_required('catalog.can_mark_returned', raise_exception=True)
+def maintenance_book_librarian(request, pk):
+    """Send an available copy to maintenance, or with ``done`` posted put it back into circulation."""
+    try:
+        if request.POST.get('done'):
+            loans.end_maintenance(pk)
+        else:
+            loans.send_to_maintenance(pk)
+    except BookInstance.DoesNotExist:
+        raise Http404('No copy with this id.')
+    except loans.LoanError as e:
+        return HttpResponseBadRequest(str(e))
+    return HttpResponseRedirect(reverse('bookinstance-detail', args=[pk]))
+
+
+@require_POST
+@login_required
+def reserve_book(request, pk):
+    try:
+        loans.reserve(pk, request.user)
+    except BookInstance.DoesNotExist:
+        raise Http404('No copy with this id.')
+    except loans.LoanError as e:
+        return HttpResponseBadRequest(str(e))
+    return HttpResponseRedirect(reverse('bookinstance-detail', args=[pk]))
+
+
+@login_required
+def place_hold(request, pk):
+    """Join the queue for the next copy of a book to come back, after confirming."""
+    book = get_object_or_404(Book.objects.only('title', 'copies_available'), pk=pk)
+    if request.method == 'POST':
+        try:
+            holds.place_hold(pk, request.user)
+        except holds.HoldError as e:
+            return HttpResponseBadRequest(str(e))
+        return HttpResponseRedirect(reverse('my-holds'))
+    return render(request, 'catalog/hold_confirm.html', {'book': book})
+
+
+@require_POST
+@login_required
+def cancel_hold(request, pk):
+    try:
+        holds.cancel(pk, request.user)
+    except Hold.DoesNotExist:
+        raise Http404('No hold with this id.')
+    except holds.HoldError as e:
+        return HttpResponseBadRequest(str(e))
+    return HttpResponseRedirect(reverse('my-holds'))
+
+
+@login_required
+@permission_required('catalog.can_mark_returned', raise_exception=True)
+def lookup(request, kind):
+    """Matches for an autocomplete widget (catalog.widgets): ``?q=`` is the start of a name, title or ISBN."""
+    try:
+        limit = int(request.GET.get('limit', 10))
+    except ValueError:
+        return HttpResponseBadRequest('limit must be a number.')
+    try:
+        objects = lookups.lookup(kind, request.GET.get('q', ''), limit)
+    except KeyError:
+        raise Http404(f'Nothing to look up called "{kind}".')
+    return JsonResponse({'results': [{'id': obj.pk, 'text': str(obj)} for obj in objects]})
+
+
+class BookListView(AnonymousPageCacheMixin, CursorPaginationMixin, generic.ListView):
     model = Book
     paginate_by = 10
     context_object_name = 'book_list'  # default name
+    cursor_approximate_total = True
+    queryset = Book.objects.select_related('author')\
+        .only('title', 'copies_available', 'author__first_name', 'author__last_name')
     # queryset = Book.objects.filter(title__icontains='crime')[:5]
     template_name = 'catalog/book_list_.html'  # Specify your own template name/location
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.GET.get('available'):
+            # Served by book_available_title_idx
+            queryset = queryset.filter(copies_available__gt=0)
+        return queryset
+
+    def get_page_dependencies(self):
+        return [('book', None)]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['available_only'] = bool(self.request.GET.get('available'))
+        return context
+
     # def get_queryset(self):
     #     return Book.objects.filter(title__icontains='crime')[:5]
 
@@ -82,27 +298,44 @@ class BookListView(generic.ListView):
     #     context['list_end'] = 'This is the end of the list'
     #     return context
 
-class BookDetailView(generic.DetailView):
+class BookDetailView(AnonymousPageCacheMixin, generic.DetailView):
     model = Book
+    queryset = Book.objects\
+        .select_related('author', 'language_of_origin')\
+        .prefetch_related('genre', 'bookinstance_set')
 
+    def get_page_dependencies(self):
+        return [('book', self.kwargs['pk'])]
 
-class AuthorListView(generic.ListView):
+
+class AuthorListView(CursorPaginationMixin, generic.ListView):
     model = Author
     paginate_by = 10
 
-class AuthorDetailView(generic.DetailView):
+class AuthorDetailView(AnonymousPageCacheMixin, generic.DetailView):
     model = Author
+    queryset = Author.objects.prefetch_related(
+        Prefetch('book_set', queryset=Book.objects.only('title', 'summary', 'author_id')))
+
+    def get_page_dependencies(self):
+        return [('author', self.kwargs['pk'])]
 
 
-class BookInstanceListView(LoginRequiredMixin, generic.ListView):
+class BookInstanceListView(LoginRequiredMixin, CursorPaginationMixin, generic.ListView):
     model = BookInstance
     paginate_by = 10
+    cursor_approximate_total = True
+    queryset = BookInstance.objects.select_related('book__author', 'language')\
+        .only('id', 'due_back', 'book__title', 'book__author__first_name', 'book__author__last_name', 'language__name')
 
 class BookInstanceDetailView(LoginRequiredMixin, generic.DetailView):
     model = BookInstance
+    queryset = BookInstance.objects\
+        .select_related('book__author', 'book__language_of_origin', 'language')\
+        .prefetch_related('book__genre')
 
 
-class LoanedBooksByUserListView(LoginRequiredMixin, generic.ListView):
+class LoanedBooksByUserListView(LoginRequiredMixin, CursorPaginationMixin, generic.ListView):
     """Generic class-based view listing books on loan to current user."""
     model = BookInstance
     template_name = os.path.join('catalog', 'bookinstance_list_borrowed_user.html')
@@ -111,30 +344,61 @@ class LoanedBooksByUserListView(LoginRequiredMixin, generic.ListView):
     def get_queryset(self):
         return BookInstance.objects\
             .filter(borrower=self.request.user)\
-            .filter(status__exact='o')
+            .on_loan()\
+            .select_related('book')\
+            .only('id', 'due_back', 'borrower_id', 'status', 'book__title')
+
 
+class HoldsByUserListView(LoginRequiredMixin, generic.ListView):
+    """The current user's open holds with their places in line."""
+    template_name = os.path.join('catalog', 'hold_list_user.html')
+    context_object_name = 'hold_list'
+
+    def get_queryset(self):
+        return holds.open_holds(self.request.user)
 
-class LoanedBooksListView(PermissionRequiredMixin, generic.ListView):
+
+class LoanedBooksListView(PermissionRequiredMixin, CursorPaginationMixin, generic.ListView):
     model = BookInstance
     permission_required = 'catalog.can_mark_returned'
     paginate_by = 10
     template_name = os.path.join('catalog', 'bookinstance_list_borrowed_all.html')
 
     def get_queryset(self):
-        return BookInstance.objects.filter(status__exact='o')
+        return BookInstance.objects\
+            .on_loan()\
+            .select_related('book', 'borrower')\
+            .only('id', 'due_back', 'status', 'book__title', 'borrower__username')
+
 
+class OverdueBooksListView(LoanedBooksListView):
+    template_name = os.path.join('catalog', 'bookinstance_list_overdue.html')
+
+    def get_queryset(self):
+        return super().get_queryset().overdue()
 
-class GenreList(generic.ListView):
+
+class GenreList(AnonymousPageCacheMixin, CursorPaginationMixin, generic.ListView):
     model = Genre
     paginate_by = 10
+    cursor_ordering = ['name']
+
+    def get_page_dependencies(self):
+        return [('genre', None)]
 
-class GenreDetail(generic.DetailView):
+class GenreDetail(AnonymousPageCacheMixin, generic.DetailView):
     model = Genre
+    queryset = Genre.objects.prefetch_related(
+        Prefetch('book_set', queryset=Book.objects.only('title', 'summary')))
 
+    def get_page_dependencies(self):
+        return [('genre', self.kwargs['pk'])]
 
-class LanguageList(generic.ListView):
+
+class LanguageList(CursorPaginationMixin, generic.ListView):
     model = Language
     paginate_by = 10
+    cursor_ordering = ['name']
 
 class LanguageDetail(generic.DetailView):
     model = Language
@@ -160,12 +424,12 @@ class AuthorDelete(PermissionRequiredMixin, DeleteView):
 class BookCreate(PermissionRequiredMixin, CreateView):
     model = Book
     permission_required = 'catalog.can_mark_returned'
-    fields = ['title', 'author', 'summary', 'isbn', 'genre', 'language_of_origin']
+    form_class = BookForm
 
 class BookUpdate(PermissionRequiredMixin, UpdateView):
     model = Book
     permission_required = 'catalog.can_mark_returned'
-    fields = '__all__'
+    form_class = BookForm
 
 class BookDelete(PermissionRequiredMixin, DeleteView):
     model = Book
@@ -176,7 +440,7 @@ class BookDelete(PermissionRequiredMixin, DeleteView):
 class BookInstanceCreate(PermissionRequiredMixin, CreateView):
     model = BookInstance
     permission_required = 'catalog.can_mark_returned'
-    fields = ['book', 'language', 'imprint', 'status']
+    form_class = BookInstanceForm
     initial = {'status': 'a'}
 
 class BookInstanceUpdate(PermissionRequiredMixin, UpdateView):
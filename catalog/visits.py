@@ -0,0 +1,129 @@
+"""
+Home page visit counts.
+
+The home page tells visitors how many times they have been there. With ``VISIT_COUNTER = 'session'`` the count lives in
+the session, so every visit saves it: a new ``django_session`` row for every first-time visitor and every crawler hit
+without cookies, and an ``UPDATE`` for every returning one. ``'buffered'`` writes no session for a visit:
+
+- Anonymous visitors keep their count in a signed cookie, ``COOKIE``, so visiting creates no session at all.
+- Logged-in users keep it in their session, but a visit only adds to an in-process buffer. The buffer is written to the
+  session rows in one batch once it holds ``VISIT_FLUSH_SIZE`` sessions or is ``VISIT_FLUSH_SECONDS`` old, and when
+  the process exits.
+
+Buffered counts are approximate: other processes do not see a process's pending visits until they are flushed, the
+visits are lost if it is killed, and a request that saves a session it loaded before a flush overwrites the flushed
+count. The flush needs a database-backed ``SESSION_ENGINE``.
+"""
+import atexit
+import threading
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+
+from .metrics import SESSION_OPERATIONS
+
+SESSION_KEY = 'num_visits'
+COOKIE = 'visits'
+COOKIE_SALT = 'catalog.visits'
+COOKIE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+class VisitBuffer:
+    """Visits per session key that are not in the session yet."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.started = None
+
+    def add(self, session_key):
+        """Count a visit; return the visits pending for ``session_key`` before it."""
+        with self.lock:
+            if not self.pending:
+                self.started = time.monotonic()
+            earlier = self.pending.get(session_key, 0)
+            self.pending[session_key] = earlier + 1
+            return earlier
+
+    def is_due(self):
+        with self.lock:
+            return bool(self.pending) and (len(self.pending) >= settings.VISIT_FLUSH_SIZE or
+                                           time.monotonic() - self.started >= settings.VISIT_FLUSH_SECONDS)
+
+    def take(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            return pending
+
+    def restore(self, pending):
+        with self.lock:
+            if not self.pending:
+                self.started = time.monotonic()
+            for session_key, visits in pending.items():
+                self.pending[session_key] = self.pending.get(session_key, 0) + visits
+
+
+buffer = VisitBuffer()
+
+
+def flush():
+    """Add the buffered visits to their sessions in one transaction; return the number of sessions updated."""
+    pending = buffer.take()
+    if not pending:
+        return 0
+    store_class = import_module(settings.SESSION_ENGINE).SessionStore
+    model = store_class.get_model_class()
+    store = store_class()
+    try:
+        with transaction.atomic():
+            sessions = list(model.objects.select_for_update().filter(session_key__in=pending))
+            for session in sessions:
+                data = store.decode(session.session_data)
+                data[SESSION_KEY] = data.get(SESSION_KEY, 0) + pending[session.session_key]
+                session.session_data = store.encode(data)
+            # Sessions that ended since, by logout or expiry, are gone along with their visits.
+            model.objects.bulk_update(sessions, ['session_data'])
+    except Exception:
+        buffer.restore(pending)
+        raise
+    SESSION_OPERATIONS.labels('visits_flush').inc(len(sessions))
+    return len(sessions)
+
+
+atexit.register(flush)
+
+
+def read_cookie(request):
+    try:
+        return int(request.get_signed_cookie(COOKIE, default=0, salt=COOKIE_SALT))
+    except (signing.BadSignature, ValueError):
+        return 0
+
+
+def count_visit(request):
+    """Count a visit to the home page and return the number of earlier visits."""
+    if settings.VISIT_COUNTER == 'session':
+        num_visits = request.session.get(SESSION_KEY, 0)
+        request.session[SESSION_KEY] = num_visits + 1
+        return num_visits
+
+    if not request.user.is_authenticated:
+        num_visits = read_cookie(request)
+        request._visits_cookie = num_visits + 1
+        return num_visits
+
+    num_visits = request.session.get(SESSION_KEY, 0) + buffer.add(request.session.session_key)
+    if buffer.is_due():
+        flush()
+    return num_visits
+
+
+def set_cookie(request, response):
+    """Store an anonymous visitor's count, if ``count_visit`` put it in a cookie, on ``response``."""
+    if hasattr(request, '_visits_cookie'):
+        response.set_signed_cookie(COOKIE, request._visits_cookie, salt=COOKIE_SALT, max_age=COOKIE_MAX_AGE,
+                                   httponly=True, samesite='Lax')
+    return response
@@ -0,0 +1,58 @@
+"""
+Autocomplete widgets for foreign keys and many-to-many fields with too many rows to list.
+
+The widgets render a ``<select>`` holding only the selected options, so a form page stays the same size however large
+the catalog grows. ``js/autocomplete.js`` puts a search box next to it and fills it with the matches the lookup
+endpoint (``catalog.lookups``) returns as the user types.
+"""
+from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+
+class AutocompleteMixin:
+    def __init__(self, kind, attrs=None):
+        super().__init__(attrs)
+        self.kind = kind
+
+    class Media:
+        js = ('js/autocomplete.js',)
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['class'] = f'{attrs["class"]} autocomplete' if attrs.get('class') else 'autocomplete'
+        attrs['data-lookup'] = reverse('lookup', args=[self.kind])
+        return attrs
+
+    def selected_keys(self, value):
+        """The bound values that can be keys of the choices; a form posted with junk re-renders with its errors."""
+        field = self.choices.field
+        opts = self.choices.queryset.model._meta
+        key_field = opts.get_field(field.to_field_name) if field.to_field_name else opts.pk
+        keys = set()
+        for v in value:
+            if v in ('', None):
+                continue
+            try:
+                keys.add(key_field.to_python(v))
+            except (TypeError, ValueError, ValidationError):
+                continue
+        return keys
+
+    def optgroups(self, name, value, attrs=None):
+        selected = self.selected_keys(value)
+        options = [] if self.allow_multiple_selected else [self.create_option(name, '', '---------', not selected, 0)]
+        if selected:
+            field = self.choices.field
+            key = field.to_field_name or 'pk'
+            for obj in self.choices.queryset.filter(**{f'{key}__in': selected}):
+                options.append(self.create_option(name, obj.pk, field.label_from_instance(obj), True, len(options)))
+        return [(None, options, 0)]
+
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    pass
+
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    pass
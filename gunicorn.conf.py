@@ -0,0 +1,23 @@
+"""
+Gunicorn settings, read from the working directory when the Procfile starts gunicorn.
+
+Workers record Prometheus metrics into memory-mapped files in PROMETHEUS_MULTIPROC_DIR so /metrics can add up the
+values of every worker (see catalog.metrics).
+"""
+import os
+import shutil
+import tempfile
+
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'locallibrary-metrics'))
+
+
+def on_starting(server):
+    # Files left by a previous run would be added to this run's totals.
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)